@@ -0,0 +1,141 @@
+'''Compare page loads of the default and the lean Chrome profile on a local feed page.
+
+Two local servers stand in for LinkedIn and for a third-party tracking host. The feed page
+comes from feed_generator with its images served locally, plus a web font, video previews
+and a tracking script. Reports the load time and the bytes served per profile. Needs Chrome
+and CHROMEPATH:
+
+    python benchmarks/browser_benchmark.py --posts 50 --loads 5
+'''
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import threading
+import argparse
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import common_utils as cu
+from feed_generator import build_feed
+
+
+ASSET_SIZES = {".jpg": 150 * 1024, ".woff2": 80 * 1024, ".mp4": 1024 * 1024, ".js": 200 * 1024}
+CONTENT_TYPES = {".jpg": "image/jpeg", ".woff2": "font/woff2", ".mp4": "video/mp4", ".js": "application/javascript",
+                 ".css": "text/css", ".html": "text/html; charset=utf-8"}
+
+
+class AssetHandler(BaseHTTPRequestHandler):
+    '''Serve the feed page and filler assets, counting the bytes sent.
+    '''
+    def do_GET(self):
+        extension = os.path.splitext(self.path.split("?")[0])[1]
+        if "/recent-activity/" in self.path:
+            body, extension = self.server.page.encode(), ".html"
+        elif extension == ".css":
+            body = b"@font-face { font-family: Feed; src: url(/fonts/feed.woff2); } body { font-family: Feed; }"
+        elif extension in ASSET_SIZES:
+            body = b"\0" * ASSET_SIZES[extension]
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[extension])
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+            self.server.requests += 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host: str, page: str = "") -> ThreadingHTTPServer:
+    '''Start an asset server on a free port of host.
+    :param host:
+    :param page: html of the feed page
+    '''
+    server = ThreadingHTTPServer((host, 0), AssetHandler)
+    server.page, server.lock, server.bytes_sent, server.requests = page, threading.Lock(), 0, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_page(posts_count: int, site_url: str, tracker_url: str) -> str:
+    '''Build a generated feed page whose images, font, videos and tracking script are served locally.
+    :param posts_count:
+    :param site_url: url of the first-party server
+    :param tracker_url: url of the third-party server
+    '''
+    page, expected = build_feed(posts_count=posts_count)
+    page = page.replace("https://media.example.com/", f"{site_url}/media/")
+    page = page.replace('.jpg">', '.jpg?e=1700000000&v=beta">') # CDN image urls carry a query string
+    page = page.replace("</head>", f'  <link rel="stylesheet" href="{site_url}/feed.css">\n  <script src="{tracker_url}/insight.js"></script>\n</head>')
+    videos = "".join(f'    <video src="{site_url}/media/preview-{n}.mp4" preload="auto" autoplay muted></video>\n' for n in range(5))
+    return page.replace("  </main>", videos + "  </main>")
+
+
+def time_loads(url: str, servers: list, loads: int, lean: bool) -> dict:
+    '''Load url loads times in a new browser. Return the mean load time and the bytes served per load.
+    :param url:
+    :param servers: the servers to count the bytes of
+    :param loads:
+    :param lean:
+    '''
+    driver = cu.create_driver(lean=lean)
+    try:
+        for server in servers:
+            server.bytes_sent, server.requests = 0, 0
+        seconds = 0.0
+        for i in range(loads):
+            start = time.perf_counter()
+            driver.get(url)
+            cu.wait_for_page_ready(driver=driver)
+            seconds += time.perf_counter() - start
+    finally:
+        driver.quit()
+    return {"load_seconds": seconds / loads,
+            "requests": sum(server.requests for server in servers) / loads,
+            "kilobytes": sum(server.bytes_sent for server in servers) / loads / 1024}
+
+
+def run(posts_count: int = 50, loads: int = 5) -> dict:
+    '''Load the same generated feed page with the default and the lean profile. Return the results per profile.
+    :param posts_count:
+    :param loads:
+    '''
+    site = start_server("127.0.0.1")
+    tracker = start_server("127.0.0.1")
+    tracker_host = f"127.0.0.1:{tracker.server_port}"
+    original_hosts = cu.BLOCKED_HOSTS
+    cu.BLOCKED_HOSTS = original_hosts + [tracker_host] # Stands in for the known third-party hosts
+    try:
+        site.page = build_page(posts_count=posts_count, site_url=f"http://127.0.0.1:{site.server_port}", tracker_url=f"http://{tracker_host}")
+        url = f"http://127.0.0.1:{site.server_port}/in/author/recent-activity/shares/"
+        return {"default": time_loads(url=url, servers=[site, tracker], loads=loads, lean=False),
+                "lean": time_loads(url=url, servers=[site, tracker], loads=loads, lean=True)}
+    finally:
+        cu.BLOCKED_HOSTS = original_hosts
+        for server in (site, tracker):
+            server.shutdown()
+            server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page loads with the default and the lean Chrome profile.")
+    parser.add_argument("--posts", type=int, default=50, help="posts of the feed page")
+    parser.add_argument("--loads", type=int, default=5, help="page loads per profile")
+    args = parser.parse_args()
+
+    if not cu.chrome_path:
+        sys.exit("Set CHROMEPATH to the chromedriver to run this benchmark.")
+    results = run(posts_count=args.posts, loads=args.loads)
+    print(f"{'profile':<10}{'load':>10}{'requests':>10}{'served':>12}")
+    for profile, result in results.items():
+        print(f"{profile:<10}{result['load_seconds']:>9.2f}s{result['requests']:>10.0f}{result['kilobytes']:>9.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+'''Compare the text cleaning passes with precompiled patterns against the same passes with pattern strings.
+
+Builds a synthetic corpus of LinkedIn-like posts (emoji, hashtags, mentions, links),
+checks that both produce identical output and reports their throughput:
+
+    python benchmarks/clean_benchmark.py --texts 200000
+'''
+import argparse
+import random
+import re
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import common_utils as cu
+
+
+WORDS = ["data", "pipeline", "model", "learning", "engineering", "analytics", "career", "python", "cloud", "team",
+         "I'm", "we're", "AI/ML", "(beta)", "50%", "Q&A", "\U0001F680", "\U0001F4A1", "\u2019s"]
+HASHTAGS = ["#datascience", "#ai", "#machinelearning", "#hiring", "#Python3", "#100DaysOfCode"]
+MENTIONS = ["@JaneDoe", "@LexFridman", "@OpenAI", "@team42"]
+LINKS = ["https://lnkd.in/abc123", "http://example.com/post?id=42&ref=feed", "https://medium.com/@author/post-1", "https://youtu.be/xyz#t=30"]
+
+
+def build_corpus(texts_count: int, seed: int = 0) -> list:
+    '''Build synthetic post texts.
+    '''
+    rng = random.Random(seed)
+    corpus = []
+    for n in range(texts_count):
+        tokens = [rng.choice(WORDS) for i in range(rng.randint(10, 80))]
+        for i in range(rng.randint(0, 4)):
+            tokens.insert(rng.randint(0, len(tokens)), rng.choice(HASHTAGS))
+        for i in range(rng.randint(0, 2)):
+            tokens.insert(rng.randint(0, len(tokens)), rng.choice(MENTIONS))
+        if rng.random() < 0.5:
+            tokens.insert(rng.randint(0, len(tokens)), rng.choice(LINKS))
+        if rng.random() < 0.02:
+            tokens.insert(rng.randint(0, len(tokens)), "C:\\path")
+        corpus.append(" ".join(tokens))
+    return corpus
+
+
+def clean_with_pattern_strings(texts: list) -> tuple:
+    '''The cleaning passes as they were before the patterns were precompiled, resolved through the re cache on every call.
+    '''
+    texts_without_emoji = cu.remove_emoji(texts)
+    clean_texts = cu.escape_single_quote(texts_without_emoji)
+    clean_texts = [re.sub("(\\#[a-zA-Z0-9]+\\b)", "", string) for string in clean_texts]
+    clean_texts = [re.sub("(\\@[a-zA-Z0-9]+\\b)", "", string) for string in clean_texts]
+    clean_texts = [re.sub("((https?):((//)|(\\\\))+([\\w\\d:#@%/;$()~_?\\+-=\\\\.&](#!)?)*)", "", string) for string in clean_texts]
+    hashtags = [re.findall("(\\#[a-zA-Z0-9]+\\b)", string) for string in texts_without_emoji]
+    mentions = [re.findall("(\\@[a-zA-Z0-9]+\\b)", string) for string in texts_without_emoji]
+    return clean_texts, hashtags, mentions
+
+
+def clean_with_compiled_patterns(texts: list) -> tuple:
+    '''The cleaning passes of LinkedinCleaner.get_clean_records.
+    '''
+    texts_without_emoji = cu.remove_emoji(texts)
+    clean_texts = cu.escape_single_quote(texts_without_emoji)
+    clean_texts = cu.remove_hashtags(clean_texts)
+    clean_texts = cu.remove_mentions(clean_texts)
+    clean_texts = cu.remove_links(clean_texts)
+    return clean_texts, cu.extract_hashtags(texts_without_emoji), cu.extract_mentions(texts_without_emoji)
+
+
+def time_call(function, *args, repeat: int = 3) -> tuple:
+    '''Return the best time of a few runs and the result.
+    '''
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def run(texts_count: int = 200000) -> dict:
+    '''Clean a synthetic corpus with both pattern kinds. Return the timings.
+    :param texts_count:
+    '''
+    corpus = build_corpus(texts_count=texts_count)
+    pattern_strings_seconds, expected = time_call(clean_with_pattern_strings, corpus)
+    compiled_patterns_seconds, actual = time_call(clean_with_compiled_patterns, corpus)
+    if actual != expected:
+        sys.exit("The precompiled patterns output differs from the pattern strings.")
+
+    return {"texts": texts_count,
+            "pattern_strings_seconds": pattern_strings_seconds,
+            "compiled_patterns_seconds": compiled_patterns_seconds,
+            "texts_per_second": texts_count / compiled_patterns_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the text cleaning engine.")
+    parser.add_argument("--texts", type=int, default=200000)
+    args = parser.parse_args()
+
+    result = run(texts_count=args.texts)
+    print(f"texts:              {args.texts}")
+    print(f"pattern strings:    {result['pattern_strings_seconds']:.3f}s ({args.texts / result['pattern_strings_seconds']:.0f} texts/s)")
+    print(f"compiled patterns:  {result['compiled_patterns_seconds']:.3f}s ({result['texts_per_second']:.0f} texts/s)")
+    print(f"speedup:            {result['pattern_strings_seconds'] / result['compiled_patterns_seconds']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+'''Measure how fast LinkedinScraper parses a feed page and extracts its posts.
+
+Runs offline on pages built by feed_generator, checks the extracted records against the
+generated ones and reports the parse and extraction throughput:
+
+    python benchmarks/extract_benchmark.py --posts 50 --pages 20
+'''
+import argparse
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import common_utils as cu
+import data_scraper as ds
+from feed_generator import build_feed
+
+
+def run(posts_count: int = 50, pages_count: int = 20) -> dict:
+    '''Parse and extract pages_count generated pages of posts_count posts. Return the timings.
+    :param posts_count:
+    :param pages_count:
+    '''
+    scraper = ds.LinkedinScraper(driver=object())
+    pages = [build_feed(posts_count=posts_count, seed=seed) for seed in range(pages_count)]
+
+    parse_seconds = 0.0
+    extract_seconds = 0.0
+    for page, expected in pages:
+        start = time.perf_counter()
+        containers = scraper.find_containers(cu.parse_page(page))
+        parse_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        posts = [scraper.extract_post(container) for container in containers]
+        extract_seconds += time.perf_counter() - start
+        if posts != expected:
+            sys.exit("The extracted posts differ from the generated posts.")
+
+    posts_total = posts_count * pages_count
+    return {"posts": posts_total,
+            "parse_seconds": parse_seconds,
+            "extract_seconds": extract_seconds,
+            "posts_per_second": posts_total / (parse_seconds + extract_seconds)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark feed page parsing and post extraction.")
+    parser.add_argument("--posts", type=int, default=50, help="posts per page")
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    result = run(posts_count=args.posts, pages_count=args.pages)
+    print(f"posts:              {result['posts']}")
+    print(f"parse:              {result['parse_seconds']:.3f}s")
+    print(f"extract:            {result['extract_seconds']:.3f}s")
+    print(f"throughput:         {result['posts_per_second']:.0f} posts/s")
+
+
+if __name__ == "__main__":
+    main()
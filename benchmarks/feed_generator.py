@@ -0,0 +1,162 @@
+'''Generate synthetic LinkedIn activity feed pages for the offline benchmarks.
+
+The markup uses the class names LinkedinScraper looks for, wrapped in the kind of nesting
+a real feed page has, and returns the records the scraper is expected to extract:
+
+    python benchmarks/feed_generator.py --posts 50 --output /tmp/feed.html
+'''
+import argparse
+import random
+import html
+
+
+MEDIA_MIX = {"Image": 0.35, "Article": 0.2, "Youtube Video": 0.1, "Poll": 0.1, "Text": 0.25}
+WORDS = ["data", "pipeline", "model", "learning", "engineering", "analytics", "career", "python", "cloud", "team",
+         "I'm", "we're", "AI/ML", "(beta)", "50%", "Q&A", "<3", "\U0001F680", "\U0001F4A1", "’s"]
+HASHTAGS = ["#datascience", "#ai", "#machinelearning", "#hiring", "#Python3", "#100DaysOfCode"]
+MENTIONS = ["@JaneDoe", "@LexFridman", "@OpenAI", "@team42"]
+LINKS = ["https://lnkd.in/abc123", "http://example.com/post?id=42&ref=feed", "https://medium.com/@author/post-1"]
+
+HEADER = '''<!DOCTYPE html>
+<html>
+<head>
+  <title>Recent activity | LinkedIn</title>
+</head>
+<body>
+  <header class="global-nav">
+    <nav><a href="/feed/">Home</a><a href="/mynetwork/">My Network</a><a href="/jobs/">Jobs</a><a href="/messaging/">Messaging</a></nav>
+  </header>
+  <main class="scaffold-layout__main">
+'''
+FOOTER = '''  </main>
+  <aside class="scaffold-layout__aside">
+    <div class="ember-view">People also viewed</div>
+  </aside>
+</body>
+</html>
+'''
+NOISE = '''    <aside class="scaffold-layout__aside ember-view">
+      <div class="ember-view pv-browsemap-section"><a href="/in/someone-{n}/"><span dir="ltr">Someone {n}</span></a><span>Data engineer at Example</span><button class="artdeco-button">Follow</button></div>
+      <ul class="ember-view"><li><a href="/jobs/view/{n}/">Job {n}</a></li><li><a href="/company/example-{n}/">Company {n}</a></li></ul>
+    </aside>
+    <script type="text/javascript">window.__como_rehydration__ = [{{"id": {n}, "data": "{data}"}}];</script>
+'''
+
+
+def build_text(rng: random.Random) -> str:
+    '''Build a post text with emoji, hashtags, mentions and sometimes a link.
+    '''
+    tokens = [rng.choice(WORDS) for i in range(rng.randint(10, 80))]
+    for i in range(rng.randint(0, 4)):
+        tokens.insert(rng.randint(0, len(tokens)), rng.choice(HASHTAGS))
+    for i in range(rng.randint(0, 2)):
+        tokens.insert(rng.randint(0, len(tokens)), rng.choice(MENTIONS))
+    if rng.random() < 0.5:
+        tokens.insert(rng.randint(0, len(tokens)), rng.choice(LINKS))
+    return " ".join(tokens)
+
+
+def build_count(rng: random.Random) -> int:
+    '''Draw an engagement count, mostly small with a long tail.
+    '''
+    return int(rng.paretovariate(1.2)) - 1 if rng.random() < 0.98 else rng.randint(1000, 50000)
+
+
+def build_post(rng: random.Random, n: int, media_type: str) -> tuple:
+    '''Build the markup of one post container and the record LinkedinScraper.extract_post should return.
+    :param rng:
+    :param n: index of the post in the feed
+    :param media_type: any key of MEDIA_MIX
+    '''
+    text = "None" if media_type == "Poll" else build_text(rng)
+    record = {"text": text, "media_link": "None", "media_type": "Other: Poll, Shared Post, etc",
+              "reactions_count": 0, "comments_count": 0, "shares_count": 0}
+    parts = ['    <div class="ember-view occludable-update">',
+             '      <div class="update-components-actor display-flex">',
+             f'        <a class="app-aware-link update-components-actor__meta-link" href="/in/author/"><span class="update-components-actor__name"><span dir="ltr">Author</span></span></a>',
+             f'        <span class="update-components-actor__sub-description"><span aria-hidden="true">{n + 1}d</span></span>',
+             '      </div>']
+    if media_type != "Poll":
+        parts += ['      <div class="feed-shared-text relative feed-shared-update-v2__commentary">',
+                  f'        <span dir="ltr">{html.escape(text, quote=False)}</span>',
+                  '      </div>']
+
+    if media_type == "Image":
+        record["media_link"], record["media_type"] = f"https://media.example.com/image-{n}.jpg", "Image"
+        parts += ['      <div class="feed-shared-image__container">',
+                  f'        <img class="ivm-view-attr__img--centered feed-shared-image__image lazy-image ember-view" src="{record["media_link"]}">',
+                  '      </div>']
+    elif media_type == "Article":
+        record["media_link"], record["media_type"] = f"https://www.example.com/pulse/article-{n}", "Article"
+        parts += ['      <div class="feed-shared-article__description-container">',
+                  f'        <a href="{record["media_link"]}">Article {n}</a>',
+                  '      </div>']
+    elif media_type == "Youtube Video":
+        record["media_link"], record["media_type"] = f"https://www.youtube.com/watch?v=video{n}", "Youtube Video"
+        parts += ['      <div class="feed-shared-external-video__meta">',
+                  f'        <a href="{record["media_link"]}">Watch</a>',
+                  '      </div>']
+    elif media_type == "Poll":
+        parts += ['      <div class="feed-shared-update-v2__content overflow-hidden feed-shared-poll ember-view">',
+                  '        <span>Which do you prefer?</span>',
+                  '      </div>']
+
+    if media_type != "Poll":
+        reactions_count, comments_count, shares_count = build_count(rng), build_count(rng), build_count(rng)
+        parts.append('      <div class="social-details-social-activity update-v2-social-activity">')
+        if reactions_count > 0:
+            record["reactions_count"] = reactions_count
+            reactions_class = "social-details-social-counts__reactions-count" if rng.random() < 0.8 else "social-details-social-counts__social-proof-fallback-number"
+            parts.append(f'        <span class="{reactions_class}">{reactions_count:,}</span>')
+        parts.append('        <ul>')
+        if comments_count > 0:
+            record["comments_count"] = comments_count
+            parts.append(f'          <li class="social-details-social-counts__item social-details-social-counts__comments social-details-social-counts__item--with-social-proof"><span>{comments_count} comments</span></li>')
+        if shares_count > 0:
+            record["shares_count"] = shares_count
+            parts.append(f'          <li class="social-details-social-counts__item social-details-social-counts__item--with-social-proof"><span>{shares_count} shares</span></li>')
+        parts += ['        </ul>',
+                  '      </div>',
+                  '      <div class="feed-shared-social-action-bar">',
+                  '        <button class="react-button__trigger artdeco-button"><span>Like</span></button>',
+                  '        <button class="comment-button artdeco-button"><span>Comment</span></button>',
+                  '        <button class="share-button artdeco-button"><span>Repost</span></button>',
+                  '      </div>']
+
+    parts.append('    </div>')
+    return "\n".join(parts) + "\n", record
+
+
+def build_feed(posts_count: int = 50, media_mix: dict = None, seed: int = 0, noise_count: int = 0) -> tuple:
+    '''Build a feed page of posts_count posts. Return (html, expected post records).
+    :param posts_count:
+    :param media_mix: share of each media type, MEDIA_MIX by default
+    :param seed:
+    :param noise_count: sidebar and script blocks added after the feed, like the rest of a saved page
+    '''
+    rng = random.Random(seed)
+    media_mix = media_mix if media_mix is not None else MEDIA_MIX
+    media_types = rng.choices(list(media_mix.keys()), weights=list(media_mix.values()), k=posts_count)
+    posts = [build_post(rng=rng, n=n, media_type=media_type) for n, media_type in enumerate(media_types)]
+
+    noise = "".join(NOISE.format(n=n, data="x" * 200) for n in range(noise_count))
+
+    return HEADER + "".join(post_html for post_html, record in posts) + noise + FOOTER, [record for post_html, record in posts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic LinkedIn activity feed page.")
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=int, default=0, help="sidebar and script blocks around the feed")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    page, records = build_feed(posts_count=args.posts, seed=args.seed, noise_count=args.noise)
+    with open(args.output, 'w') as f:
+        f.write(page)
+    print(f"Wrote {len(records)} posts to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+'''Compare the per-row and the bulk ingestion paths of LinkedinIngester.
+
+Runs against a throwaway local PostgreSQL database: the posts_fact table of that
+database is truncated between runs. Credentials are read from the usual
+DB_USER, PASSWORD, HOST and PORT variables, the database name must be given:
+
+    python benchmarks/ingest_benchmark.py --database linkedin_bench --records 2000
+'''
+import argparse
+import random
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import common_utils as cu
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS author_dimension (
+    author_key text NOT NULL PRIMARY KEY,
+    author_name text NOT NULL,
+    linkedin_profile_link text NOT NULL UNIQUE,
+    author_description text
+);
+CREATE TABLE IF NOT EXISTS date_dimension (
+    date_key character varying(8) NOT NULL PRIMARY KEY,
+    date date NOT NULL,
+    full_date_description text NOT NULL,
+    day_of_week text NOT NULL,
+    calendar_month text NOT NULL,
+    calendar_quarter text NOT NULL,
+    calendar_year text NOT NULL,
+    weekday_indicator text NOT NULL
+);
+CREATE TABLE IF NOT EXISTS posts_fact (
+    date_key character varying(8) NOT NULL REFERENCES date_dimension (date_key),
+    author_key text NOT NULL REFERENCES author_dimension (author_key),
+    clean_text text NOT NULL,
+    reactions_count integer NOT NULL,
+    comments_count integer NOT NULL,
+    shares_count integer NOT NULL,
+    media_link text,
+    media_type text,
+    hashtags text[],
+    mentions text[],
+    text_hash character varying(32) NOT NULL,
+    CONSTRAINT posts_fact_author_key_text_hash_unique UNIQUE (author_key, text_hash)
+);
+INSERT INTO author_dimension VALUES ('1', 'Benchmark Author', 'http://localhost/in/benchmark/recent-activity/shares/', NULL) ON CONFLICT DO NOTHING;
+INSERT INTO date_dimension VALUES ('20220707', '2022-07-07', 'July 07, 2022', 'Thursday', 'July', 'Q3', '2022', 'Weekday') ON CONFLICT DO NOTHING;
+'''
+
+WORDS = ["data", "pipeline", "model", "learning", "engineering", "analytics", "career", "python", "cloud", "team"]
+
+
+def build_clean_records(records_count: int, seed: int = 0) -> list:
+    '''Build synthetic clean records shaped like LinkedinCleaner.get_clean_records output.
+    '''
+    rng = random.Random(seed)
+    records = []
+    for n in range(records_count):
+        text = f"Post {n}: " + " ".join(rng.choice(WORDS) for i in range(rng.randint(20, 120)))
+        records.append(("20220707", "1", text, rng.randint(0, 5000), rng.randint(0, 300), rng.randint(0, 100),
+                        "None", "Other: Poll, Shared Post, etc", "{#data,#ai}", "{None}", cu.compute_text_hash(text)))
+    return records
+
+
+def reset_table():
+    with cu.pooled_connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(SCHEMA)
+            cursor.execute("TRUNCATE posts_fact")
+        connection.commit()
+
+
+def time_call(function, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def run(database: str, records_count: int = 2000) -> dict:
+    '''Ingest synthetic records per row, in bulk, and in bulk again. Return the timings.
+    :param database: throwaway database, its posts_fact table is truncated
+    :param records_count:
+    '''
+    os.environ["DATABASE"] = database
+    import data_ingester as di
+
+    ingester = di.LinkedinIngester()
+    clean_records = build_clean_records(records_count=records_count)
+
+    reset_table()
+    per_row_seconds, result = time_call(ingester.ingest_data, clean_records=clean_records)
+
+    reset_table()
+    bulk_seconds, (inserted, skipped) = time_call(ingester.bulk_ingest_data, clean_records=clean_records)
+    rerun_seconds, (reinserted, reskipped) = time_call(ingester.bulk_ingest_data, clean_records=clean_records)
+    cu.close_connection_pool()
+
+    return {"records": records_count,
+            "per_row_seconds": per_row_seconds,
+            "bulk_seconds": bulk_seconds,
+            "bulk_rerun_seconds": rerun_seconds,
+            "inserted": inserted,
+            "skipped_on_rerun": reskipped,
+            "records_per_second": records_count / bulk_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-row vs bulk ingestion into posts_fact.")
+    parser.add_argument("--database", required=True, help="throwaway database, its posts_fact table is truncated")
+    parser.add_argument("--records", type=int, default=2000)
+    args = parser.parse_args()
+
+    result = run(database=args.database, records_count=args.records)
+    print(f"records:            {args.records}")
+    print(f"per-row ingest:     {result['per_row_seconds']:.3f}s ({args.records / result['per_row_seconds']:.0f} records/s)")
+    print(f"bulk ingest:        {result['bulk_seconds']:.3f}s ({result['records_per_second']:.0f} records/s), inserted {result['inserted']}")
+    print(f"bulk re-ingest:     {result['bulk_rerun_seconds']:.3f}s, skipped {result['skipped_on_rerun']}")
+    print(f"speedup:            {result['per_row_seconds'] / result['bulk_seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+'''Compare the parse backends of cu.parse_page on large generated feed pages.
+
+Every backend parses the same pages, padded with sidebars and scripts like a saved page.
+The run stops if a backend extracts other posts than html.parser:
+
+    python benchmarks/parse_benchmark.py --posts 200 --noise 2000 --pages 5
+'''
+import argparse
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import common_utils as cu
+import data_scraper as ds
+from feed_generator import build_feed
+
+
+def run(posts_count: int = 200, noise_count: int = 2000, pages_count: int = 5) -> dict:
+    '''Parse and extract pages_count generated pages with every backend. Return the timings per backend.
+    :param posts_count:
+    :param noise_count:
+    :param pages_count:
+    '''
+    scraper = ds.LinkedinScraper(driver=object())
+    pages = [build_feed(posts_count=posts_count, seed=seed, noise_count=noise_count) for seed in range(pages_count)]
+
+    results = {"posts": posts_count * pages_count,
+               "page_bytes": sum(len(page.encode()) for page, expected in pages) // pages_count}
+    for backend in cu.PARSE_BACKENDS:
+        seconds = 0.0
+        for page, expected in pages:
+            start = time.perf_counter()
+            posts = [scraper.extract_post(container) for container in scraper.find_containers(cu.parse_page(page, backend=backend))]
+            seconds += time.perf_counter() - start
+            if posts != expected:
+                sys.exit(f"The posts extracted with {backend} differ from the generated posts.")
+        results[f"{backend}_seconds"] = seconds
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the parse backends on large feed pages.")
+    parser.add_argument("--posts", type=int, default=200, help="posts per page")
+    parser.add_argument("--noise", type=int, default=2000, help="sidebar and script blocks per page")
+    parser.add_argument("--pages", type=int, default=5)
+    args = parser.parse_args()
+
+    result = run(posts_count=args.posts, noise_count=args.noise, pages_count=args.pages)
+    print(f"posts:              {result['posts']}")
+    print(f"page size:          {result['page_bytes'] / 1024:.0f} KiB")
+    for backend in cu.PARSE_BACKENDS:
+        print(f"{backend + ':':<20}{result[backend + '_seconds']:.3f}s")
+    print(f"speedup:            {result['html.parser_seconds'] / result['lxml_seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+'''Run the offline benchmark suite and store its results per commit.
+
+Extraction, parsing and cleaning run offline, ingestion runs only if a throwaway local PostgreSQL
+database is given. The results are written to benchmarks/results/<commit>.json and can
+be compared with the results of another commit:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --database linkedin_bench --compare 9201229
+'''
+from datetime import datetime
+import subprocess
+import platform
+import argparse
+import json
+import os
+import sys
+
+import extract_benchmark
+import parse_benchmark
+import clean_benchmark
+import ingest_benchmark
+
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def get_commit() -> str:
+    '''Return the short hash of the checked out commit, with a -dirty suffix if the tree has local changes.
+    '''
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout
+        return commit + ("-dirty" if status.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def find_results(reference: str) -> str:
+    '''Return the path of stored results from a path or a commit hash prefix.
+    :param reference:
+    '''
+    if os.path.isfile(reference):
+        return reference
+    matches = sorted(name for name in os.listdir(RESULTS_PATH) if name.startswith(reference) and name.endswith(".json"))
+    if len(matches) == 0:
+        sys.exit(f"No stored results for {reference} in {RESULTS_PATH}.")
+    return os.path.join(RESULTS_PATH, matches[0])
+
+
+def compare(previous: dict, current: dict):
+    '''Print every timing and throughput of two runs side by side.
+    :param previous:
+    :param current:
+    '''
+    print(f"{'benchmark':<40}{previous['commit']:>16}{current['commit']:>16}{'change':>10}")
+    for benchmark, results in current["benchmarks"].items():
+        for name, value in results.items():
+            previous_value = previous["benchmarks"].get(benchmark, {}).get(name)
+            if not (name.endswith("_seconds") or name.endswith("_per_second")) or not previous_value:
+                continue
+            print(f"{benchmark + '.' + name:<40}{previous_value:>16.3f}{value:>16.3f}{(value / previous_value - 1) * 100:>9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and store the results of the current commit.")
+    parser.add_argument("--posts", type=int, default=50, help="posts per generated feed page")
+    parser.add_argument("--pages", type=int, default=20, help="generated feed pages")
+    parser.add_argument("--noise", type=int, default=2000, help="sidebar and script blocks per page of the parse benchmark")
+    parser.add_argument("--texts", type=int, default=200000, help="texts of the cleaning corpus")
+    parser.add_argument("--database", help="throwaway database for the ingest benchmark, its posts_fact table is truncated")
+    parser.add_argument("--records", type=int, default=2000, help="records of the ingest benchmark")
+    parser.add_argument("--compare", help="commit hash prefix or path of stored results to compare with")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare is not None:
+        with open(find_results(args.compare)) as f:
+            previous = json.load(f) # Read before the results of this run may overwrite it
+
+    benchmarks = {"extract": extract_benchmark.run(posts_count=args.posts, pages_count=args.pages),
+                  "parse": parse_benchmark.run(posts_count=args.posts, noise_count=args.noise, pages_count=max(1, args.pages // 4)),
+                  "clean": clean_benchmark.run(texts_count=args.texts)}
+    if args.database is not None:
+        benchmarks["ingest"] = ingest_benchmark.run(database=args.database, records_count=args.records)
+
+    results = {"commit": get_commit(),
+               "date": datetime.now().isoformat(timespec="seconds"),
+               "python": platform.python_version(),
+               "machine": platform.machine(),
+               "parameters": vars(args),
+               "benchmarks": benchmarks}
+    if not os.path.isdir(RESULTS_PATH):
+        os.makedirs(RESULTS_PATH)
+    results_path = os.path.join(RESULTS_PATH, f"{results['commit']}.json")
+    with open(results_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Stored the results in {results_path}")
+
+    if previous is not None:
+        compare(previous=previous, current=results)
+    else:
+        for benchmark, values in benchmarks.items():
+            print(benchmark, json.dumps(values))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+'''Compare the browser startup time with and without LinkedIn session reuse.
+
+Needs Chrome and the usual CHROMEPATH, LOGIN_URL, LINKEDIN_USER and LINKEDIN_PASSWORD
+variables. The first run with reuse logs in and saves the session, the next ones restore it:
+
+    python benchmarks/session_benchmark.py --runs 3
+'''
+import argparse
+import tempfile
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import common_utils as cu
+
+
+def time_startups(runs: int, session_reuse: bool) -> list:
+    '''Start and quit runs logged-in browsers. Return the startup time of each.
+    :param runs:
+    :param session_reuse:
+    '''
+    cu.SESSION_REUSE = session_reuse
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        try:
+            driver = cu.login_linkedin()
+        except Exception as e:
+            sys.exit(f"Could not start a logged-in browser, check the Chrome path and the credentials: {e}")
+        timings.append(time.perf_counter() - start)
+        driver.quit()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark browser startup with and without session reuse.")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder_path:
+        cu.SESSION_PATH = os.path.join(folder_path, "session.json")
+        login_timings = time_startups(runs=args.runs, session_reuse=False)
+        first_timing = time_startups(runs=1, session_reuse=True)[0] # Logs in and saves the session
+        restore_timings = time_startups(runs=args.runs, session_reuse=True)
+
+    print(f"login every time:   {sum(login_timings) / len(login_timings):.2f}s per startup")
+    print(f"first reuse run:    {first_timing:.2f}s (logs in and saves the session)")
+    print(f"restored session:   {sum(restore_timings) / len(restore_timings):.2f}s per startup")
+
+
+if __name__ == "__main__":
+    main()
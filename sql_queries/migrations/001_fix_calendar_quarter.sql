@@ -0,0 +1,9 @@
+-- Fix calendar_quarter of the date_dimension rows built with `int(month)//3 + 1`,
+-- which put March, June and September in the following quarter and December in Q5.
+BEGIN;
+
+UPDATE date_dimension
+SET calendar_quarter = 'Q' || EXTRACT(QUARTER FROM date)::int
+WHERE calendar_quarter <> 'Q' || EXTRACT(QUARTER FROM date)::int;
+
+COMMIT;
@@ -0,0 +1,23 @@
+-- Store the md5 of the normalized clean_text in posts_fact.text_hash and enforce the uniqueness of
+-- the posts on (author_key, text_hash) instead of (author_key, clean_text), whose index holds every post text.
+-- The normalization matches common_utils.normalize_text: runs of whitespace become one space, ends are trimmed.
+BEGIN;
+
+ALTER TABLE posts_fact ADD COLUMN IF NOT EXISTS text_hash character varying(32);
+
+UPDATE posts_fact
+SET text_hash = md5(btrim(regexp_replace(clean_text, '[ \t\n\r\f\v]+', ' ', 'g'), ' '))
+WHERE text_hash IS NULL;
+
+-- Posts whose clean texts only differ by whitespace now collide, keep one of each
+DELETE FROM posts_fact duplicate
+USING posts_fact kept
+WHERE duplicate.author_key = kept.author_key
+  AND duplicate.text_hash = kept.text_hash
+  AND duplicate.ctid > kept.ctid;
+
+ALTER TABLE posts_fact ALTER COLUMN text_hash SET NOT NULL;
+ALTER TABLE posts_fact DROP CONSTRAINT IF EXISTS posts_fact_author_key_clean_text_unique;
+ALTER TABLE posts_fact ADD CONSTRAINT posts_fact_author_key_text_hash_unique UNIQUE (author_key, text_hash);
+
+COMMIT;
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+import os
+
+import common_utils as cu
+
+
+author_scheduler = None
+
+
+class AuthorScheduler():
+    '''Choose the authors of a run from how often they post, within a page budget.
+    The posting rate of an author is estimated from the posts ingested per date_key. An author is due
+    once the expected number of new posts since the last visit reaches one, so quiet authors are
+    visited less often. The due authors most likely to have new posts go first.
+    A failed attempt counts as a visit, so an author whose page keeps failing waits a visit interval between retries.
+    '''
+    PRIOR_POSTS = 1 # an author without history is assumed to post about once a week
+    PRIOR_DAYS = 7
+
+    def __init__(self, path: str = None, page_budget: int = None, window_days: int = None,
+                 min_interval_days: float = None, max_interval_days: float = None):
+        '''
+        :param path: JSON file of the last visit of each author, SCHEDULE_PATH by default.
+        :param page_budget: maximum author pages loaded per run, SCHEDULE_PAGE_BUDGET by default, 0 for no limit.
+        :param window_days: days of posting history used for the rate, SCHEDULE_WINDOW_DAYS by default.
+        :param min_interval_days: shortest time between two visits, SCHEDULE_MIN_INTERVAL_DAYS by default.
+        :param max_interval_days: longest time between two visits, SCHEDULE_MAX_INTERVAL_DAYS by default.
+        '''
+        self.logger = cu.create_log()
+        self.path = path if path is not None else cu.SCHEDULE_PATH
+        self.page_budget = page_budget if page_budget is not None else cu.SCHEDULE_PAGE_BUDGET
+        self.window_days = window_days if window_days is not None else cu.SCHEDULE_WINDOW_DAYS
+        self.min_interval_days = min_interval_days if min_interval_days is not None else cu.SCHEDULE_MIN_INTERVAL_DAYS
+        self.max_interval_days = max_interval_days if max_interval_days is not None else cu.SCHEDULE_MAX_INTERVAL_DAYS
+        self.last_visits = cu.TimestampStore(path=self.path, name="last_visits")
+        self.last_failures = cu.TimestampStore(path=os.path.splitext(self.path)[0] + "_failures.json", name="last_failures")
+
+    def estimate_rate(self, post_counts: dict, today: datetime) -> float:
+        '''Return the estimated posts per day of an author.
+        :param post_counts: posts ingested per date_key, from cu.get_post_history().
+        :param today:
+        '''
+        if len(post_counts) == 0:
+            return self.PRIOR_POSTS / self.PRIOR_DAYS
+        first_date_key = min(post_counts)
+        # The first date_key holds the backlog found on the first visit, not posts of that day
+        observed_days = min(self.window_days, (today.date() - datetime.strptime(first_date_key, "%Y%m%d").date()).days)
+        window_start = cu.compute_date_key(date=today - timedelta(days=self.window_days))
+        posts_count = sum(count for date_key, count in post_counts.items() if date_key != first_date_key and date_key >= window_start)
+
+        return (posts_count + self.PRIOR_POSTS) / (max(observed_days, 0) + self.PRIOR_DAYS)
+
+    def get_interval_days(self, rate: float) -> float:
+        '''Return the days between two visits of an author posting rate posts per day.
+        :param rate:
+        '''
+        return min(max(1 / rate, self.min_interval_days), self.max_interval_days)
+
+    def plan(self, authors: list, post_history: dict, now: datetime = None) -> list:
+        '''Return the due authors, the most likely to have new posts first, at most page_budget of them.
+        Authors never visited nor attempted are always due.
+        :param authors: list of (author_name, author_url).
+        :param post_history: posts ingested per date_key of each author name, from cu.get_post_history().
+        :param now:
+        '''
+        now = now if now is not None else datetime.now()
+        due_authors = []
+        for author_name, author_url in authors:
+            rate = self.estimate_rate(post_counts=post_history.get(author_name, {}), today=now)
+            attempts = [attempted_at for attempted_at in (self.last_visits.get(author_name), self.last_failures.get(author_name)) if attempted_at is not None]
+            if len(attempts) == 0:
+                due_authors.append((float("inf"), author_name, author_url))
+                continue
+            days = (now - max(attempts)).total_seconds() / 86400
+            if days >= self.get_interval_days(rate=rate):
+                due_authors.append((rate * days, author_name, author_url))
+
+        due_authors.sort(key=lambda due_author: due_author[0], reverse=True)
+        scheduled = due_authors[:self.page_budget] if self.page_budget > 0 else due_authors
+        metrics = cu.get_metrics()
+        metrics.increment(name="authors_scheduled", value=len(scheduled))
+        metrics.increment(name="authors_deferred", value=len(authors) - len(scheduled))
+        self.logger.info(f"> Scheduled {len(scheduled)} of {len(authors)} authors, {len(due_authors) - len(scheduled)} due authors are over the page budget.")
+
+        return [(author_name, author_url) for expected_posts, author_name, author_url in scheduled]
+
+    def record_visit(self, author_name: str, visited_at: datetime = None):
+        '''Save that an author page was scraped. Safe to call from any thread.
+        :param author_name:
+        :param visited_at: now by default
+        '''
+        self.last_visits.set(author_name=author_name, saved_at=visited_at)
+
+    def record_failure(self, author_name: str, failed_at: datetime = None):
+        '''Save that scraping an author page failed, so the author is not retried on every run. Safe to call from any thread.
+        :param author_name:
+        :param failed_at: now by default
+        '''
+        self.last_failures.set(author_name=author_name, saved_at=failed_at)
+
+
+def get_author_scheduler() -> AuthorScheduler:
+    '''Return the process-wide author scheduler.
+    '''
+    global author_scheduler
+    if author_scheduler is None:
+        author_scheduler = AuthorScheduler()
+    return author_scheduler
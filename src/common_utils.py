@@ -1,13 +1,22 @@
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
+# selenium, bs4 and psycopg2 are imported by the functions using them, so that a job
+# which only cleans or only ingests does not load the browser stack at startup.
+from __future__ import annotations
 from dotenv import load_dotenv
-import psycopg2
+from contextlib import contextmanager
+import threading
 import sys
 import os
 import logging
-from logging.handlers import WatchedFileHandler
-from datetime import datetime
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from datetime import datetime, timedelta
+from urllib.parse import urljoin
+import hashlib
+import atexit
+import gzip
+import zlib
+import random
+import queue
+import json
 import time
 import re
 
@@ -18,13 +27,112 @@ login_url = os.getenv("LOGIN_URL")
 chrome_path = os.getenv("CHROMEPATH")
 username = os.getenv("LINKEDIN_USER")
 password = os.getenv("LINKEDIN_PASSWORD")
+# Browser session reuse
+SESSION_REUSE = os.getenv("SESSION_REUSE", "1") == "1"
+SESSION_PATH = os.getenv("SESSION_PATH", os.path.join(os.path.expanduser("~"), ".linkedin_curator", "session.json"))
+LOGGED_OUT_URL_PARTS = ["/login", "/authwall", "/checkpoint", "/uas/"] # where LinkedIn sends a visitor without a valid session
+login_lock = threading.Lock() # one login form at a time, the sessions started meanwhile restore its cookies
+# Lean browser profile
+LEAN_BROWSER = os.getenv("LEAN_BROWSER", "1") == "1" # block the resources the scraper never reads
+PAGE_LOAD_STRATEGY = os.getenv("PAGE_LOAD_STRATEGY", "eager") # of the lean browser, "eager" stops waiting at DOMContentLoaded
+BLOCKED_RESOURCE_EXTENSIONS = ["jpg", "jpeg", "png", "gif", "webp", "ico", # images, only their src is read
+                               "woff", "woff2", "ttf", "otf", # fonts
+                               "mp4", "webm", "m3u8", "mp3"] # media
+# Chrome matches a pattern against the whole url with * as the only wildcard, so every extension also needs its ?query form
+BLOCKED_RESOURCE_PATTERNS = [pattern for extension in BLOCKED_RESOURCE_EXTENSIONS for pattern in (f"*.{extension}", f"*.{extension}?*")] + \
+                            ["*licdn.com/dms/image/*", "*licdn.com/playlist/*"] # LinkedIn images and videos have no extension, on media.licdn.com, media-exp1.licdn.com...
+BLOCKED_HOSTS = ["doubleclick.net", "google-analytics.com", "googletagmanager.com", "px.ads.linkedin.com", "snap.licdn.com",
+                 "bat.bing.com", "connect.facebook.net", "demdex.net"] + [host for host in os.getenv("BLOCKED_HOSTS", "").split(",") if host]
+LEAN_BROWSER_ARGUMENTS = ["--blink-settings=imagesEnabled=false", "--autoplay-policy=user-gesture-required", "--mute-audio",
+                          "--disable-extensions", "--disable-gpu", "--disable-notifications", "--disable-sync", "--disable-default-apps",
+                          "--disable-background-networking", "--disable-component-update", "--no-first-run", "--no-default-browser-check",
+                          "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication"]
 # Logger
 logger = None
+log_listener = None
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)) # size of a log file before it is rotated
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+LOG_MAX_PAYLOAD = int(os.getenv("LOG_MAX_PAYLOAD", 2000)) # characters kept of the message and of each field of an event
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000)) # events waiting for the writer before new ones are dropped
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "") # e.g. "record_inserted=0.01,clean_records=0.1"
+# Page readiness
+PAGE_LOAD_TIMEOUT = float(os.getenv("PAGE_LOAD_TIMEOUT", 5))
+PAGE_POLL_INTERVAL = float(os.getenv("PAGE_POLL_INTERVAL", 0.1))
+PAGE_SETTLE_POLLS = 2
+CONTAINER_SELECTOR = "div.ember-view.occludable-update"
+CONTAINER_CLASS = "ember-view occludable-update"
+# Page fetch retries
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", 3)) # attempts after a failed page load
+FETCH_BACKOFF_BASE = float(os.getenv("FETCH_BACKOFF_BASE", 2)) # longest wait in seconds before the first retry, doubled at every retry
+FETCH_BACKOFF_MAX = float(os.getenv("FETCH_BACKOFF_MAX", 60))
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", 5)) # failed authors in a row before no more pages are loaded
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", 300)) # seconds before one author is tried again
+circuit_breaker = None
+# Page parsing
+PARSE_BACKEND = os.getenv("PARSE_BACKEND", "html.parser") # "lxml" only builds the feed containers with the C parser
+PARSE_BACKENDS = ("html.parser", "lxml")
+EXTRACT_MODE = os.getenv("EXTRACT_MODE", "soup") # "script" extracts the posts inside the browser instead of copying the page
+EXTRACT_MODES = ("soup", "script")
+# Scraper pool
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", 1)) # browser sessions scraping authors in parallel
+SCRAPER_MIN_INTERVAL = float(os.getenv("SCRAPER_MIN_INTERVAL", 0)) # minimum seconds between two page loads of the same session
+# Feed scrolling
+SCROLL_PAUSE_TIME = float(os.getenv("SCROLL_PAUSE_TIME", 3))
+SCROLL_MAX_DEPTH = int(os.getenv("SCROLL_MAX_DEPTH", 0)) # 0 only reads the first screen of the feed
+# Dimension cache
+dimension_cache = None
+DATE_DIMENSION_YEARS_AHEAD = int(os.getenv("DATE_DIMENSION_YEARS_AHEAD", 5))
+DATE_DIMENSION_PREPOPULATED = os.getenv("DATE_DIMENSION_PREPOPULATED", "0") == "1" # date_key is then a pure computation
+# Connection pool
+connection_pool = None
+connection_pool_lock = threading.Lock()
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1)) # opened up front, the others on demand
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 5)) # also the connections kept open between checkouts
+DB_POOL_HEALTH_CHECK_AFTER = float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", 30)) # idle seconds before a connection is checked
+# Streaming pipeline
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 4)) # authors waiting between two stages before the previous stage waits
+PIPELINE_CLEAN_CONCURRENCY = int(os.getenv("PIPELINE_CLEAN_CONCURRENCY", 1)) # authors cleaned at once by the asyncio pipeline
+PIPELINE_INGEST_CONCURRENCY = int(os.getenv("PIPELINE_INGEST_CONCURRENCY", 2)) # authors ingested at once by the asyncio pipeline
+# Staged raw records, written as authors are scraped and replayed by clean/ingest runs
+STAGING_PATH = os.getenv("STAGING_PATH") # folder of the staging files, staging/ by default
+STAGE_RAW_RECORDS = os.getenv("STAGE_RAW_RECORDS", "1") == "1" # also stage the raw records of full runs
+# Bulk ingestion
+BULK_PAGE_SIZE = int(os.getenv("BULK_PAGE_SIZE", 500))
+# Incremental scrape: skip posts already stored in posts_fact
+INCREMENTAL_SCRAPE = os.getenv("INCREMENTAL_SCRAPE", "0") == "1"
+# Author scheduling
+SCHEDULE_AUTHORS = os.getenv("SCHEDULE_AUTHORS", "0") == "1" # only scrape the authors likely to have new posts
+SCHEDULE_PATH = os.getenv("SCHEDULE_PATH", os.path.join(os.path.expanduser("~"), ".linkedin_curator", "schedule.json"))
+SCHEDULE_PAGE_BUDGET = int(os.getenv("SCHEDULE_PAGE_BUDGET", 0)) # author pages loaded per run, 0 for no limit
+SCHEDULE_WINDOW_DAYS = int(os.getenv("SCHEDULE_WINDOW_DAYS", 28)) # posting history used to estimate the posting rate
+SCHEDULE_MIN_INTERVAL_DAYS = float(os.getenv("SCHEDULE_MIN_INTERVAL_DAYS", 1))
+SCHEDULE_MAX_INTERVAL_DAYS = float(os.getenv("SCHEDULE_MAX_INTERVAL_DAYS", 14))
+# Run checkpoints
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", os.path.join(os.path.expanduser("~"), ".linkedin_curator", "checkpoints.json"))
+CHECKPOINT_WINDOW_HOURS = float(os.getenv("CHECKPOINT_WINDOW_HOURS", 12)) # authors completed this recently are skipped by --resume
+# Run metrics
+metrics = None
+METRICS_PATH = os.getenv("METRICS_PATH") # path of the metrics files without extension, logs/metrics by default
+SESSION_RESTORE_STAGE = "session_restore"
+SESSION_LOGIN_STAGE = "session_login"
+PAGE_FETCH_STAGE = "page_fetch"
+READINESS_WAIT_STAGE = "readiness_wait"
+HTML_PARSE_STAGE = "html_parse"
+SCRIPT_EXTRACTION_STAGE = "script_extraction"
+FIELD_EXTRACTION_STAGE = "field_extraction"
+SCRAPE_STAGE = "scrape"
+CLEANING_STAGE = "cleaning"
+DIMENSION_LOOKUP_STAGE = "dimension_lookup"
+INGEST_STAGE = "ingest"
 # Run types
 AUTHOR_RT = "author"
 DATE_RT = "date"
 POST_RT = "post"
 INGEST_RT = "ingest"
+STREAM_RT = "stream"
+ASYNC_RT = "async"
+SCRAPE_RT = "scrape"
+STAGED_RT = "staged"
 # Tables
 AUTHOR_TABLE = "author_dimension"
 DATE_TABLE = "date_dimension"
@@ -32,27 +140,130 @@ POST_TABLE = "posts_fact"
 
 #--------------- Logging utilities ---------------#
 
+class JsonFormatter(logging.Formatter):
+    '''Format a log record as one JSON event, truncating the message and the fields to LOG_MAX_PAYLOAD characters.
+    '''
+    def format(self, record: logging.LogRecord) -> str:
+        event = {"time": self.formatTime(record),
+                 "level": record.levelname,
+                 "logger": record.name,
+                 "event": getattr(record, "event", "message"),
+                 "message": truncate_payload(record.getMessage())}
+        for name, value in getattr(record, "fields", {}).items():
+            event[name] = value if isinstance(value, (int, float, bool)) or value is None else truncate_payload(value)
+        if record.exc_info:
+            event["exception"] = truncate_payload(self.formatException(record.exc_info))
+
+        return json.dumps(event)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    '''Hand log records to the background writer without formatting them and without ever waiting.
+    Records are dropped, and counted, while LOG_QUEUE_SIZE records are already waiting.
+    '''
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record # Formatting is left to the writer thread
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.queue.qsize() >= LOG_QUEUE_SIZE:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+def truncate_payload(value, max_length: int = None) -> str:
+    '''Return the text of a log payload cut to max_length characters.
+    :param value: any object, formatted with str
+    :param max_length: LOG_MAX_PAYLOAD by default
+    '''
+    if max_length is None:
+        max_length = LOG_MAX_PAYLOAD
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= max_length:
+        return text
+    return text[:max_length] + f"... ({len(text) - max_length} more characters)"
+
+
+def parse_sample_rates(sample_rates: str) -> dict:
+    '''Parse "event=rate,event=rate" into {event: rate}.
+    :param sample_rates:
+    '''
+    rates = {}
+    for item in sample_rates.split(","):
+        if "=" in item:
+            event, rate = item.split("=", 1)
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+sample_rates = parse_sample_rates(LOG_SAMPLE_RATES)
+
+
 def create_log(path=None):
     '''Create a log file with default level at INFO.
+    Records are written as JSON events by a background thread, into files rotated every LOG_MAX_BYTES.
     '''
-    global logger
+    global logger, log_listener
 
     if logger is not None:
         return logger
 
     if path is None:
-        path = get_log_file_path()
+        path = os.environ.get("LOGFILE") or get_log_file_path()
+
+    handler = RotatingFileHandler(os.environ.get("LOGFILE", path), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    handler.setFormatter(JsonFormatter())
+    log_queue = queue.Queue()
+    log_listener = QueueListener(log_queue, handler)
+    log_listener.start()
+    atexit.register(close_log)
 
-    handler = WatchedFileHandler(os.environ.get("LOGFILE", path))
-    formatter = logging.Formatter(logging.BASIC_FORMAT)
-    handler.setFormatter(formatter)
     logger = logging.getLogger("PipelineLog")
-    logger.addHandler(handler)
+    logger.addHandler(NonBlockingQueueHandler(log_queue))
     logger.setLevel(logging.INFO)
 
     return logger
 
 
+def close_log():
+    '''Write the waiting log records and stop the background writer.
+    '''
+    global logger, log_listener
+
+    if log_listener is not None:
+        log_listener.stop()
+        for handler in log_listener.handlers:
+            handler.close()
+        log_listener = None
+    if logger is not None:
+        for handler in list(logger.handlers):
+            if isinstance(handler, NonBlockingQueueHandler):
+                logger.removeHandler(handler)
+        logger = None
+
+
+def log_event(event: str, level: int = logging.INFO, sample_rate: float = None, **fields) -> bool:
+    '''Log a structured event, formatted lazily by the background writer. Return True if the event was logged.
+    :param event: name of the event
+    :param level:
+    :param sample_rate: share of the events logged, from LOG_SAMPLE_RATES or 1 by default
+    :param fields: payload of the event, each field is truncated to LOG_MAX_PAYLOAD characters
+    '''
+    if sample_rate is None:
+        sample_rate = sample_rates.get(event, 1.0)
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return False
+    event_logger = get_logger()
+    if not event_logger.isEnabledFor(level):
+        return False
+    event_logger.log(level, event, extra={"event": event, "fields": fields})
+    return True
+
+
 def get_abs_root_path():
     '''Get absoulate root path.
     '''
@@ -83,89 +294,708 @@ def get_logger():
 
 #--------------- End of Logging utilities ---------------#
 
+#--------------- Metrics utilities ---------------#
+
+class RunMetrics():
+    '''Thread-safe stage timers and counters of a pipeline run, in total and per author.
+    '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.timers = {} # stage -> {"count", "seconds", "max_seconds"}
+        self.counters = {} # counter name -> value
+        self.authors = {} # author name -> {"timers": {stage: seconds}, "counters": {counter name: value}, "failures": count}
+        self.failures = {} # author name -> error of its failed scrape
+
+    def get_author(self, author: str) -> dict:
+        return self.authors.setdefault(author, {"timers": {}, "counters": {}, "failures": 0})
+
+    def observe(self, stage: str, seconds: float, author: str = None):
+        '''Record the duration of one call of a stage.
+        :param stage: any of the *_STAGE names
+        :param seconds:
+        :param author: author name, if the call belongs to a single author
+        '''
+        with self.lock:
+            timer = self.timers.setdefault(stage, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            timer["count"] += 1
+            timer["seconds"] += seconds
+            timer["max_seconds"] = max(timer["max_seconds"], seconds)
+            if author is not None:
+                author_timers = self.get_author(author)["timers"]
+                author_timers[stage] = author_timers.get(stage, 0.0) + seconds
+
+    def increment(self, name: str, value: int = 1, author: str = None):
+        '''Add value to a counter.
+        :param name: e.g. posts_seen, posts_new, posts_skipped
+        :param value:
+        :param author: author name, if the count belongs to a single author
+        '''
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            if author is not None:
+                author_counters = self.get_author(author)["counters"]
+                author_counters[name] = author_counters.get(name, 0) + value
+
+    def record_failure(self, author: str, error: str):
+        '''Record an author that could not be scraped, for the run summary.
+        :param author: author name
+        :param error: short description of the error
+        '''
+        with self.lock:
+            self.failures[author] = error
+            self.get_author(author)["failures"] += 1
+        self.increment(name="authors_failed") # Counted per author in failures
+
+    @contextmanager
+    def time(self, stage: str, author: str = None):
+        '''Time the body of a with statement as one call of a stage.
+        :param stage:
+        :param author:
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage=stage, seconds=time.perf_counter() - start, author=author)
+
+    def to_dict(self) -> dict:
+        '''Return a JSON-serializable snapshot of the metrics.
+        '''
+        with self.lock:
+            return {"started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+                    "duration_seconds": time.time() - self.started_at,
+                    "stages": {stage: dict(timer) for stage, timer in self.timers.items()},
+                    "counters": dict(self.counters),
+                    "authors": {author: {"timers": dict(values["timers"]), "counters": dict(values["counters"]), "failures": values["failures"]}
+                                for author, values in self.authors.items()},
+                    "failures": dict(self.failures)}
+
+    def to_prometheus(self) -> str:
+        '''Return the metrics in the Prometheus text exposition format.
+        '''
+        snapshot = self.to_dict()
+        lines = ["# HELP linkedin_pipeline_run_duration_seconds Duration of the run.",
+                 "# TYPE linkedin_pipeline_run_duration_seconds gauge",
+                 f"linkedin_pipeline_run_duration_seconds {snapshot['duration_seconds']:.6f}"]
+        for metric, field, metric_type, description in [("stage_seconds_total", "seconds", "counter", "Time spent in each stage."),
+                                                        ("stage_calls_total", "count", "counter", "Number of calls of each stage."),
+                                                        ("stage_seconds_max", "max_seconds", "gauge", "Longest call of each stage.")]:
+            lines += [f"# HELP linkedin_pipeline_{metric} {description}", f"# TYPE linkedin_pipeline_{metric} {metric_type}"]
+            lines += [f'linkedin_pipeline_{metric}{{stage="{escape_label(stage)}"}} {timer[field]}' for stage, timer in snapshot["stages"].items()]
+        for name, value in snapshot["counters"].items():
+            lines += [f"# TYPE linkedin_pipeline_{name}_total counter", f"linkedin_pipeline_{name}_total {value}"]
+        lines += ["# HELP linkedin_pipeline_author_stage_seconds_total Time spent in each stage per author.",
+                  "# TYPE linkedin_pipeline_author_stage_seconds_total counter"]
+        for author, values in snapshot["authors"].items():
+            lines += [f'linkedin_pipeline_author_stage_seconds_total{{author="{escape_label(author)}",stage="{escape_label(stage)}"}} {seconds}'
+                      for stage, seconds in values["timers"].items()]
+        lines += ["# HELP linkedin_pipeline_author_counter_total Counters of each author: posts, records and page fetch retries.",
+                  "# TYPE linkedin_pipeline_author_counter_total counter"]
+        for author, values in snapshot["authors"].items():
+            lines += [f'linkedin_pipeline_author_counter_total{{author="{escape_label(author)}",counter="{escape_label(name)}"}} {value}'
+                      for name, value in values["counters"].items()]
+        lines += ["# HELP linkedin_pipeline_author_failures_total Failed scrapes of each author.",
+                  "# TYPE linkedin_pipeline_author_failures_total counter"]
+        lines += [f'linkedin_pipeline_author_failures_total{{author="{escape_label(author)}"}} {values["failures"]}'
+                  for author, values in snapshot["authors"].items() if values["failures"] > 0]
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str = None) -> list:
+        '''Write the metrics to path.json and path.prom. Return the paths of the files.
+        :param path: path without extension, METRICS_PATH or logs/metrics by default
+        '''
+        if path is None:
+            path = METRICS_PATH or os.path.join(get_abs_root_path(), r"../logs/", "metrics")
+        folder_path = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(folder_path):
+            os.makedirs(folder_path)
+
+        with open(path + ".json", 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        with open(path + ".prom", 'w') as f:
+            f.write(self.to_prometheus())
+
+        return [path + ".json", path + ".prom"]
+
+
+def escape_label(value: str) -> str:
+    '''Escape a Prometheus label value.
+    :param value:
+    '''
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def get_metrics() -> RunMetrics:
+    '''Return the metrics of the current run.
+    '''
+    global metrics
+    if metrics is None:
+        metrics = RunMetrics()
+    return metrics
+
+
+def reset_metrics() -> RunMetrics:
+    '''Start the metrics of a new run.
+    '''
+    global metrics
+    metrics = RunMetrics()
+    return metrics
+
+
+def log_run_summary():
+    '''Log the scraped, failed and ingested counts of the run and every failed author.
+    '''
+    snapshot = get_metrics().to_dict()
+    counters = snapshot["counters"]
+    get_logger().info(f"> Run summary: {counters.get('authors_scraped', 0)} authors scraped, {len(snapshot['failures'])} failed, "
+                      f"{counters.get('records_inserted', 0)} records inserted, {counters.get('records_skipped', 0)} existing records skipped.")
+    for author, error in snapshot["failures"].items():
+        get_logger().warning(f"> Failed author {author}: {error}")
+
+
+def write_metrics(path: str = None) -> list:
+    '''Write the metrics of the current run, see RunMetrics.write. Return the paths of the files.
+    :param path:
+    '''
+    try:
+        paths = get_metrics().write(path=path)
+        get_logger().info(f"> Wrote the run metrics to {', '.join(paths)}.")
+        return paths
+    except:
+        get_logger().error("Error while writing the run metrics : " + " Error: " + str(sys.exc_info()[0]))
+        return []
+
+#--------------- End of Metrics utilities ---------------#
+
 #--------------- Scraping utilities ---------------#
 
+def create_driver_options(lean: bool = None):
+    '''Return the options of a headless Chrome, with the lean profile if enabled.
+    :param lean: LEAN_BROWSER by default
+    '''
+    from selenium import webdriver
+
+    lean = lean if lean is not None else LEAN_BROWSER
+    options = webdriver.ChromeOptions()
+    options.add_argument("headless")
+    if lean:
+        for argument in LEAN_BROWSER_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2,
+                                                  "profile.managed_default_content_settings.media_stream": 2,
+                                                  "profile.default_content_setting_values.notifications": 2})
+        options.page_load_strategy = PAGE_LOAD_STRATEGY
+    return options
+
+
+def get_blocked_url_patterns() -> list:
+    '''Return the url patterns the lean browser does not load: images, fonts, media and third-party hosts.
+    '''
+    return BLOCKED_RESOURCE_PATTERNS + [f"*://*{host}/*" for host in BLOCKED_HOSTS]
+
+
+def block_resources(driver, patterns: list = None):
+    '''Make the browser fail every request matching a blocked url pattern without sending it.
+    :param driver:
+    :param patterns: get_blocked_url_patterns() by default
+    '''
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns if patterns is not None else get_blocked_url_patterns()})
+
+
+def create_driver(lean: bool = None):
+    '''Start a headless Chrome.
+    :param lean: block the resources the scraper never reads, LEAN_BROWSER by default
+    '''
+    from selenium import webdriver
+
+    lean = lean if lean is not None else LEAN_BROWSER
+    driver = webdriver.Chrome(executable_path=chrome_path, options=create_driver_options(lean=lean))
+    if lean:
+        block_resources(driver=driver)
+    return driver
+
+
+def get_site_url(path: str = "/") -> str:
+    '''Return a url of the LinkedIn site that login_url belongs to.
+    :param path:
+    '''
+    return urljoin(login_url, path)
+
+
+def write_json_file(path: str, data):
+    '''Replace a JSON file at once, readable by the current user only.
+    :param path:
+    :param data:
+    '''
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+        json.dump(data, f)
+    os.replace(temporary_path, path) # Readers in parallel never see a half-written file
+
+
+def save_session(driver, path: str = None):
+    '''Save the cookies of an authenticated browser, readable by the current user only.
+    :param driver:
+    :param path: SESSION_PATH by default
+    '''
+    if path is None:
+        path = SESSION_PATH
+    try:
+        folder_path = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(folder_path):
+            os.makedirs(folder_path, mode=0o700)
+        write_json_file(path=path, data={"saved_at": time.time(), "cookies": driver.get_cookies()})
+        get_logger().info(f"> Saved the browser session to {path}.")
+    except:
+        get_logger().error(f"Error while saving the browser session to {path} : " + " Error: " + str(sys.exc_info()[0]))
+
+
+def is_logged_out_url(url: str) -> bool:
+    '''Return True if url is one of the pages LinkedIn sends a browser without a valid session to.
+    :param url:
+    '''
+    return any(part in url for part in LOGGED_OUT_URL_PARTS)
+
+
+def is_session_valid(driver) -> bool:
+    '''Open the feed and return True if LinkedIn did not send the browser to a login page.
+    :param driver:
+    '''
+    driver.get(get_site_url("/feed/"))
+    return not is_logged_out_url(driver.current_url)
+
+
+def get_session_saved_at(path: str = None) -> int:
+    '''Return the modification time in nanoseconds of the saved session, None if there is none.
+    :param path: SESSION_PATH by default
+    '''
+    if path is None:
+        path = SESSION_PATH
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def restore_session(driver, path: str = None) -> bool:
+    '''Load the saved cookies into a new browser. Return True if the restored session is still valid.
+    :param driver:
+    :param path: SESSION_PATH by default
+    '''
+    if path is None:
+        path = SESSION_PATH
+    if not os.path.isfile(path):
+        return False
+    try:
+        with open(path) as f:
+            session = json.load(f)
+        driver.get(get_site_url("/")) # Cookies can only be added to the current domain
+        for cookie in session["cookies"]:
+            if cookie.get("sameSite") not in ("Strict", "Lax", "None"):
+                cookie.pop("sameSite", None)
+            driver.add_cookie(cookie)
+        return is_session_valid(driver=driver)
+    except:
+        get_logger().error(f"Error while restoring the browser session from {path} : " + " Error: " + str(sys.exc_info()[0]))
+        return False
+
+
+def submit_login_form(driver):
+    '''Log in through the username and password form.
+    :param driver:
+    '''
+    from selenium.webdriver.common.by import By
+
+    driver.get(login_url)
+    elementID = driver.find_element(By.ID, "username")
+    elementID.send_keys(username)
+    elementID = driver.find_element(By.ID, "password")
+    elementID.send_keys(password)
+    elementID.submit()
+
+
 def login_linkedin():
-    '''Login
+    '''Start a browser logged in LinkedIn, from the saved session if it is still valid, through the login form otherwise.
+    Safe to call from parallel threads: only one of them submits the login form, the others wait and restore its saved session.
     '''
+    driver = None
     try:
-        options = webdriver.ChromeOptions()
-        options.add_argument("headless")
-        driver = webdriver.Chrome(executable_path=chrome_path, options=options)
-        driver.get(login_url)
-        elementID = driver.find_element(By.ID, "username")
-        elementID.send_keys(username)
-        elementID = driver.find_element(By.ID, "password")
-        elementID.send_keys(password)
-        elementID.submit()
-        get_logger().info("Successfully log in LinkedIn account with username: " + username)
+        start = time.perf_counter()
+        driver = create_driver()
+        saved_at = get_session_saved_at()
+        restored = SESSION_REUSE and restore_session(driver=driver)
+        if not restored:
+            with login_lock:
+                # Another browser may have logged in and saved a new session while this one was waiting
+                restored = SESSION_REUSE and get_session_saved_at() != saved_at and restore_session(driver=driver)
+                if not restored:
+                    submit_login_form(driver=driver)
+                    if SESSION_REUSE:
+                        save_session(driver=driver)
+        if restored:
+            seconds = time.perf_counter() - start
+            get_metrics().observe(stage=SESSION_RESTORE_STAGE, seconds=seconds)
+            get_logger().info(f"> Restored the LinkedIn session of {username} in {seconds:.2f}s.")
+            return driver
+
+        seconds = time.perf_counter() - start
+        get_metrics().observe(stage=SESSION_LOGIN_STAGE, seconds=seconds)
+        get_logger().info(f"Successfully log in LinkedIn account with username: {username} in {seconds:.2f}s.")
         return driver
     except Exception as e:
-        get_logger().error(e)
-        # get_logger().error(f"Error while logging in Linkedin account {username}: "  + " Error: " + str(sys.exc_info()[0]))
-
-
-def infinite_scroll(driver):
-    '''TODO: this is not working right now.
-    '''
-    #Simulate scrolling to capture all posts
-    SCROLL_PAUSE_TIME = 3
-    # Get scroll height
-    last_height = driver.execute_script("return document.body.scrollHeight")
-
-    while True:
-        # Scroll down to bottom
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        # Wait to load page
-        time.sleep(SCROLL_PAUSE_TIME)
-        # Calculate new scroll height and compare with last scroll height
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
-            break
-        last_height = new_height
+        get_logger().error(f"Error while logging in Linkedin account {username}: "  + " Error: " + str(sys.exc_info()[0]))
+        if driver is not None:
+            try:
+                driver.quit() # Never leave a browser running behind a failed login
+            except:
+                get_logger().error("Error while closing the browser of a failed login : " + " Error: " + str(sys.exc_info()[0]))
+        raise
+
+
+def get_page_state(driver) -> tuple:
+    '''Return the number of feed containers and the number of DOM elements of the current page.
+    :param driver:
+    '''
+    containers_count, elements_count = driver.execute_script(
+        f"return [document.querySelectorAll('{CONTAINER_SELECTOR}').length, document.getElementsByTagName('*').length];")
+    return containers_count, elements_count
+
+
+def wait_for_page_ready(driver, timeout: float = None, min_containers: int = 0) -> float:
+    '''Wait until more than min_containers feed containers are present and the DOM has stopped changing.
+    Return the number of seconds waited, which is at most timeout.
+    :param driver:
+    :param timeout: upper bound of the wait in seconds, PAGE_LOAD_TIMEOUT by default
+    :param min_containers: number of containers already on the page before the wait
+    '''
+    if timeout is None:
+        timeout = PAGE_LOAD_TIMEOUT
+    start = time.monotonic()
+    last_elements_count = None
+    stable_polls = 0
+
+    while time.monotonic() - start < timeout:
+        try:
+            containers_count, elements_count = get_page_state(driver=driver)
+        except:
+            containers_count, elements_count = 0, None
+        if containers_count > min_containers and elements_count == last_elements_count:
+            stable_polls += 1
+            if stable_polls >= PAGE_SETTLE_POLLS:
+                break
+        else:
+            stable_polls = 0
+        last_elements_count = elements_count
+        time.sleep(PAGE_POLL_INTERVAL)
+
+    return time.monotonic() - start
+
+
+def record_page_wait(url: str, seconds: float, author: str = None):
+    '''Record the time waited for a page to be ready.
+    :param url:
+    :param seconds:
+    :param author: author name of the page, if any
+    '''
+    get_metrics().observe(stage=READINESS_WAIT_STAGE, seconds=seconds, author=author)
+    get_logger().info(f"> Page {url} was ready after {seconds:.2f}s.")
+
 
+def scroll_feed(driver, containers_count: int, timeout: float = None) -> bool:
+    '''Scroll to the bottom of the feed once and wait for more posts. Return True if new posts were loaded.
+    :param driver:
+    :param containers_count: number of containers loaded before scrolling
+    :param timeout: upper bound of the wait in seconds, SCROLL_PAUSE_TIME by default
+    '''
+    if timeout is None:
+        timeout = SCROLL_PAUSE_TIME
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    wait_for_page_ready(driver=driver, timeout=timeout, min_containers=containers_count)
+    return get_page_state(driver=driver)[0] > containers_count
+
+
+def parse_page(html: str, backend: str = None, author: str = None) -> BeautifulSoup:
+    '''Return a BeautifulSoup object of a page source.
+    With the lxml backend only the feed containers are kept, the rest of the page is not built.
+    :param html:
+    :param backend: any of PARSE_BACKENDS, PARSE_BACKEND by default
+    :param author: author name of the page, if any
+    '''
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    backend = backend or PARSE_BACKEND
+    if backend not in PARSE_BACKENDS:
+        raise ValueError(f"Unknown parse backend {backend}, expected one of {', '.join(PARSE_BACKENDS)}")
+
+    with get_metrics().time(stage=HTML_PARSE_STAGE, author=author):
+        if backend == "lxml":
+            return BeautifulSoup(html, 'lxml', parse_only=SoupStrainer("div", {"class":CONTAINER_CLASS}))
+        return BeautifulSoup(html,'html.parser')
+
+
+def get_backoff_delay(attempt: int, base: float = None, max_delay: float = None) -> float:
+    '''Return a random wait before the retry following a failed attempt, up to base * 2 ** attempt seconds.
+    The jitter keeps parallel sessions from retrying at the same time.
+    :param attempt: number of the failed attempt, from 0
+    :param base: FETCH_BACKOFF_BASE by default
+    :param max_delay: FETCH_BACKOFF_MAX by default
+    '''
+    base = base if base is not None else FETCH_BACKOFF_BASE
+    max_delay = max_delay if max_delay is not None else FETCH_BACKOFF_MAX
+    return random.uniform(0, min(max_delay, base * 2 ** attempt))
+
+
+class PageLoadError(RuntimeError):
+    '''An author page did not load: every attempt failed, or LinkedIn sent the browser to a login page.
+    Only these failures are counted by the circuit breaker, an author without posts is not one.
+    '''
 
-def create_soup(driver, url: str) -> BeautifulSoup:
+
+def load_page(driver, url: str, retries: int = None, author: str = None):
+    '''Open a page, retried with jittered exponential backoff, and wait for its feed to render, at most PAGE_LOAD_TIMEOUT seconds.
+    Raise PageLoadError with the error of the last attempt if every attempt failed, or if LinkedIn sent the browser to a login page.
+    :param driver:
+    :param url:
+    :param retries: attempts after a failed one, FETCH_RETRIES by default
+    :param author: author name of the page, if any
+    '''
+    retries = retries if retries is not None else FETCH_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            with get_metrics().time(stage=PAGE_FETCH_STAGE, author=author):
+                driver.get(url)
+            break
+        except Exception as e:
+            if attempt == retries:
+                raise PageLoadError(f"{type(e).__name__}: {e}") from e
+            delay = get_backoff_delay(attempt=attempt)
+            get_metrics().increment(name="page_fetch_retries", author=author)
+            log_event("page_fetch_retry", level=logging.WARNING, url=url, attempt=attempt + 1, delay=round(delay, 2), error=f"{type(e).__name__}: {e}")
+            time.sleep(delay)
+    if is_logged_out_url(driver.current_url):
+        raise PageLoadError(f"Redirected to {driver.current_url}, the session is logged out")
+    record_page_wait(url=url, seconds=wait_for_page_ready(driver=driver), author=author)
+
+
+def create_soup(driver, url: str, author: str = None) -> BeautifulSoup:
     '''Return a BeautifulSoup object.
     :param driver:
     :param url: the url that we want to scrape
+    :param author: author name of the page, if any
     '''
     try:
-        # infinite_scroll(driver=driver) # Not working
-        driver.get(url)
-        # Wait to load page
-        time.sleep(5)
+        load_page(driver=driver, url=url, author=author)
         html = driver.page_source
-        soup = BeautifulSoup(html,'html.parser')
+        soup = parse_page(html, author=author)
         # soup.prettify()
     except:
-        # get_logger().error(e)
         get_logger().error(f"Error while creating BeautifulSoup object for url {url}: "  + " Error: " + str(sys.exc_info()[0]))
+        raise
 
     return soup
 
+
+class CircuitBreaker():
+    '''Stop loading pages after threshold failed authors in a row, then let one author through every cooldown seconds.
+    '''
+    def __init__(self, threshold: int = None, cooldown: float = None):
+        '''
+        :param threshold: CIRCUIT_BREAKER_THRESHOLD by default
+        :param cooldown: CIRCUIT_BREAKER_COOLDOWN by default
+        '''
+        self.threshold = threshold if threshold is not None else CIRCUIT_BREAKER_THRESHOLD
+        self.cooldown = cooldown if cooldown is not None else CIRCUIT_BREAKER_COOLDOWN
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self) -> bool:
+        '''Return True if the next author may be scraped.
+        '''
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                self.opened_at = time.monotonic() # Only one trial per cooldown
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                get_logger().info("> Closed the circuit breaker, pages load again.")
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                get_metrics().increment(name="circuit_breaker_opened")
+                get_logger().warning(f"> Opened the circuit breaker after {self.failures} failed authors in a row, retrying in {self.cooldown:.0f}s.")
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    '''Return the process-wide circuit breaker of the page loads.
+    '''
+    global circuit_breaker
+    if circuit_breaker is None:
+        circuit_breaker = CircuitBreaker()
+    return circuit_breaker
+
 #--------------- End of Scraping utilities ---------------#
 
 
-def create_postgres_connection(user: str, password: str, host: str, port: str, database: str) -> psycopg2.extensions.connection:
-    '''Create a connection to PostgresSQL database
-    :param user:
-    :param password:
-    :param host:
-    :param port:
-    :param database:
+class ConnectionPool():
+    '''Thread-safe pool of PostgreSQL connections.
+    min_size connections are opened up front, the others on demand up to max_size, and every returned
+    connection is kept open for the next checkout. A connection is checked before it is handed out.
+    '''
+    def __init__(self, min_size: int, max_size: int, **connect_kwargs):
+        '''
+        :param min_size: connections opened up front
+        :param max_size: maximum open connections, callers wait for a free one above it
+        :param connect_kwargs: arguments of psycopg2.connect
+        '''
+        self.max_size = max_size
+        self.connect_kwargs = connect_kwargs
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.idle = [] # (connection, time it was returned), the most recently returned last
+        for i in range(min(min_size, max_size)):
+            self.idle.append((self.connect(), None))
+
+    def connect(self) -> psycopg2.extensions.connection:
+        import psycopg2
+
+        return psycopg2.connect(**self.connect_kwargs)
+
+    def getconn(self) -> psycopg2.extensions.connection:
+        '''Wait for a free connection and return it, replacing every broken idle connection found on the way.
+        '''
+        self.slots.acquire()
+        try:
+            while True:
+                with self.lock:
+                    if len(self.idle) == 0:
+                        break
+                    connection, returned_at = self.idle.pop()
+                idle_seconds = time.monotonic() - returned_at if returned_at is not None else None
+                if is_connection_alive(connection=connection, idle_seconds=idle_seconds):
+                    return connection
+                get_logger().info("> Replaced a broken pooled PostgreSQL connection.")
+                close_quietly(connection=connection)
+            return self.connect()
+        except:
+            self.slots.release()
+            raise
+
+    def putconn(self, connection: psycopg2.extensions.connection):
+        '''Return a checked out connection, rolled back if it is still in a transaction.
+        :param connection:
+        '''
+        from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+        try:
+            if not connection.closed and connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                connection.rollback() # Never hand out a connection in the middle of a transaction
+        except:
+            close_quietly(connection=connection)
+        finally:
+            with self.lock:
+                if not connection.closed:
+                    self.idle.append((connection, time.monotonic()))
+            self.slots.release()
+
+    def closeall(self):
+        '''Close the idle connections, the checked out ones are closed when they are returned.
+        '''
+        with self.lock:
+            for connection, returned_at in self.idle:
+                close_quietly(connection=connection)
+            self.idle = []
+
+
+def close_quietly(connection: psycopg2.extensions.connection):
+    '''Close a connection that may already be broken.
+    :param connection:
     '''
     try:
-        connection = psycopg2.connect(user=user,
-                                      password=password,
-                                      host=host,
-                                      port=port,
-                                      database=database)
-        get_logger().info("> PostgreSQL connection is created.\n")
+        connection.close()
     except:
-        get_logger().error("Error while connecting to PostgreSQL database : " + " Error: " + str(sys.exc_info()[0]))
+        pass
+
+
+def create_connection_pool(user: str = None, password: str = None, host: str = None, port: str = None, database: str = None,
+                           min_size: int = None, max_size: int = None) -> ConnectionPool:
+    '''Create the process-wide PostgreSQL connection pool, or return it if it already exists.
+    Credentials default to the DB_USER, PASSWORD, HOST, PORT and DATABASE environment variables.
+    :param min_size: connections opened up front, DB_POOL_MIN_SIZE by default
+    :param max_size: maximum open connections, DB_POOL_MAX_SIZE by default
+    '''
+    global connection_pool
+
+    with connection_pool_lock:
+        if connection_pool is None:
+            min_size = min_size if min_size is not None else DB_POOL_MIN_SIZE
+            max_size = max_size if max_size is not None else DB_POOL_MAX_SIZE
+            connection_pool = ConnectionPool(min_size, max_size,
+                                             user=user or os.getenv("DB_USER"),
+                                             password=password or os.getenv("PASSWORD"),
+                                             host=host or os.getenv("HOST"),
+                                             port=port or os.getenv("PORT"),
+                                             database=database or os.getenv("DATABASE"))
+            get_logger().info(f"> PostgreSQL connection pool is created with {min_size} to {max_size} connections.\n")
+
+    return connection_pool
+
+
+def close_connection_pool():
+    '''Close every connection of the process-wide pool.
+    '''
+    global connection_pool
 
-    return connection
+    with connection_pool_lock:
+        if connection_pool is not None:
+            connection_pool.closeall()
+            connection_pool = None
+            get_logger().info("> PostgreSQL connection pool is closed.")
+
+
+def is_connection_alive(connection: psycopg2.extensions.connection, idle_seconds: float = None) -> bool:
+    '''Return True if a pooled connection can still be used.
+    Connections idle for less than DB_POOL_HEALTH_CHECK_AFTER seconds are trusted without a round trip.
+    :param connection:
+    :param idle_seconds: seconds since the connection was returned to the pool, None if it was just opened
+    '''
+    if connection.closed:
+        return False
+    if idle_seconds is None or idle_seconds < DB_POOL_HEALTH_CHECK_AFTER:
+        return True # Just opened or recently used
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        connection.rollback()
+        return True
+    except:
+        return False
+
+
+@contextmanager
+def pooled_connection():
+    '''Check out a healthy connection from the process-wide pool and return it on exit.
+    Waits for a free connection when all of them are checked out.
+    '''
+    pool = create_connection_pool()
+    connection = pool.getconn()
+    try:
+        yield connection
+    finally:
+        pool.putconn(connection)
 
 
 def get_table_name(run_type: str):
@@ -199,30 +1029,64 @@ def get_attribute_values(connection: psycopg2.extensions.connection, run_type: s
         get_logger().error(f"Error while getting values of {fields} in {run_type} run type: " + " Error: " + str(sys.exc_info()[0]))
 
 
+def compute_date_key(date: datetime = None) -> str:
+    '''Return the date_key of a given date, today by default.
+    :param date:
+    '''
+    if date is None:
+        date = datetime.now()
+    return date.strftime("%Y%m%d")
+
+
+def build_date_dimension_row(date: datetime) -> tuple:
+    '''Build the date_dimension row of a given date.
+    :param date:
+    '''
+    date_key = compute_date_key(date=date)
+    calendar_month = date.strftime("%B")
+    full_date_des = f"{calendar_month} {date.strftime('%d')}, {date.year}"
+    calendar_quarter = f"Q{(date.month - 1)//3 + 1}"
+    weekday_indicator = "Weekday" if date.weekday() < 5 else "Weekend"
+
+    return (date_key, date_key, full_date_des, date.strftime("%A"), calendar_month, calendar_quarter, str(date.year), weekday_indicator)
+
+
 def build_date_dimension_values():
     '''Build values for an insertion into date_dimension table.
     '''
-    current_day = datetime.now().strftime("%d")
-    current_month = datetime.now().strftime("%m")
-    calendar_year = datetime.now().strftime("%Y")
-    current_date = f"{calendar_year}{current_month}{current_day}" # also date_key
-    calendar_month = datetime.now().strftime("%B")
-    day_of_week = datetime.now().strftime("%A")
-    full_date_des = f"{calendar_month} {current_day}, {calendar_year}"
-    calendar_quarter = f"Q{int(current_month)//3 + 1}"
-    
-    if day_of_week in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]:
-        weekday_indicator = "Weekday"
-    else:
-        weekday_indicator = "Weekend"
+    return build_date_dimension_row(date=datetime.now())
 
-    return (current_date, current_date, full_date_des, day_of_week, calendar_month, calendar_quarter, calendar_year, weekday_indicator)
+
+def build_date_dimension_range(start_date: datetime, end_date: datetime) -> list:
+    '''Build the date_dimension rows of every day from start_date to end_date included.
+    :param start_date:
+    :param end_date:
+    '''
+    return [build_date_dimension_row(date=start_date + timedelta(days=n)) for n in range((end_date - start_date).days + 1)]
+
+
+def populate_date_dimension(connection: psycopg2.extensions.connection, start_date: datetime = None, end_date: datetime = None) -> list:
+    '''Bulk load the date_dimension rows of a date range in a single statement, skipping the existing dates.
+    Return the date keys of the range.
+    :param connection: an established connection to the server
+    :param start_date: today by default
+    :param end_date: DATE_DIMENSION_YEARS_AHEAD years after start_date by default
+    '''
+    if start_date is None:
+        start_date = datetime.now()
+    if end_date is None:
+        end_date = start_date + timedelta(days=365 * DATE_DIMENSION_YEARS_AHEAD)
+    rows = build_date_dimension_range(start_date=start_date, end_date=end_date)
+    run_bulk_insert_query(connection=connection, run_type=DATE_RT, records_to_insert=rows, page_size=len(rows))
+    get_logger().info(f"> Populated date_dimension from {rows[0][0]} to {rows[-1][0]}.")
+
+    return [row[0] for row in rows]
 
 
 def get_date_key(connection: psycopg2.extensions.connection):
     '''Get date_key for the current date.
     '''
-    current_date = datetime.now().strftime("%Y%m%d")
+    current_date = compute_date_key()
     try:
         queried_date_keys = run_select_query(connection=connection,
                                              run_type=DATE_RT,
@@ -243,20 +1107,168 @@ def get_date_key(connection: psycopg2.extensions.connection):
 def get_author_key(connection: psycopg2.extensions.connection, author: str):
     '''Get author_key of a given author.
     :param connection: an established connection to the server to run query against the database
-    :param 
+    :param author: author name, passed to the query as a parameter
     '''
-    constraint = f"WHERE author_name='{author}'"
     try:
         author_key = run_select_query(connection=connection, 
                                      run_type=AUTHOR_RT, 
                                      fields="author_key", 
-                                     constraint=constraint)
+                                     constraint="WHERE author_name=%s",
+                                     params=(author,))
         author_key = author_key[0][0]
         return author_key
     except:
         get_logger().error(f"Error while getting author key of {author} : " + " Error: " + str(sys.exc_info()[0]))
 
 
+def get_latest_text_hashes(connection: psycopg2.extensions.connection, author: str) -> set:
+    '''Get the text hashes of the newest posts of a given author already in posts_fact, i.e. the high-water mark of the author.
+    :param connection: an established connection to the server to run query against the database
+    :param author: author name
+    '''
+    author = author.replace("'", "''")
+    author_key = f"(SELECT author_key FROM {AUTHOR_TABLE} WHERE author_name='{author}')"
+    constraint = f"WHERE author_key={author_key} AND date_key=(SELECT MAX(date_key) FROM {POST_TABLE} WHERE author_key={author_key})"
+    try:
+        text_hashes = run_select_query(connection=connection,
+                                       run_type=POST_RT,
+                                       fields="text_hash",
+                                       constraint=constraint)
+        return set(text_hash[0] for text_hash in text_hashes)
+    except:
+        get_logger().error(f"Error while getting the latest posts of {author} : " + " Error: " + str(sys.exc_info()[0]))
+        return set()
+
+
+def get_post_fingerprints(connection: psycopg2.extensions.connection) -> dict:
+    '''Get the fingerprints of every post already in posts_fact, grouped by author name.
+    :param connection: an established connection to the server to run query against the database
+    '''
+    fingerprints = {}
+    try:
+        posts = run_select_query(connection=connection,
+                                 run_type=POST_RT,
+                                 fields=f"{AUTHOR_TABLE}.author_name, {POST_TABLE}.text_hash",
+                                 constraint=f"JOIN {AUTHOR_TABLE} USING (author_key)")
+        for author_name, text_hash in posts:
+            fingerprints.setdefault(author_name, set()).add(text_hash)
+        get_logger().info(f"> Loaded the fingerprints of {len(posts)} posts.")
+    except:
+        get_logger().error("Error while getting the fingerprints of the ingested posts : " + " Error: " + str(sys.exc_info()[0]))
+
+    return fingerprints
+
+
+def get_post_history(connection: psycopg2.extensions.connection) -> dict:
+    '''Get the number of posts ingested per date_key, grouped by author name.
+    :param connection: an established connection to the server to run query against the database
+    '''
+    history = {}
+    try:
+        rows = run_select_query(connection=connection,
+                                run_type=POST_RT,
+                                fields=f"{AUTHOR_TABLE}.author_name, {POST_TABLE}.date_key, COUNT(*)",
+                                constraint=f"JOIN {AUTHOR_TABLE} USING (author_key) GROUP BY {AUTHOR_TABLE}.author_name, {POST_TABLE}.date_key")
+        for author_name, date_key, posts_count in rows:
+            history.setdefault(author_name, {})[date_key] = posts_count
+    except:
+        get_logger().error("Error while getting the posting history of the authors : " + " Error: " + str(sys.exc_info()[0]))
+
+    return history
+
+
+#--------------- Dimension cache ---------------#
+
+class DimensionCache():
+    '''In-process cache of the author_key and date_key lookups.
+    The dimensions are loaded once, lookups are served from memory and only misses go to the database.
+    An author missing from author_dimension is cached too, so it is queried once per load.
+    '''
+    def __init__(self):
+        self.author_keys = None # author_name -> author_key, None for an author missing from author_dimension
+        self.date_keys = None # known date_key values
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        '''Load author_dimension and date_dimension keys with one query each.
+        '''
+        with pooled_connection() as connection:
+            authors = run_select_query(connection=connection, run_type=AUTHOR_RT, fields="author_name, author_key") or []
+            date_keys = run_select_query(connection=connection, run_type=DATE_RT, fields="date_key") or []
+        with self.lock:
+            self.author_keys = {author_name: author_key for author_name, author_key in authors}
+            self.date_keys = set(date_key[0] for date_key in date_keys)
+        get_logger().info(f"> Loaded {len(self.author_keys)} author keys and {len(self.date_keys)} date keys into the dimension cache.")
+
+    def count(self, hit: bool):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_author_key(self, author: str):
+        '''Get author_key of a given author.
+        :param author: author name
+        '''
+        if self.author_keys is None:
+            self.load()
+        with self.lock:
+            cached = author in self.author_keys
+            author_key = self.author_keys.get(author)
+        self.count(hit=cached)
+        if not cached:
+            # The author may have been added after the cache was loaded
+            with pooled_connection() as connection:
+                author_keys = run_select_query(connection=connection, run_type=AUTHOR_RT, fields="author_key",
+                                               constraint="WHERE author_name=%s", params=(author,))
+            if author_keys is not None: # A failed query is retried on the next lookup
+                author_key = author_keys[0][0] if len(author_keys) > 0 else None
+                with self.lock:
+                    self.author_keys[author] = author_key
+
+        return author_key
+
+    def get_date_key(self):
+        '''Get date_key for the current date.
+        A missing date pre-populates date_dimension DATE_DIMENSION_YEARS_AHEAD years ahead,
+        so it happens once every few years.
+        '''
+        current_date = compute_date_key()
+        if DATE_DIMENSION_PREPOPULATED:
+            return current_date
+        if self.date_keys is None:
+            self.load()
+        with self.lock:
+            cached = current_date in self.date_keys
+        self.count(hit=cached)
+        if not cached:
+            with pooled_connection() as connection:
+                date_keys = populate_date_dimension(connection=connection)
+            with self.lock:
+                self.date_keys.update(date_keys)
+
+        return current_date
+
+    def get_stats(self) -> dict:
+        '''Return the hit and miss counters of the cache.
+        '''
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def get_dimension_cache() -> DimensionCache:
+    '''Return the process-wide dimension cache.
+    '''
+    global dimension_cache
+    if dimension_cache is None:
+        dimension_cache = DimensionCache()
+    return dimension_cache
+
+#--------------- End of Dimension cache ---------------#
+
+
 #--------------- Build queries ---------------#
 
 def build_insert_query(table_name: str, records_to_insert: tuple):
@@ -307,7 +1319,7 @@ def run_insert_query(connection: psycopg2.extensions.connection, run_type: str,
     try:
         cursor.execute(insert_query)
         connection.commit()
-        get_logger().info(f"> Successfully ingested record {records_to_insert} into table {table_name}.\n")
+        log_event("record_inserted", table=table_name, record=records_to_insert)
     except:
         get_logger().error(f"Error while trying to insert: {records_to_insert}.")
         # get_logger().error(f"Error while trying to insert records into table : {table_name} " + " Error: " + str(sys.exc_info()[0]))
@@ -316,15 +1328,48 @@ def run_insert_query(connection: psycopg2.extensions.connection, run_type: str,
     #     connection.close()
 
 
+def run_bulk_insert_query(connection: psycopg2.extensions.connection, run_type: str, records_to_insert: list, page_size: int = None) -> tuple:
+    '''Insert many records into PostgreSQL table with multi-row statements inside one transaction.
+    Records that violate a uniqueness constraint are skipped. Return (inserted count, skipped count).
+    :param connection: an established connection to the server
+    :param run_type: any of [AUTHOR_RT, DATE_RT, POST_RT]
+    :param records_to_insert: list of tuples, one per row
+    :param page_size: number of rows per statement, BULK_PAGE_SIZE by default
+    '''
+    from psycopg2.extras import execute_values
+
+    if len(records_to_insert) == 0:
+        return 0, 0
+    if page_size is None:
+        page_size = BULK_PAGE_SIZE
+    table_name = get_table_name(run_type=run_type)
+    insert_query = f"INSERT INTO {table_name} VALUES %s ON CONFLICT DO NOTHING RETURNING 1"
+
+    try:
+        with connection.cursor() as cursor:
+            inserted_rows = execute_values(cursor, insert_query, records_to_insert, page_size=page_size, fetch=True)
+        connection.commit()
+        inserted = len(inserted_rows)
+        skipped = len(records_to_insert) - inserted
+        get_logger().info(f"> Bulk ingested {inserted} records into table {table_name}, skipped {skipped} existing records.\n")
+        return inserted, skipped
+    except:
+        connection.rollback()
+        get_logger().error(f"Error while trying to bulk insert {len(records_to_insert)} records into table : {table_name} " + " Error: " + str(sys.exc_info()[0]))
+        raise
+
+
 def run_delete_query(connection: psycopg2.extensions.connection, run_type: str):
     pass
 
 
-def run_select_query(connection: psycopg2.extensions.connection, run_type: str, fields: str, constraint: str = None):
+def run_select_query(connection: psycopg2.extensions.connection, run_type: str, fields: str, constraint: str = None, params: tuple = None):
     '''Execute the select query into PostgreSQL table.
     :param connection:
     :param run_type:
     :param fields: field to be selected
+    :param constraint: e.g. "WHERE author_name=%s", with a %s placeholder for each of params
+    :param params: values of the placeholders of constraint, escaped by the driver
     '''
     cursor = connection.cursor()
     table_name = get_table_name(run_type=run_type)
@@ -334,7 +1379,7 @@ def run_select_query(connection: psycopg2.extensions.connection, run_type: str,
         select_query += constraint
 
     try:
-        results = cursor.execute(select_query)
+        results = cursor.execute(select_query, params)
         results = cursor.fetchall()
         get_logger().info(f"> Successfully select {fields} from {table_name}.\n")
         return results
@@ -348,6 +1393,12 @@ def run_select_query(connection: psycopg2.extensions.connection, run_type: str,
 
 #--------------- Cleaning data ---------------#
 
+HASHTAG_PATTERN = re.compile(r"(\#[a-zA-Z0-9]+\b)")
+MENTION_PATTERN = re.compile(r"(\@[a-zA-Z0-9]+\b)")
+LINK_PATTERN = re.compile(r"((https?):((//)|(\\))+([\w\d:#@%/;$()~_?\+-=\\.&](#!)?)*)")
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f\v]+")
+
+
 def remove_emoji(list_of_string: list):
     '''Remove emoji from text.
     :param list_of_string: 
@@ -377,7 +1428,7 @@ def remove_hashtags(list_of_string: list) -> list:
     '''Remove hashtags from a list of strings.
     :param list_of_string:
     '''
-    clean_list = [re.sub("(\#[a-zA-Z0-9]+\\b)", "", string) for string in list_of_string]
+    clean_list = [HASHTAG_PATTERN.sub("", string) for string in list_of_string]
     return clean_list
 
 
@@ -385,7 +1436,7 @@ def extract_hashtags(list_of_string: list) -> list:
     '''Extract hashtags from a list of strings.
     :param list_of_string:
     '''
-    hashtags = [re.findall("(\#[a-zA-Z0-9]+\\b)", string) for string in list_of_string]
+    hashtags = [HASHTAG_PATTERN.findall(string) for string in list_of_string]
     return hashtags
 
 
@@ -393,7 +1444,7 @@ def remove_mentions(list_of_string: list) -> list:
     '''Remove mentions from a list of strings.
     :param list_of_string:
     '''
-    clean_list = [re.sub("(\@[a-zA-Z0-9]+\\b)", "", string) for string in list_of_string]
+    clean_list = [MENTION_PATTERN.sub("", string) for string in list_of_string]
     return clean_list
 
 
@@ -401,7 +1452,7 @@ def extract_mentions(list_of_string: list) -> list:
     '''Extract mentions from a list of strings.
     :param list_of_string:
     '''
-    mentions = [re.findall("(\@[a-zA-Z0-9]+\\b)", string) for string in list_of_string]
+    mentions = [MENTION_PATTERN.findall(string) for string in list_of_string]
     return mentions
 
 
@@ -409,10 +1460,33 @@ def remove_links(list_of_string: list) -> list:
     '''Remove links from a list of strings.
     :param list_of_string:
     '''
-    clean_list = [re.sub("((https?):((//)|(\\\\))+([\w\d:#@%/;$()~_?\+-=\\\.&](#!)?)*)", "", string) for string in list_of_string]
+    clean_list = [LINK_PATTERN.sub("", string) for string in list_of_string]
     return clean_list
 
 
+def clean_text(text: str) -> str:
+    '''Return the clean text of a single post, as stored in posts_fact.clean_text.
+    :param text: raw post text
+    '''
+    return remove_links(remove_mentions(remove_hashtags(escape_single_quote(remove_emoji([text])))))[0]
+
+
+def normalize_text(clean_text: str) -> str:
+    '''Collapse every run of whitespace of a clean post text into one space and strip the ends.
+    Matches btrim(regexp_replace(clean_text, '[ \\t\\n\\r\\f\\v]+', ' ', 'g')) in PostgreSQL.
+    :param clean_text:
+    '''
+    return WHITESPACE_PATTERN.sub(" ", clean_text).strip(" ")
+
+
+def compute_text_hash(clean_text: str) -> str:
+    '''Return the digest of a normalized clean post text, as stored in posts_fact.text_hash.
+    It is also the fingerprint of the posts already ingested.
+    :param clean_text:
+    '''
+    return hashlib.md5(normalize_text(clean_text).encode('utf-8')).hexdigest()
+
+
 # def extract_links(list_of_string: list) -> list:
 #     '''Extract links from a list of strings.
 #     :param list_of_string:
@@ -421,4 +1495,180 @@ def remove_links(list_of_string: list) -> list:
 #     return links
 
 
-#--------------- End of Cleaning data ---------------#
\ No newline at end of file
+#--------------- End of Cleaning data ---------------#
+
+
+#--------------- Staging data ---------------#
+
+class StagingWriter():
+    '''Append the raw record of each author to a gzip-compressed JSON lines file as soon as it is scraped.
+    Every author is flushed to disk, so the authors scraped before a crash can still be replayed.
+    '''
+    def __init__(self, path: str = None):
+        '''
+        :param path: staging file, or folder of a new timestamped staging file, get_staging_path() by default
+        '''
+        if path is None or os.path.isdir(path) or not (os.path.exists(path) or is_staging_file_name(path)):
+            # A missing path without a staging file extension is a folder to create
+            path = new_staging_file_path(folder_path=path)
+        folder_path = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(folder_path):
+            os.makedirs(folder_path)
+        self.path = path
+        self.file = gzip.open(path, 'at', encoding='utf-8')
+        self.lock = threading.Lock()
+        self.authors_count = 0
+
+    def write(self, author_name: str, raw_record: list):
+        '''Append the raw record of one author.
+        :param author_name:
+        :param raw_record: [texts, reactions, comments, shares, media_links, media_types]
+        '''
+        line = json.dumps({"author": author_name, "raw_record": raw_record}, separators=(",", ":")) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.authors_count += 1
+
+    def stage_records(self, author_records):
+        '''Write and pass through (author_name, raw_record) pairs.
+        :param author_records: iterable of (author_name, raw_record), e.g. LinkedinScraper.iter_author_records()
+        '''
+        for author_name, raw_record in author_records:
+            self.write(author_name=author_name, raw_record=raw_record)
+            yield author_name, raw_record
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+                get_logger().info(f"> Staged the raw records of {self.authors_count} authors in {self.path}.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def get_staging_path() -> str:
+    '''Return the folder of the staging files, STAGING_PATH or staging/ by default.
+    '''
+    return STAGING_PATH or os.path.join(get_abs_root_path(), r"../staging/")
+
+
+def new_staging_file_path(folder_path: str = None) -> str:
+    '''Return the path of a new staging file named after the current time.
+    :param folder_path: get_staging_path() by default
+    '''
+    if folder_path is None:
+        folder_path = get_staging_path()
+    return os.path.join(folder_path, f"raw_records_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl.gz")
+
+
+def is_staging_file_name(path: str) -> bool:
+    '''Return whether the path is named like a staging file.
+    :param path:
+    '''
+    return path.endswith(".jsonl.gz") or path.endswith(".jsonl")
+
+
+def list_staging_files(path: str = None, latest_only: bool = True) -> list:
+    '''Return the staging files to replay, none when the path does not exist.
+    :param path: a staging file, or a folder of staging files, get_staging_path() by default
+    :param latest_only: only return the newest file of a folder, all of them otherwise
+    '''
+    if path is None:
+        path = get_staging_path()
+    if not os.path.exists(path):
+        get_logger().warning(f"Staging path {path} does not exist, nothing to replay.")
+        return []
+    if not os.path.isdir(path):
+        return [path]
+    files = sorted(os.path.join(path, name) for name in os.listdir(path) if is_staging_file_name(name))
+    return files[-1:] if latest_only else files
+
+
+def write_staged_records(author_records, path: str = None) -> int:
+    '''Stage (author_name, raw_record) pairs as they come. Return the number of authors.
+    :param author_records: iterable of (author_name, raw_record), e.g. LinkedinScraper.iter_author_records()
+    :param path: staging file, or folder of a new timestamped staging file, get_staging_path() by default
+    '''
+    with StagingWriter(path=path) as staging:
+        for author_record in staging.stage_records(author_records):
+            pass
+
+    return staging.authors_count
+
+
+def read_staged_records(path: str = None, latest_only: bool = True):
+    '''Yield (author_name, raw_record) pairs from staging files, without loading whole files in memory.
+    A file cut short by a crash or corrupted on disk is read up to its last readable author.
+    :param path: a staging file, or a folder of staging files, get_staging_path() by default
+    :param latest_only: only read the newest file of a folder, all of them otherwise
+    '''
+    for file_path in list_staging_files(path=path, latest_only=latest_only):
+        with open(file_path, 'rb') as f:
+            compressed = f.read(2) == b"\x1f\x8b" # gzip magic number
+        with (gzip.open if compressed else open)(file_path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    if line.endswith("\n"):
+                        staged = json.loads(line)
+                        yield staged["author"], staged["raw_record"]
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                get_logger().error(f"Staging file {file_path} is truncated or corrupt, replayed it up to its last readable author : " + " Error: " + str(sys.exc_info()[0]))
+
+#--------------- End of Staging data ---------------#
+
+
+#--------------- Local state ---------------#
+
+class TimestampStore():
+    '''A time per author name, kept in a small local JSON file that survives crashes and restarts.
+    '''
+    def __init__(self, path: str, name: str):
+        '''
+        :param path: JSON file of the store.
+        :param name: key of the times in the file, e.g. "last_visits".
+        '''
+        self.path = path
+        self.name = name
+        self.lock = threading.Lock()
+        self.times = self.load()
+
+    def load(self) -> dict:
+        '''Return the times saved by the previous runs.
+        '''
+        if not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return {author_name: datetime.fromisoformat(saved_at) for author_name, saved_at in json.load(f)[self.name].items()}
+        except:
+            get_logger().error(f"Error while reading {self.name} from {self.path} : " + " Error: " + str(sys.exc_info()[0]))
+            return {}
+
+    def get(self, author_name: str) -> datetime:
+        '''Return the time of an author, None if there is none.
+        :param author_name:
+        '''
+        with self.lock:
+            return self.times.get(author_name)
+
+    def set(self, author_name: str, saved_at: datetime = None):
+        '''Save the time of an author to the file at once. Safe to call from any thread.
+        :param author_name:
+        :param saved_at: now by default
+        '''
+        try:
+            folder_path = os.path.dirname(os.path.abspath(self.path))
+            if not os.path.isdir(folder_path):
+                os.makedirs(folder_path, mode=0o700)
+            with self.lock: # A slower writer must not replace the file with older times
+                self.times[author_name] = saved_at if saved_at is not None else datetime.now()
+                write_json_file(path=self.path, data={self.name: {name: value.isoformat(timespec="seconds") for name, value in self.times.items()}})
+        except:
+            get_logger().error(f"Error while saving {self.name} to {self.path} : " + " Error: " + str(sys.exc_info()[0]))
+
+#--------------- End of Local state ---------------#
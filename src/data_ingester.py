@@ -1,6 +1,4 @@
-import os
 import sys
-import psycopg2
 
 import common_utils as cu
 
@@ -9,62 +7,6 @@ class DataIngester():
     def __init__(self):
         self.logger = cu.create_log()
         self.rt = cu.POST_RT
-        self.user = os.getenv("DB_USER")
-        self.password = os.getenv("PASSWORD")
-        self.host = os.getenv("HOST")
-        self.port = os.getenv("PORT")
-        self.database = os.getenv("DATABASE")
-
-    def get_user(self):
-        '''Return database user.
-        '''
-        try:
-            return self.user
-        except:
-            self.logger.error("Error while reading the database user : " + " Error: " + str(sys.exc_info()[0]))
-    
-    def get_password(self):
-        '''Return database password.
-        '''
-        try:
-            return self.password
-        except:
-            self.logger.error("Error while reading the database password : " + " Error: " + str(sys.exc_info()[0]))
-
-    def get_host(self):
-        '''Return database host.
-        '''
-        try:
-            return self.host
-        except:
-            self.logger.error("Error while reading the database host : " + " Error: " + str(sys.exc_info()[0]))
-
-    def get_port(self):
-        '''Return database port.
-        '''
-        try:
-            return self.port
-        except:
-            self.logger.error("Error while reading the database port : " + " Error: " + str(sys.exc_info()[0]))
-
-    def get_database(self):
-        '''Return database name.
-        '''
-        try:
-            return self.database
-        except:
-            self.logger.error("Error while reading the database name : " + " Error: " + str(sys.exc_info()[0]))
-
-    def connect_to_postgres(self):
-        '''Create a connection to the given database.
-        '''
-        connection = cu.create_postgres_connection(user=self.get_user(),
-                                                   password=self.get_password(),
-                                                   host=self.get_host(),
-                                                   port=self.get_port(),
-                                                   database=self.get_database())
-
-        return connection
 
 
 class LinkedinIngester(DataIngester):
@@ -75,17 +17,30 @@ class LinkedinIngester(DataIngester):
         '''
         table_name = cu.get_table_name(run_type=self.rt)
         # Connect
-        connection = self.connect_to_postgres()
-        cursor = connection.cursor()
-        # Ingest
-        try:
+        with cu.get_metrics().time(stage=cu.INGEST_STAGE), cu.pooled_connection() as connection:
+            cursor = connection.cursor()
+            # Ingest
             for record in clean_records:
-                query = f"""INSERT INTO {table_name} VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
-                cursor.execute(query, record)
-                connection.commit()
-                self.logger.info(f"> Successfully ingested record {record} into table {table_name}.\n")
-        except:
-            self.logger.error(f"Error while trying to insert records into table : {table_name} " + " Error: " + str(sys.exc_info()[0]))
-            
-        connection.close()
-        self.logger.info("> PostgreSQL connection is closed.")
\ No newline at end of file
+                try:
+                    query = f"""INSERT INTO {table_name} VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
+                    cursor.execute(query, record)
+                    connection.commit()
+                    cu.log_event("record_inserted", table=table_name, record=record)
+                except:
+                    connection.rollback() # Keep ingesting the remaining records
+                    self.logger.error(f"Error while trying to insert records into table : {table_name} " + " Error: " + str(sys.exc_info()[0]))
+            cursor.close()
+
+    def bulk_ingest_data(self, clean_records: list, author: str = None) -> tuple:
+        '''Ingest a batch of clean records into the posts_fact table in one transaction, skipping the existing posts.
+        Return (inserted count, skipped count).
+        :param clean_records: data to be ingested, e.g. every record of an author or of a whole run.
+        :param author: author name of the records, for the per-author metrics, None for a batch of several authors.
+        '''
+        metrics = cu.get_metrics()
+        with metrics.time(stage=cu.INGEST_STAGE, author=author), cu.pooled_connection() as connection:
+            inserted, skipped = cu.run_bulk_insert_query(connection=connection, run_type=self.rt, records_to_insert=clean_records)
+        metrics.increment(name="records_inserted", value=inserted, author=author)
+        metrics.increment(name="records_skipped", value=skipped, author=author)
+
+        return inserted, skipped
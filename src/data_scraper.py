@@ -1,210 +1,591 @@
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import os
+import threading
+import queue
+import time
 import sys
+import json
 import re
 
+import author_scheduler as sch
 import common_utils as cu
 
 
+# Mirrors LinkedinScraper.extract_*: a multi-class name only matches the exact class attribute, like BeautifulSoup.
+# Counts are returned as their raw text and converted by LinkedinScriptScraper.extract_post.
+EXTRACT_POSTS_SCRIPT = '''
+const hasClass = (element, name) => {
+    const names = (element.getAttribute("class") || "").split(/\\s+/).filter(Boolean);
+    return names.includes(name) || names.join(" ") === name;
+};
+const byClass = name => element => hasClass(element, name);
+const find = (root, tag, test) => {
+    if (root === null) return null;
+    for (const element of root.getElementsByTagName(tag)) {
+        if (test === undefined || test(element)) return element;
+    }
+    return null;
+};
+const textOf = element => element === null ? null : element.textContent;
+const findLink = (container, boxClass) => {
+    const link = find(find(container, "div", byClass(boxClass)), "a", element => element.hasAttribute("href"));
+    return link === null ? null : link.getAttribute("href");
+};
+const extractMedia = container => {
+    const image = find(find(container, "div", byClass("feed-shared-image__container")), "img",
+                       byClass("ivm-view-attr__img--centered feed-shared-image__image lazy-image ember-view"));
+    if (image !== null && image.hasAttribute("src")) return [image.getAttribute("src"), "Image"];
+    const article = findLink(container, "feed-shared-article__description-container");
+    if (article !== null) return [article, "Article"];
+    const video = findLink(container, "feed-shared-external-video__meta");
+    if (video !== null) return [video, "Youtube Video"];
+    return [null, "Other: Poll, Shared Post, etc"];
+};
+const extractPost = container => {
+    const textBox = find(container, "div", byClass("feed-shared-text relative feed-shared-update-v2__commentary"));
+    const [mediaLink, mediaType] = extractMedia(container);
+    const activity = find(container, "div", byClass("social-details-social-activity update-v2-social-activity"));
+    const comments = find(activity, "li", byClass("social-details-social-counts__item social-details-social-counts__comments social-details-social-counts__item--with-social-proof"));
+    const shares = find(activity, "li", byClass("social-details-social-counts__item social-details-social-counts__item--with-social-proof"));
+    return {text: textOf(find(textBox, "span", element => element.getAttribute("dir") === "ltr")),
+            media_link: mediaLink,
+            media_type: mediaType,
+            reactions_text: textOf(find(activity, "span", byClass("social-details-social-counts__reactions-count"))
+                                   || find(activity, "span", byClass("social-details-social-counts__social-proof-fallback-number"))),
+            comments_text: textOf(find(comments, "span")),
+            shares_text: textOf(find(shares, "span"))};
+};
+return JSON.stringify(Array.from(document.getElementsByTagName("div")).filter(byClass("ember-view occludable-update")).map(extractPost));
+'''
+
+
 load_dotenv()
 class DataScraper():
-    def __init__(self):
+    def __init__(self, driver=None):
         self.logger = cu.create_log()
-        self.driver = cu.login_linkedin()
-        self.user = os.getenv("DB_USER")
-        self.password = os.getenv("PASSWORD")
-        self.host = os.getenv("HOST")
-        self.port = os.getenv("PORT")
-        self.database = os.getenv("DATABASE")
+        self.driver = driver if driver is not None else cu.login_linkedin()
+        self.scroll_max_depth = cu.SCROLL_MAX_DEPTH
+        self.incremental = cu.INCREMENTAL_SCRAPE
+        self.scheduling = cu.SCHEDULE_AUTHORS
+        self.known_fingerprints = None
+
+    def get_authors(self) -> list:
+        '''Return (author_name, author_url) of every author in the author_dimension table.
+        '''
+        with cu.pooled_connection() as connection:
+            authors = cu.run_select_query(connection=connection, run_type=cu.AUTHOR_RT, fields="author_name, linkedin_profile_link")
+        authors = [(author_name, author_url) for author_name, author_url in authors]
+        if self.scheduling:
+            return self.schedule_authors(authors=authors)
+        return authors
+
+    def schedule_authors(self, authors: list) -> list:
+        '''Return the authors due in this run according to their posting history.
+        :param authors: list of (author_name, author_url).
+        '''
+        with cu.pooled_connection() as connection:
+            post_history = cu.get_post_history(connection=connection)
+        return sch.get_author_scheduler().plan(authors=authors, post_history=post_history)
+
+    def get_high_water_mark(self, author_name: str) -> set:
+        '''Return the fingerprints of the newest posts of an author already in the database.
+        :param author_name:
+        '''
+        with cu.pooled_connection() as connection:
+            return cu.get_latest_text_hashes(connection=connection, author=author_name)
+
+    def load_known_fingerprints(self) -> dict:
+        '''Load the fingerprints of every ingested post once, grouped by author name.
+        '''
+        if self.known_fingerprints is None:
+            with cu.pooled_connection() as connection:
+                self.known_fingerprints = cu.get_post_fingerprints(connection=connection)
+        return self.known_fingerprints
+
+    def find_containers(self, soup) -> list:
+        containers = soup.find_all("div", {"class":cu.CONTAINER_CLASS})
+        return containers
+
+    def scrape_containers(self, author_url: str, author_name: str = None):
+        soup = cu.create_soup(driver=self.driver, url=author_url, author=author_name)
+        return self.find_containers(soup)
+
+    def reload_containers(self, author_name: str = None) -> list:
+        '''Return the containers of the page already open in the browser, e.g. after a scroll.
+        :param author_name: author of the page, for the per-author metrics.
+        '''
+        return self.find_containers(cu.parse_page(self.driver.page_source, author=author_name))
 
-    def get_user(self):
-        '''Return database user.
+class LinkedinScraper(DataScraper):
+    def extract_text(self, container) -> str:
+        '''Return the content text of a single post container.
+        :param container: an `occludable-update` container.
         '''
         try:
-            return self.user
+            text_box = container.find("div", {"class":"feed-shared-text relative feed-shared-update-v2__commentary"})
+            text = text_box.find("span", {"dir":"ltr"})
+            return text.text
         except:
-            self.logger.error("Error while reading the database user : " + " Error: " + str(sys.exc_info()[0]))
-    
-    def get_password(self):
-        '''Return database password.
+            return 'None'
+
+    def extract_media(self, container) -> tuple:
+        '''Return the media link and media type of a single post container.
+        :param container: an `occludable-update` container.
         '''
         try:
-            return self.password
+            image_box = container.find_all("div",{"class": "feed-shared-image__container"})
+            image_link = image_box[0].find("img", {"class":"ivm-view-attr__img--centered feed-shared-image__image lazy-image ember-view"})
+            return image_link['src'], "Image"
         except:
-            self.logger.error("Error while reading the database password : " + " Error: " + str(sys.exc_info()[0]))
+            try:
+                article_box = container.find_all("div",{"class": "feed-shared-article__description-container"})
+                article_link = article_box[0].find('a', href=True)
+                return article_link['href'], "Article"
+            except:
+                try:
+                    video_box = container.find_all("div",{"class": "feed-shared-external-video__meta"})
+                    video_link = video_box[0].find('a', href=True)
+                    return video_link['href'], "Youtube Video"
+                except:
+                    try:
+                        poll_box = container.find_all("div",{"class": "feed-shared-update-v2__content overflow-hidden feed-shared-poll ember-view"})
+                        return "None", "Other: Poll, Shared Post, etc"
+                    except:
+                        return "None", "Unknown"
 
-    def get_host(self):
-        '''Return database host.
+    def extract_reactions_count(self, container) -> int:
+        '''Return the reactions count of a single post container.
+        :param container: an `occludable-update` container.
         '''
         try:
-            return self.host
-        except:
-            self.logger.error("Error while reading the database host : " + " Error: " + str(sys.exc_info()[0]))
+            reactions_count_box = container.find("div", {"class":"social-details-social-activity update-v2-social-activity"})
+            reactions_count = reactions_count_box.find("span", {"class":"social-details-social-counts__reactions-count"}).text
+            return self.parse_reactions_count(reactions_count)
+        except AttributeError:
+            try:
+                reactions_count = reactions_count_box.find("span", {"class":"social-details-social-counts__social-proof-fallback-number"}).text
+                return self.parse_reactions_count(reactions_count)
+            except:
+                return 0
 
-    def get_port(self):
-        '''Return database port.
+    def extract_comments_count(self, container) -> int:
+        '''Return the comments count of a single post container.
+        :param container: an `occludable-update` container.
         '''
         try:
-            return self.port
-        except:
-            self.logger.error("Error while reading the database port : " + " Error: " + str(sys.exc_info()[0]))
+            comments_count_div_box = container.find("div", {"class":"social-details-social-activity update-v2-social-activity"})
+            comments_count_li_box = comments_count_div_box.find("li", {"class":"social-details-social-counts__item social-details-social-counts__comments social-details-social-counts__item--with-social-proof"})
+            comments_count = comments_count_li_box.find("span").text
+            return self.parse_activity_count(comments_count)
+        except AttributeError:
+            return 0
 
-    def get_database(self):
-        '''Return database name.
+    def extract_shares_count(self, container) -> int:
+        '''Return the shares count of a single post container.
+        :param container: an `occludable-update` container.
         '''
         try:
-            return self.database
-        except:
-            self.logger.error("Error while reading the database name : " + " Error: " + str(sys.exc_info()[0]))
-
-    def connect_to_postgres(self):
-        '''Create a connection to the given database.
-        '''
-        connection = cu.create_postgres_connection(user=self.get_user(),
-                                                   password=self.get_password(),
-                                                   host=self.get_host(),
-                                                   port=self.get_port(),
-                                                   database=self.get_database())
-
-        return connection
-    
-    def scrape_containers(self, author_url: str):
-        soup = cu.create_soup(driver=self.driver, url=author_url)
-        containers = soup.find_all("div", {"class":"ember-view occludable-update"})
+            shares_count_div_box = container.find("div", {"class":"social-details-social-activity update-v2-social-activity"})
+            shares_count_li_box = shares_count_div_box.find("li", {"class":"social-details-social-counts__item social-details-social-counts__item--with-social-proof"})
+            shares_count = shares_count_li_box.find("span").text
+            return self.parse_activity_count(shares_count)
+        except AttributeError:
+            return 0
+
+    def parse_reactions_count(self, text: str) -> int:
+        '''Return the reactions count from the text of its span, e.g. "1,234".
+        :param text:
+        '''
+        return int(text.replace(",", ""))
+
+    def parse_activity_count(self, text: str) -> int:
+        '''Return the comments or shares count from the text of its span, e.g. "56 comments".
+        :param text:
+        '''
+        return int(re.findall("\\d+\\b", text)[0])
+
+    def extract_post(self, container) -> dict:
+        '''Return every field of a single post container as one record.
+        :param container: an `occludable-update` container.
+        '''
+        media_link, media_type = self.extract_media(container)
+        return {"text": self.extract_text(container),
+                "media_link": media_link,
+                "media_type": media_type,
+                "reactions_count": self.extract_reactions_count(container),
+                "comments_count": self.extract_comments_count(container),
+                "shares_count": self.extract_shares_count(container)}
+
+    def is_known_text(self, text: str, known_fingerprints: set) -> bool:
+        '''Return True if a scraped post text is already in posts_fact.
+        :param text: raw post text.
+        :param known_fingerprints: fingerprints of the ingested posts of the author.
+        '''
+        return cu.compute_text_hash(cu.clean_text(text)) in known_fingerprints
+
+    def scroll_to_known_posts(self, containers: list, known_fingerprints: set, author_name: str = None) -> list:
+        '''Scroll the loaded feed step by step until it reaches an already ingested post or scroll_max_depth steps.
+        Return the containers of the scrolled feed.
+        :param containers: containers of the first screen of the feed.
+        :param known_fingerprints: fingerprints of the ingested posts of the author.
+        :param author_name: author of the feed, for the per-author metrics.
+        '''
+        known_fingerprints = known_fingerprints or set()
+        checked = 0
+        for depth in range(self.scroll_max_depth + 1):
+            # Only the newly loaded containers need to be checked
+            for container in containers[checked:]:
+                text = self.extract_text(container)
+                if text != 'None' and self.is_known_text(text=text, known_fingerprints=known_fingerprints):
+                    self.logger.info(f"> Reached an already ingested post after {depth} scroll steps.")
+                    return containers
+            checked = len(containers)
+            if depth == self.scroll_max_depth or not cu.scroll_feed(driver=self.driver, containers_count=checked):
+                break
+            containers = self.reload_containers(author_name=author_name)
+
         return containers
 
-class LinkedinScraper(DataScraper):
-    def scrape_content_text(self, author_url: str) -> list:
+    def scrape_posts(self, author_url: str, known_fingerprints: set = None, author_name: str = None) -> list:
+        '''Load the author page once and return one record per post.
+        :param author_url: Linkedin profile link.
+        :param known_fingerprints: fingerprints of the ingested posts of the author, used when scrolling is enabled.
+        :param author_name: author of the page, for the per-author metrics.
+        '''
+        containers = self.scrape_containers(author_url=author_url, author_name=author_name)
+        if self.scroll_max_depth > 0:
+            containers = self.scroll_to_known_posts(containers=containers, known_fingerprints=known_fingerprints, author_name=author_name)
+        with cu.get_metrics().time(stage=cu.FIELD_EXTRACTION_STAGE, author=author_name):
+            return [self.extract_post(container) for container in containers]
+
+    def filter_known_posts(self, posts: list, known_fingerprints: set) -> list:
+        '''Drop the posts that are already in posts_fact.
+        :param posts: records from `scrape_posts`.
+        :param known_fingerprints: fingerprints of the ingested posts of the author.
+        '''
+        return [post for post in posts if not self.is_known_text(text=post["text"], known_fingerprints=known_fingerprints)]
+
+    def scrape_content_text(self, author_url: str, posts: list = None) -> list:
         '''Return content text to ingest into PostgreSQL database.
         :param author_url: Linkedin profile link.
+        :param posts: records from `scrape_posts`, scraped again if not given.
         '''
-        post_texts = []
-        
-        for container in self.scrape_containers(author_url=author_url):
-            try:
-                text_box = container.find("div", {"class":"feed-shared-text relative feed-shared-update-v2__commentary"})
-                text = text_box.find("span", {"dir":"ltr"})
+        if posts is None:
+            posts = self.scrape_posts(author_url=author_url)
+        return [post["text"] for post in posts]
 
-                #Appending text to lists
-                post_texts.append(text.text)
-            except:
-                post_texts.append('None')
-        
-        return post_texts
-    
-    def scrape_media(self, author_url: str) -> list:
+    def scrape_media(self, author_url: str, posts: list = None) -> list:
         '''Return media links and corresponding types.
         :param author_url: Linkedin profile link.
+        :param posts: records from `scrape_posts`, scraped again if not given.
         '''
-        media_links = []
-        media_types = []
-
-        for container in self.scrape_containers(author_url=author_url):
-            try:
-                image_box = container.find_all("div",{"class": "feed-shared-image__container"})
-                image_link = image_box[0].find("img", {"class":"ivm-view-attr__img--centered feed-shared-image__image lazy-image ember-view"})
-                media_links.append(image_link['src'])
-                media_types.append("Image")
-            except:
-                try:
-                    article_box = container.find_all("div",{"class": "feed-shared-article__description-container"})
-                    article_link = article_box[0].find('a', href=True)
-                    media_links.append(article_link['href'])
-                    media_types.append("Article")
-                except:
-                    try:
-                        video_box = container.find_all("div",{"class": "feed-shared-external-video__meta"})          
-                        video_link = video_box[0].find('a', href=True)
-                        media_links.append(video_link['href'])
-                        media_types.append("Youtube Video")   
-                    except:
-                        try:
-                            poll_box = container.find_all("div",{"class": "feed-shared-update-v2__content overflow-hidden feed-shared-poll ember-view"})
-                            media_links.append("None")
-                            media_types.append("Other: Poll, Shared Post, etc")
-                        except:
-                            media_links.append("None")
-                            media_types.append("Unknown")
-        
+        if posts is None:
+            posts = self.scrape_posts(author_url=author_url)
+        media_links = [post["media_link"] for post in posts]
+        media_types = [post["media_type"] for post in posts]
         return media_links, media_types
 
-    def scrape_reactions_count(self, author_url: str) -> list:
+    def scrape_reactions_count(self, author_url: str, posts: list = None) -> list:
         '''Return the count of the posts' reactions.
         '''
-        reactions_counts = []
-
-        for container in self.scrape_containers(author_url=author_url):
-            try:
-                reactions_count_box = container.find("div", {"class":"social-details-social-activity update-v2-social-activity"})
-                reactions_count = reactions_count_box.find("span", {"class":"social-details-social-counts__reactions-count"}).text
-                reactions_count = int(reactions_count.replace(",", ""))
-                reactions_counts.append(reactions_count)
-            except AttributeError:
-                try:
-                    reactions_count = reactions_count_box.find("span", {"class":"social-details-social-counts__social-proof-fallback-number"}).text
-                    reactions_count = int(reactions_count.replace(",", ""))
-                    reactions_counts.append(reactions_count)
-                except:
-                    reactions_counts.append(0)
-
-        return reactions_counts
+        if posts is None:
+            posts = self.scrape_posts(author_url=author_url)
+        return [post["reactions_count"] for post in posts]
 
-    def scrape_comments_count(self, author_url: str) -> list:
+    def scrape_comments_count(self, author_url: str, posts: list = None) -> list:
         '''Return the count of the posts' comments.
         '''
-        comments_counts = []
+        if posts is None:
+            posts = self.scrape_posts(author_url=author_url)
+        return [post["comments_count"] for post in posts]
 
-        for container in self.scrape_containers(author_url=author_url):
-            try:
-                comments_count_div_box = container.find("div", {"class":"social-details-social-activity update-v2-social-activity"})
-                comments_count_li_box = comments_count_div_box.find("li", {"class":"social-details-social-counts__item social-details-social-counts__comments social-details-social-counts__item--with-social-proof"})
-                comments_count = comments_count_li_box.find("span").text
-                comments_count = int(re.findall("\d+\\b", comments_count)[0])
-                comments_counts.append(comments_count)
-            except AttributeError:
-                comments_counts.append(0)
-            
-        return comments_counts
-    
-    def scrape_shares_count(self, author_url: str) -> list:
+    def scrape_shares_count(self, author_url: str, posts: list = None) -> list:
         '''Return the count of the posts' shares.
         '''
-        shares_counts = []
+        if posts is None:
+            posts = self.scrape_posts(author_url=author_url)
+        return [post["shares_count"] for post in posts]
 
-        for container in self.scrape_containers(author_url=author_url):
-            try:
-                shares_count_div_box = container.find("div", {"class":"social-details-social-activity update-v2-social-activity"})
-                shares_count_li_box = shares_count_div_box.find("li", {"class":"social-details-social-counts__item social-details-social-counts__item--with-social-proof"})
-                shares_count = shares_count_li_box.find("span").text
-                shares_count = int(re.findall("\d+\\b", shares_count)[0])
-                shares_counts.append(shares_count)
-            except AttributeError:
-                shares_counts.append(0)
+    def build_raw_record(self, posts: list) -> list:
+        '''Return the raw record expected by the cleaner from a list of post records.
+        :param posts: records from `scrape_posts`.
+        '''
+        texts = self.scrape_content_text(author_url=None, posts=posts)
+        media_links, media_types = self.scrape_media(author_url=None, posts=posts)
+        reactions_count = self.scrape_reactions_count(author_url=None, posts=posts)
+        comments_count = self.scrape_comments_count(author_url=None, posts=posts)
+        shares_count = self.scrape_shares_count(author_url=None, posts=posts)
 
-        return shares_counts
+        return [texts, reactions_count, comments_count, shares_count, media_links, media_types]
 
-    def scrape_data(self) -> dict:
+    def scrape_author(self, author_name: str, author_url: str) -> list:
+        '''Return the raw record of one author.
+        :param author_name:
+        :param author_url: Linkedin profile link.
+        '''
+        metrics = cu.get_metrics()
+        with metrics.time(stage=cu.SCRAPE_STAGE, author=author_name):
+            known_fingerprints = None
+            if self.incremental:
+                known_fingerprints = self.load_known_fingerprints().get(author_name, set())
+            elif self.scroll_max_depth > 0:
+                known_fingerprints = self.get_high_water_mark(author_name=author_name)
+            posts = self.scrape_posts(author_url=author_url, known_fingerprints=known_fingerprints, author_name=author_name) # Load and parse the page only once
+            metrics.increment(name="posts_seen", value=len(posts), author=author_name)
+            if self.incremental:
+                new_posts = self.filter_known_posts(posts=posts, known_fingerprints=known_fingerprints)
+                self.logger.info(f"> Skipped {len(posts) - len(new_posts)} already ingested posts of author {author_name}.")
+                metrics.increment(name="posts_skipped", value=len(posts) - len(new_posts), author=author_name)
+                posts = new_posts
+            metrics.increment(name="posts_new", value=len(posts), author=author_name)
+            if self.scheduling:
+                sch.get_author_scheduler().record_visit(author_name=author_name)
+            return self.build_raw_record(posts=posts)
+
+    def iter_author_records(self, authors: list = None):
+        '''Yield (author_name, raw_record) as soon as each author is scraped.
+        :param authors: list of (author_name, author_url), read from the database if not given.
+        '''
+        # authors = [("Albert Bellamy", "https://www.linkedin.com/in/bellamy-al/recent-activity/shares/")] # for testing
+        if authors is None:
+            authors = self.get_authors()
+        for author_name, author_url in authors:
+            raw_record = try_scrape_author(scraper=self, author_name=author_name, author_url=author_url)
+            if raw_record is None:
+                continue # Recorded for the run summary
+            self.logger.info(f"> Successfully scraped new posts of author {author_name}.")
+            yield author_name, raw_record
+
+    def scrape_data(self, authors: list = None) -> dict:
         '''Return texts, reactions count, comments count, shares count, media links, and media types of each author.
+        :param authors: list of (author_name, author_url), read from the database if not given.
         '''
         author_posts = {}
-        # author_urls = ["https://www.linkedin.com/in/bellamy-al/recent-activity/shares/"] # for testing
-        # author_names = ["Albert Bellamy"] # for testing
-        author_urls = cu.get_attribute_values(connection=self.connect_to_postgres(), run_type=cu.AUTHOR_RT, fields="linkedin_profile_link") # Get profile URLs from the database
-        author_names = cu.get_attribute_values(connection=self.connect_to_postgres(), run_type=cu.AUTHOR_RT, fields="author_name") # Get profile names from the database
-        for n, author_url in enumerate(author_urls):
-            texts = self.scrape_content_text(author_url=author_url)
-            media_links = self.scrape_media(author_url=author_url)[0]
-            media_types = self.scrape_media(author_url=author_url)[1]
-            reactions_count = self.scrape_reactions_count(author_url=author_url)
-            comments_count = self.scrape_comments_count(author_url=author_url)
-            shares_count = self.scrape_shares_count(author_url=author_url)
-
-            author_posts.update({author_names[n]:[texts, reactions_count, comments_count, shares_count, media_links, media_types]})
-            
-            self.logger.info(f"> Successfully scraped new posts of author {author_names[n]}.")
+        for author_name, raw_record in self.iter_author_records(authors=authors):
+            author_posts.update({author_name:raw_record})
 
         return author_posts
 
 
+class LinkedinScriptScraper(LinkedinScraper):
+    '''A LinkedinScraper that extracts the posts inside the browser with EXTRACT_POSTS_SCRIPT.
+    Only the extracted fields are sent back instead of the whole page source, so its containers are
+    the raw post records of the script.
+    '''
+    def run_extraction_script(self, author_name: str = None) -> list:
+        '''Return the raw post records of the page already open in the browser.
+        :param author_name: author of the page, for the per-author metrics.
+        '''
+        with cu.get_metrics().time(stage=cu.SCRIPT_EXTRACTION_STAGE, author=author_name):
+            return json.loads(self.driver.execute_script(EXTRACT_POSTS_SCRIPT))
+
+    def scrape_containers(self, author_url: str, author_name: str = None) -> list:
+        cu.load_page(driver=self.driver, url=author_url, author=author_name)
+        return self.run_extraction_script(author_name=author_name)
+
+    def reload_containers(self, author_name: str = None) -> list:
+        return self.run_extraction_script(author_name=author_name)
+
+    def extract_text(self, container) -> str:
+        '''Return the content text of a raw post record.
+        :param container: a raw post record of the extraction script.
+        '''
+        return container["text"] if container["text"] is not None else 'None'
+
+    def extract_post(self, container) -> dict:
+        '''Return the record LinkedinScraper.extract_post returns for the same post.
+        :param container: a raw post record of the extraction script.
+        '''
+        return {"text": self.extract_text(container),
+                "media_link": container["media_link"] if container["media_link"] is not None else "None",
+                "media_type": container["media_type"],
+                "reactions_count": self.parse_reactions_count(container["reactions_text"]) if container["reactions_text"] is not None else 0,
+                "comments_count": self.parse_activity_count(container["comments_text"]) if container["comments_text"] is not None else 0,
+                "shares_count": self.parse_activity_count(container["shares_text"]) if container["shares_text"] is not None else 0}
+
+
+def try_scrape_author(scraper, author_name: str, author_url: str) -> list:
+    '''Return the raw record of one author, None if it could not be scraped.
+    A failure is recorded for the run summary and the author scheduler, it never stops the other authors.
+    Only the page load failures are counted by the circuit breaker, a database or parsing error leaves it as it is.
+    While the circuit breaker is open, the author fails without loading its page.
+    :param scraper: a LinkedinScraper session, anything with scrape_author().
+    :param author_name:
+    :param author_url: Linkedin profile link.
+    '''
+    circuit_breaker = cu.get_circuit_breaker()
+    metrics = cu.get_metrics()
+    if not circuit_breaker.allow():
+        metrics.record_failure(author=author_name, error="Skipped while the circuit breaker is open")
+        return None
+    try:
+        raw_record = scraper.scrape_author(author_name=author_name, author_url=author_url)
+    except Exception as e:
+        cu.get_logger().error(f"Error while scraping the posts of author {author_name} : " + " Error: " + str(sys.exc_info()[0]))
+        if isinstance(e, cu.PageLoadError):
+            circuit_breaker.record_failure()
+        if getattr(scraper, "scheduling", False):
+            sch.get_author_scheduler().record_failure(author_name=author_name)
+        metrics.record_failure(author=author_name, error=cu.truncate_payload(f"{type(e).__name__}: {e}", max_length=300))
+        return None
+    circuit_breaker.record_success()
+    metrics.increment(name="authors_scraped")
+    return raw_record
+
+
+def create_scraper(driver=None) -> LinkedinScraper:
+    '''Return a scraper session using the extraction mode set by EXTRACT_MODE.
+    :param driver: a logged-in driver, a new session by default.
+    '''
+    if cu.EXTRACT_MODE not in cu.EXTRACT_MODES:
+        raise ValueError(f"Unknown extract mode {cu.EXTRACT_MODE}, expected one of {', '.join(cu.EXTRACT_MODES)}")
+    if cu.EXTRACT_MODE == "script":
+        return LinkedinScriptScraper(driver=driver)
+    return LinkedinScraper(driver=driver)
+
+
+class LinkedinScraperPool():
+    '''A pool of logged-in LinkedinScraper sessions that scrape authors in parallel.
+    '''
+    def __init__(self, size: int = None, min_interval: float = None, max_concurrent_pages: int = None, driver_factory=None):
+        '''
+        :param size: number of browser sessions, SCRAPER_WORKERS by default.
+        :param min_interval: minimum seconds between two page loads of the same worker, SCRAPER_MIN_INTERVAL by default.
+        :param max_concurrent_pages: maximum page loads in flight across the pool, the pool size by default.
+        :param driver_factory: callable returning a logged-in driver, cu.login_linkedin by default.
+        '''
+        self.logger = cu.create_log()
+        self.size = max(1, size if size is not None else cu.SCRAPER_WORKERS)
+        self.min_interval = min_interval if min_interval is not None else cu.SCRAPER_MIN_INTERVAL
+        self.page_slots = threading.BoundedSemaphore(max_concurrent_pages or self.size)
+        self.driver_factory = driver_factory if driver_factory is not None else cu.login_linkedin
+        self.stopping = threading.Event()
+        self.scrapers = []
+
+    def start(self):
+        '''Start and log in all browser sessions of the pool.
+        The browsers start in parallel, cu.login_linkedin lets one of them submit the login form and the others restore its session.
+        '''
+        if len(self.scrapers) == 0:
+            drivers = []
+            errors = []
+            with ThreadPoolExecutor(max_workers=self.size) as executor:
+                for future in [executor.submit(self.driver_factory) for i in range(self.size)]:
+                    try:
+                        drivers.append(future.result())
+                    except Exception as e:
+                        errors.append(e)
+            if len(errors) > 0:
+                # Never leave the browsers that did start running
+                for driver in drivers:
+                    try:
+                        driver.quit()
+                    except:
+                        self.logger.error("Error while closing a scraper session : " + " Error: " + str(sys.exc_info()[0]))
+                self.logger.error(f"Error while starting the scraper sessions, {len(errors)} of {self.size} failed.")
+                raise errors[0]
+            self.scrapers = [create_scraper(driver=driver) for driver in drivers]
+            if self.scrapers[0].incremental:
+                # Load the fingerprints once and share them between the sessions
+                known_fingerprints = self.scrapers[0].load_known_fingerprints()
+                for scraper in self.scrapers:
+                    scraper.known_fingerprints = known_fingerprints
+            self.logger.info(f"> Started {self.size} scraper sessions.")
+        return self
+
+    def close(self):
+        '''Quit all browser sessions of the pool.
+        '''
+        for scraper in self.scrapers:
+            try:
+                scraper.driver.quit()
+            except:
+                self.logger.error("Error while closing a scraper session : " + " Error: " + str(sys.exc_info()[0]))
+        self.scrapers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def scrape_share(self, scraper: LinkedinScraper, authors: list, results: queue.Queue):
+        '''Scrape the share of authors assigned to one worker, pacing its page loads.
+        :param scraper: the worker session.
+        :param authors: list of (author_name, author_url).
+        :param results: queue receiving (author_name, raw_record) of every scraped author, None for a failed author.
+        '''
+        last_load = None
+        for author_name, author_url in authors:
+            if self.stopping.is_set():
+                break
+            if last_load is not None:
+                wait = self.min_interval - (time.monotonic() - last_load)
+                if wait > 0:
+                    time.sleep(wait)
+            with self.page_slots:
+                last_load = time.monotonic()
+                raw_record = try_scrape_author(scraper=scraper, author_name=author_name, author_url=author_url)
+            if raw_record is None:
+                results.put(None) # Recorded for the run summary, only counted as done by the consumer
+                continue
+            self.logger.info(f"> Successfully scraped new posts of author {author_name}.")
+            results.put((author_name, raw_record))
+
+    def get_authors(self) -> list:
+        '''Return (author_name, author_url) of the authors to scrape, read by the first session of the pool.
+        '''
+        self.start()
+        return self.scrapers[0].get_authors()
+
+    def iter_author_records(self, authors: list = None):
+        '''Spread the authors across the pool and yield (author_name, raw_record) in completion order.
+        :param authors: list of (author_name, author_url), read from the database if not given.
+        '''
+        self.start()
+        if authors is None:
+            authors = self.scrapers[0].get_authors()
+        shares = [authors[i::self.size] for i in range(self.size)]
+
+        results = queue.Queue(maxsize=self.size) # Workers wait while the consumer is behind
+        self.stopping.clear()
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            futures = [executor.submit(self.scrape_share, scraper, share, results) for scraper, share in zip(self.scrapers, shares)]
+            try:
+                remaining = len(authors)
+                while remaining > 0:
+                    try:
+                        author_record = results.get(timeout=1)
+                    except queue.Empty:
+                        if all(future.done() for future in futures) and results.empty():
+                            break # A worker stopped on an error
+                        continue
+                    remaining -= 1
+                    if author_record is not None:
+                        yield author_record
+            finally:
+                # Release the workers if the consumer stops early
+                self.stopping.set()
+                while not all(future.done() for future in futures):
+                    try:
+                        results.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+            for future in futures:
+                future.result() # Raise the errors of the workers
+
+    def scrape_data(self, authors: list = None) -> dict:
+        '''Spread the authors across the pool and merge the results like LinkedinScraper.scrape_data.
+        :param authors: list of (author_name, author_url), read from the database if not given.
+        '''
+        self.start()
+        if authors is None:
+            authors = self.scrapers[0].get_authors()
+
+        results = dict(self.iter_author_records(authors=authors))
+
+        return {author_name: results[author_name] for author_name, author_url in authors if author_name in results}
+
+
 class OtherScraper(DataScraper):
     pass
@@ -1,6 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import asyncio
 import getopt
+import threading
+import signal
+import queue
 import sys
-from time import sleep
 
 import data_scraper as ds
 import data_cleaner as dc
@@ -9,32 +14,464 @@ import common_utils as cu
 
 
 class Pipeline():
-    def __init__(self):
+    def __init__(self, resume: bool = False):
+        '''
+        :param resume: skip the authors completed in the last CHECKPOINT_WINDOW_HOURS, e.g. by an interrupted run.
+        '''
         self.logger = cu.create_log()
+        self.resume = resume
+        self.checkpoints = cu.TimestampStore(path=cu.CHECKPOINT_PATH, name="completed_authors")
+
+    def complete_author(self, author: str):
+        '''Checkpoint an author whose posts are all ingested. Redoing an author is safe, already ingested posts are skipped.
+        :param author:
+        '''
+        self.checkpoints.set(author_name=author)
+
+    def get_window_start(self, now: datetime = None) -> datetime:
+        '''Return the time from which a checkpointed author counts as completed.
+        :param now:
+        '''
+        return (now if now is not None else datetime.now()) - timedelta(hours=cu.CHECKPOINT_WINDOW_HOURS)
+
+    def is_completed(self, author: str, window_start: datetime) -> bool:
+        '''Return True if the author was checkpointed after window_start.
+        :param author:
+        :param window_start:
+        '''
+        completed_at = self.checkpoints.get(author_name=author)
+        return completed_at is not None and completed_at >= window_start
+
+    def filter_pending_authors(self, authors: list, now: datetime = None) -> list:
+        '''Return the authors not completed in the last CHECKPOINT_WINDOW_HOURS.
+        :param authors: list of (author_name, author_url).
+        :param now:
+        '''
+        window_start = self.get_window_start(now=now)
+        pending_authors = [(author_name, author_url) for author_name, author_url in authors
+                           if not self.is_completed(author=author_name, window_start=window_start)]
+        self.logger.info(f"> Resuming after {len(authors) - len(pending_authors)} authors completed since {window_start.isoformat(timespec='minutes')}.")
+        return pending_authors
+
+    def get_pending_authors(self, scraper) -> list:
+        '''Return the authors left to scrape when resuming, None to scrape every author otherwise.
+        :param scraper: anything with get_authors(), e.g. a LinkedinScraperPool.
+        '''
+        if not self.resume:
+            return None
+        return self.filter_pending_authors(authors=scraper.get_authors())
+
+    def stage_records(self, author_records):
+        '''Pass through (author_name, raw_record) pairs, staging each one first when STAGE_RAW_RECORDS is set.
+        :param author_records: iterable of (author_name, raw_record).
+        '''
+        if not cu.STAGE_RAW_RECORDS:
+            yield from author_records
+            return
+        with cu.StagingWriter() as staging:
+            yield from staging.stage_records(author_records)
 
 
 class LinkedinPipeline(Pipeline):
-    def execute_flow(self):
-        # Scrape
-        scraper = ds.LinkedinScraper()
-        raw_records = scraper.scrape_data()
-        # Clean
-        cleaner = dc.LinkedinCleaner()
-        for author in raw_records.keys():
-            clean_records = cleaner.get_clean_records(raw_record=raw_records[author], author=author)
-            self.logger.info(clean_records)
-            # Ingest
-            ingester = di.LinkedinIngester()
-            ingester.ingest_data(clean_records=clean_records)
-            sleep(0.06)
-
-
-def main(run_type: str):
-    if run_type == cu.INGEST_RT:
-        LinkedinPipeline().execute_flow()
-    else:
-        pass
+    def execute_flow(self, scraper=None, cleaner=None, ingester=None):
+        '''Clean and ingest each author as soon as it is scraped, one author at a time.
+        :param scraper: anything with iter_author_records() and get_authors(), a LinkedinScraperPool by default.
+        :param cleaner: a LinkedinCleaner by default.
+        :param ingester: a LinkedinIngester by default.
+        '''
+        owns_scraper = scraper is None
+        scraper = scraper if scraper is not None else ds.LinkedinScraperPool()
+        cleaner = cleaner if cleaner is not None else dc.LinkedinCleaner()
+        ingester = ingester if ingester is not None else di.LinkedinIngester()
+        try:
+            authors = self.get_pending_authors(scraper=scraper)
+            # Scrape, staging the raw records of each author as soon as it is scraped
+            for author, raw_record in self.stage_records(scraper.iter_author_records(authors=authors)):
+                self.clean_and_ingest(cleaner=cleaner, ingester=ingester, author=author, raw_record=raw_record)
+        finally:
+            if owns_scraper:
+                scraper.close()
+
+    def clean_and_ingest(self, cleaner, ingester, author: str, raw_record: list) -> tuple:
+        '''Clean and ingest the raw record of one author, then checkpoint the author.
+        An error is logged and leaves the author unchecked, it never stops the other authors.
+        Return (inserted count, skipped count).
+        :param cleaner: a LinkedinCleaner.
+        :param ingester: a LinkedinIngester.
+        :param author:
+        :param raw_record:
+        '''
+        if len(raw_record[0]) == 0:
+            self.complete_author(author=author)
+            return 0, 0 # No new posts, nothing to clean or ingest
+        try:
+            clean_records = cleaner.get_clean_records(raw_record=raw_record, author=author)
+            cu.log_event("clean_records", author=author, count=len(clean_records), records=clean_records)
+        except:
+            self.logger.error(f"Error while cleaning the records of author {author} : " + " Error: " + str(sys.exc_info()[0]))
+            return 0, 0
+        try:
+            inserted, skipped = ingester.bulk_ingest_data(clean_records=clean_records, author=author)
+        except:
+            self.logger.error(f"Error while ingesting the clean records of author {author} : " + " Error: " + str(sys.exc_info()[0]))
+            return 0, 0
+        self.complete_author(author=author)
+
+        return inserted, skipped
+
+    def execute_scrape_flow(self, staging_path: str = None, scraper=None) -> int:
+        '''Scrape every author and stage the raw records, without cleaning or ingesting them. Return the number of authors.
+        :param staging_path: staging file, or folder of a new timestamped staging file, cu.get_staging_path() by default.
+        :param scraper: anything with iter_author_records(), a LinkedinScraperPool by default.
+        '''
+        if scraper is not None:
+            return cu.write_staged_records(author_records=scraper.iter_author_records(), path=staging_path)
+        with ds.LinkedinScraperPool() as scraper_pool:
+            return cu.write_staged_records(author_records=scraper_pool.iter_author_records(), path=staging_path)
+
+    def execute_staged_flow(self, staging_path: str = None, cleaner=None, ingester=None, latest_only: bool = True) -> tuple:
+        '''Replay staged raw records through the cleaner and the ingester, without starting a browser.
+        Already ingested posts are skipped, so a file can be replayed again after a cleaner change or a failure.
+        Each author is checkpointed once ingested, a failed author is logged and never stops the others.
+        With --resume, the authors completed in the last CHECKPOINT_WINDOW_HOURS are not replayed.
+        Return (inserted count, skipped count).
+        :param staging_path: staging file, or folder of staging files, cu.get_staging_path() by default.
+        :param latest_only: only replay the newest file of a folder, all of them otherwise.
+        :param cleaner: a LinkedinCleaner by default.
+        :param ingester: a LinkedinIngester by default.
+        '''
+        cleaner = cleaner if cleaner is not None else dc.LinkedinCleaner()
+        ingester = ingester if ingester is not None else di.LinkedinIngester()
+        window_start = self.get_window_start()
+        inserted = 0
+        skipped = 0
+        for author, raw_record in cu.read_staged_records(path=staging_path, latest_only=latest_only):
+            if self.resume and self.is_completed(author=author, window_start=window_start):
+                continue
+            author_inserted, author_skipped = self.clean_and_ingest(cleaner=cleaner, ingester=ingester, author=author, raw_record=raw_record)
+            inserted += author_inserted
+            skipped += author_skipped
+        self.logger.info(f"> Ingested {inserted} staged records, skipped {skipped} existing records.")
+
+        return inserted, skipped
+
+    def run_clean_stage(self, cleaner, raw_queue: queue.Queue, clean_queue: queue.Queue):
+        '''Clean every raw record of raw_queue into clean_queue until the end of the stream.
+        :param cleaner: a LinkedinCleaner.
+        :param raw_queue: queue of (author, raw_record), None ends the stream.
+        :param clean_queue: queue of (author, clean records), None ends the stream.
+        '''
+        try:
+            while True:
+                author_record = raw_queue.get()
+                if author_record is None:
+                    break
+                author, raw_record = author_record
+                if len(raw_record[0]) == 0:
+                    self.complete_author(author=author)
+                    continue # No new posts, nothing to clean or ingest
+                try:
+                    clean_queue.put((author, cleaner.get_clean_records(raw_record=raw_record, author=author)))
+                except:
+                    self.logger.error(f"Error while cleaning the records of author {author} : " + " Error: " + str(sys.exc_info()[0]))
+        finally:
+            clean_queue.put(None)
+
+    def run_ingest_stage(self, ingester, clean_queue: queue.Queue):
+        '''Ingest every clean record of clean_queue until the end of the stream.
+        :param ingester: a LinkedinIngester.
+        :param clean_queue: queue of (author, clean records), None ends the stream.
+        '''
+        while True:
+            author_records = clean_queue.get()
+            if author_records is None:
+                break
+            author, clean_records = author_records
+            try:
+                ingester.bulk_ingest_data(clean_records=clean_records, author=author)
+            except:
+                self.logger.error(f"Error while ingesting the clean records of author {author} : " + " Error: " + str(sys.exc_info()[0]))
+                continue
+            self.complete_author(author=author)
+
+    def execute_stream_flow(self, scraper=None, cleaner=None, ingester=None, queue_size: int = None):
+        '''Clean and ingest each author as soon as it is scraped, while the next authors are being scraped.
+        The stages run concurrently and are connected by bounded queues.
+        :param scraper: anything with iter_author_records() and get_authors(), a LinkedinScraperPool by default.
+        :param cleaner: a LinkedinCleaner by default.
+        :param ingester: a LinkedinIngester by default.
+        :param queue_size: maximum number of authors waiting between two stages, PIPELINE_QUEUE_SIZE by default.
+        '''
+        if queue_size is None:
+            queue_size = cu.PIPELINE_QUEUE_SIZE
+        owns_scraper = scraper is None
+        scraper = scraper if scraper is not None else ds.LinkedinScraperPool()
+        cleaner = cleaner if cleaner is not None else dc.LinkedinCleaner()
+        ingester = ingester if ingester is not None else di.LinkedinIngester()
+
+        raw_queue = queue.Queue(maxsize=queue_size)
+        clean_queue = queue.Queue(maxsize=queue_size)
+        stages = [threading.Thread(target=self.run_clean_stage, args=(cleaner, raw_queue, clean_queue)),
+                  threading.Thread(target=self.run_ingest_stage, args=(ingester, clean_queue))]
+        for stage in stages:
+            stage.start()
+
+        try:
+            authors = self.get_pending_authors(scraper=scraper)
+            for author_record in self.stage_records(scraper.iter_author_records(authors=authors)):
+                raw_queue.put(author_record)
+        finally:
+            raw_queue.put(None)
+            for stage in stages:
+                stage.join()
+            if owns_scraper:
+                scraper.close()
+
+
+class AsyncLinkedinPipeline(LinkedinPipeline):
+    '''Run the scrape, clean and ingest stages under an asyncio event loop.
+    The blocking calls of every stage run in the stage's own thread pool, so browser waits,
+    parsing and database round trips of different authors overlap.
+    '''
+    def __init__(self, clean_concurrency: int = None, ingest_concurrency: int = None, queue_size: int = None, resume: bool = False):
+        '''
+        :param clean_concurrency: number of authors cleaned at once, PIPELINE_CLEAN_CONCURRENCY by default.
+        :param ingest_concurrency: number of authors ingested at once, PIPELINE_INGEST_CONCURRENCY by default.
+        :param queue_size: maximum number of authors waiting between two stages, PIPELINE_QUEUE_SIZE by default.
+        :param resume: skip the authors completed in the last CHECKPOINT_WINDOW_HOURS, e.g. by an interrupted run.
+        '''
+        super().__init__(resume=resume)
+        self.clean_concurrency = max(1, clean_concurrency if clean_concurrency is not None else cu.PIPELINE_CLEAN_CONCURRENCY)
+        self.ingest_concurrency = max(1, ingest_concurrency if ingest_concurrency is not None else cu.PIPELINE_INGEST_CONCURRENCY)
+        self.queue_size = queue_size if queue_size is not None else cu.PIPELINE_QUEUE_SIZE
+        self.stopping = threading.Event()
+        self.inserted = 0
+        self.skipped = 0
+
+    def stop(self):
+        '''Stop scraping new authors, the authors already scraped are still cleaned and ingested. Safe to call from any thread.
+        '''
+        if not self.stopping.is_set():
+            self.logger.info("> Stopping the pipeline after the authors in flight.")
+        self.stopping.set()
+
+    async def run_scrape_worker(self, scraper, executor: ThreadPoolExecutor, author_queue: asyncio.Queue, raw_queue: asyncio.Queue, staging=None):
+        '''Scrape authors of author_queue with one browser session until the queue is empty or the pipeline stops.
+        :param scraper: a LinkedinScraper session, anything with scrape_author().
+        :param executor: thread pool of the scrape stage.
+        :param author_queue: queue of (author_name, author_url).
+        :param raw_queue: queue receiving (author_name, raw_record).
+        :param staging: a cu.StagingWriter receiving every raw record, if any.
+        '''
+        loop = asyncio.get_running_loop()
+        while not self.stopping.is_set():
+            try:
+                author_name, author_url = author_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            raw_record = await loop.run_in_executor(executor, ds.try_scrape_author, scraper, author_name, author_url)
+            if raw_record is None:
+                continue # Recorded for the run summary
+            self.logger.info(f"> Successfully scraped new posts of author {author_name}.")
+            if staging is not None:
+                staging.write(author_name=author_name, raw_record=raw_record)
+            await raw_queue.put((author_name, raw_record))
+
+    async def run_clean_worker(self, cleaner, executor: ThreadPoolExecutor, raw_queue: asyncio.Queue, clean_queue: asyncio.Queue):
+        '''Clean every raw record of raw_queue into clean_queue until the end of the stream.
+        :param cleaner: a LinkedinCleaner.
+        :param executor: thread pool of the clean stage.
+        :param raw_queue: queue of (author, raw_record), None ends the stream of one worker.
+        :param clean_queue: queue receiving (author, clean records) of each author.
+        '''
+        loop = asyncio.get_running_loop()
+        while True:
+            author_record = await raw_queue.get()
+            if author_record is None:
+                break
+            author, raw_record = author_record
+            if len(raw_record[0]) == 0:
+                self.complete_author(author=author)
+                continue # No new posts, nothing to clean or ingest
+            try:
+                clean_records = await loop.run_in_executor(executor, cleaner.get_clean_records, raw_record, author)
+            except asyncio.CancelledError:
+                raise
+            except:
+                self.logger.error(f"Error while cleaning the records of author {author} : " + " Error: " + str(sys.exc_info()[0]))
+                continue
+            await clean_queue.put((author, clean_records))
+
+    async def run_ingest_worker(self, ingester, executor: ThreadPoolExecutor, clean_queue: asyncio.Queue):
+        '''Ingest every clean record of clean_queue until the end of the stream.
+        :param ingester: a LinkedinIngester.
+        :param executor: thread pool of the ingest stage.
+        :param clean_queue: queue of (author, clean records), None ends the stream of one worker.
+        '''
+        loop = asyncio.get_running_loop()
+        while True:
+            author_records = await clean_queue.get()
+            if author_records is None:
+                break
+            author, clean_records = author_records
+            try:
+                inserted, skipped = await loop.run_in_executor(executor, ingester.bulk_ingest_data, clean_records, author)
+            except asyncio.CancelledError:
+                raise
+            except:
+                self.logger.error(f"Error while ingesting the clean records of author {author} : " + " Error: " + str(sys.exc_info()[0]))
+                continue
+            self.inserted += inserted
+            self.skipped += skipped
+            self.complete_author(author=author)
+
+    async def run(self, authors: list, scrapers: list, cleaner, ingester) -> tuple:
+        '''Scrape, clean and ingest the authors with one scrape worker per session. Return (inserted count, skipped count).
+        Cancelling the task cancels the pending work of every stage and waits for the calls already running.
+        :param authors: list of (author_name, author_url).
+        :param scrapers: LinkedinScraper sessions, each one used by a single thread at a time.
+        :param cleaner: a LinkedinCleaner.
+        :param ingester: a LinkedinIngester.
+        '''
+        self.stopping.clear()
+        self.inserted = 0
+        self.skipped = 0
+        author_queue = asyncio.Queue()
+        for author in authors:
+            author_queue.put_nowait(author)
+        raw_queue = asyncio.Queue(maxsize=self.queue_size)
+        clean_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        staging = cu.StagingWriter() if cu.STAGE_RAW_RECORDS else None
+        executors = [ThreadPoolExecutor(max_workers=len(scrapers)),
+                     ThreadPoolExecutor(max_workers=self.clean_concurrency),
+                     ThreadPoolExecutor(max_workers=self.ingest_concurrency)]
+        scrape_executor, clean_executor, ingest_executor = executors
+        scrape_tasks = [asyncio.create_task(self.run_scrape_worker(scraper, scrape_executor, author_queue, raw_queue, staging)) for scraper in scrapers]
+        clean_tasks = [asyncio.create_task(self.run_clean_worker(cleaner, clean_executor, raw_queue, clean_queue)) for i in range(self.clean_concurrency)]
+        ingest_tasks = [asyncio.create_task(self.run_ingest_worker(ingester, ingest_executor, clean_queue)) for i in range(self.ingest_concurrency)]
+        try:
+            # Close each stage once the previous one is done
+            await asyncio.gather(*scrape_tasks)
+            for task in clean_tasks:
+                await raw_queue.put(None)
+            await asyncio.gather(*clean_tasks)
+            for task in ingest_tasks:
+                await clean_queue.put(None)
+            await asyncio.gather(*ingest_tasks)
+        finally:
+            self.stopping.set()
+            for task in scrape_tasks + clean_tasks + ingest_tasks:
+                task.cancel()
+            await asyncio.gather(*scrape_tasks, *clean_tasks, *ingest_tasks, return_exceptions=True)
+            for executor in executors:
+                executor.shutdown(wait=True, cancel_futures=True) # The drivers must be idle before they are closed
+            if staging is not None:
+                staging.close()
+
+        self.logger.info(f"> Ingested {self.inserted} records, skipped {self.skipped} existing records.")
+        return self.inserted, self.skipped
+
+    def execute_async_flow(self, authors: list = None, scrapers: list = None, cleaner=None, ingester=None) -> tuple:
+        '''Run the pipeline under a new event loop. SIGTERM stops it after the authors in flight, Ctrl+C cancels it.
+        Return (inserted count, skipped count).
+        :param authors: list of (author_name, author_url), read from the database if not given.
+        :param scrapers: LinkedinScraper sessions, the sessions of a LinkedinScraperPool by default.
+        :param cleaner: a LinkedinCleaner by default.
+        :param ingester: a LinkedinIngester by default.
+        '''
+        scraper_pool = None
+        if scrapers is None:
+            scraper_pool = ds.LinkedinScraperPool().start()
+            scrapers = scraper_pool.scrapers
+        cleaner = cleaner if cleaner is not None else dc.LinkedinCleaner()
+        ingester = ingester if ingester is not None else di.LinkedinIngester()
+
+        async def run_until_stopped():
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.stop)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass # Only the main thread of a Unix process can handle signals
+            return await self.run(authors=authors, scrapers=scrapers, cleaner=cleaner, ingester=ingester)
+
+        try:
+            if authors is None:
+                authors = scrapers[0].get_authors()
+            if self.resume:
+                authors = self.filter_pending_authors(authors=authors)
+            return asyncio.run(run_until_stopped())
+        finally:
+            if scraper_pool is not None:
+                scraper_pool.close()
+
+
+USAGE = f'''Usage: python pipeline.py [--stage STAGE] [--staging-path PATH] [--resume]
+Stages:
+  {cu.INGEST_RT}   scrape, clean and ingest every author (default)
+  {cu.STREAM_RT}   same as {cu.INGEST_RT}, cleaning and ingesting while the next authors are scraped
+  {cu.ASYNC_RT}    same as {cu.STREAM_RT}, under an asyncio event loop
+  {cu.SCRAPE_RT}   scrape only and stage the raw records to a new file of the staging folder
+  {cu.STAGED_RT}   replay the newest staging file of the folder, or the given file, through cleaning and ingestion
+  {cu.DATE_RT}     pre-populate date_dimension
+Options:
+  --resume  skip the authors completed in the last CHECKPOINT_WINDOW_HOURS hours, e.g. by an interrupted run
+'''
+
+
+def main(run_type: str, staging_path: str = None, resume: bool = False):
+    cu.reset_metrics()
+    try:
+        if run_type == cu.INGEST_RT:
+            LinkedinPipeline(resume=resume).execute_flow()
+        elif run_type == cu.STREAM_RT:
+            LinkedinPipeline(resume=resume).execute_stream_flow()
+        elif run_type == cu.ASYNC_RT:
+            AsyncLinkedinPipeline(resume=resume).execute_async_flow()
+        elif run_type == cu.SCRAPE_RT:
+            LinkedinPipeline().execute_scrape_flow(staging_path=staging_path)
+        elif run_type == cu.STAGED_RT:
+            LinkedinPipeline(resume=resume).execute_staged_flow(staging_path=staging_path)
+        elif run_type == cu.DATE_RT:
+            with cu.pooled_connection() as connection:
+                cu.populate_date_dimension(connection=connection)
+        else:
+            pass
+    finally:
+        cu.log_run_summary()
+        cu.get_logger().info(f"> Dimension cache: {cu.get_dimension_cache().get_stats()}.")
+        cu.write_metrics()
+        cu.close_connection_pool()
+
+
+def parse_arguments(argv: list) -> tuple:
+    '''Return (run_type, staging_path, resume) from the command line arguments.
+    :param argv: arguments without the program name
+    '''
+    run_types = [cu.INGEST_RT, cu.STREAM_RT, cu.ASYNC_RT, cu.SCRAPE_RT, cu.STAGED_RT, cu.DATE_RT]
+    try:
+        opts, args = getopt.getopt(argv, "hs:p:r", ["help", "stage=", "staging-path=", "resume"])
+    except getopt.GetoptError as e:
+        sys.exit(f"{e}\n{USAGE}")
+
+    run_type = cu.INGEST_RT
+    staging_path = None
+    resume = False
+    for opt, value in opts:
+        if opt in ("-h", "--help"):
+            print(USAGE)
+            sys.exit(0)
+        elif opt in ("-s", "--stage"):
+            if value not in run_types:
+                sys.exit(f"Unknown stage {value}\n{USAGE}")
+            run_type = value
+        elif opt in ("-p", "--staging-path"):
+            staging_path = value
+        elif opt in ("-r", "--resume"):
+            resume = True
+
+    return run_type, staging_path, resume
 
 
 if __name__ == "__main__":
-    main(run_type=cu.INGEST_RT)
\ No newline at end of file
+    run_type, staging_path, resume = parse_arguments(sys.argv[1:])
+    main(run_type=run_type, staging_path=staging_path, resume=resume)
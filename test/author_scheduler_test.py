@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+import unittest
+import tempfile
+import json
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("LOGFILE", os.path.join(tempfile.gettempdir(), "linkedin_curator_test.log")) # Keep test runs out of logs/
+
+import common_utils as cu
+import author_scheduler as sch
+
+
+NOW = datetime(2022, 8, 29, 9, 0)
+
+
+def build_history(first_days_ago: int, every_days: int) -> dict:
+    '''Build the posts per date_key of an author first ingested first_days_ago days ago with 20 posts,
+    then posting once every every_days days, never if 0.
+    '''
+    history = {cu.compute_date_key(date=NOW - timedelta(days=first_days_ago)): 20}
+    for day in range(first_days_ago - 1, 0, -1):
+        if every_days > 0 and day % every_days == 0:
+            history[cu.compute_date_key(date=NOW - timedelta(days=day))] = 1
+    return history
+
+
+class Test_AuthorScheduler(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "schedule.json")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def create_scheduler(self, page_budget: int = 0) -> sch.AuthorScheduler:
+        return sch.AuthorScheduler(path=self.path, page_budget=page_budget, window_days=28, min_interval_days=1, max_interval_days=14)
+
+    def test_estimate_rate(self):
+        scheduler = self.create_scheduler()
+        self.assertAlmostEqual(1 / 7, scheduler.estimate_rate(post_counts={}, today=NOW))
+        # The backlog of the first visit does not count as posts
+        self.assertAlmostEqual(1 / 7, scheduler.estimate_rate(post_counts={cu.compute_date_key(date=NOW): 30}, today=NOW))
+        prolific = scheduler.estimate_rate(post_counts=build_history(first_days_ago=60, every_days=1), today=NOW)
+        quiet = scheduler.estimate_rate(post_counts=build_history(first_days_ago=60, every_days=0), today=NOW)
+        self.assertAlmostEqual((28 + 1) / (28 + 7), prolific)
+        self.assertAlmostEqual(1 / (28 + 7), quiet)
+        self.assertAlmostEqual(35 / 29, scheduler.get_interval_days(rate=prolific))
+        self.assertEqual(14, scheduler.get_interval_days(rate=quiet))
+
+    def test_plan_visits_quiet_authors_less_often(self):
+        scheduler = self.create_scheduler()
+        authors = [("Quiet", "quiet-url"), ("Prolific", "prolific-url"), ("New", "new-url")]
+        post_history = {"Quiet": build_history(first_days_ago=60, every_days=0),
+                        "Prolific": build_history(first_days_ago=60, every_days=1)}
+        for author_name in ("Quiet", "Prolific"):
+            scheduler.record_visit(author_name=author_name, visited_at=NOW - timedelta(days=3))
+
+        self.assertEqual([("New", "new-url"), ("Prolific", "prolific-url")], scheduler.plan(authors=authors, post_history=post_history, now=NOW))
+        later = NOW + timedelta(days=12)
+        self.assertEqual([("New", "new-url"), ("Prolific", "prolific-url"), ("Quiet", "quiet-url")],
+                         scheduler.plan(authors=authors, post_history=post_history, now=later))
+
+    def test_plan_respects_page_budget(self):
+        scheduler = self.create_scheduler(page_budget=2)
+        authors = [(f"Author {n}", f"url-{n}") for n in range(5)]
+        post_history = {f"Author {n}": build_history(first_days_ago=60, every_days=5 - n) for n in range(5)}
+        for author_name, author_url in authors:
+            scheduler.record_visit(author_name=author_name, visited_at=NOW - timedelta(days=7))
+
+        self.assertEqual([("Author 4", "url-4"), ("Author 3", "url-3")], scheduler.plan(authors=authors, post_history=post_history, now=NOW))
+
+    def test_failing_author_backs_off(self):
+        scheduler = self.create_scheduler()
+        authors = [("Failing", "failing-url"), ("New", "new-url")]
+        self.assertEqual(authors, scheduler.plan(authors=authors, post_history={}, now=NOW))
+
+        # A never visited author whose page keeps failing waits its visit interval between retries
+        failed_at = NOW
+        for run in range(3):
+            scheduler.record_failure(author_name="Failing", failed_at=failed_at)
+            self.assertEqual([("New", "new-url")], scheduler.plan(authors=authors, post_history={}, now=failed_at + timedelta(days=1)))
+            failed_at += timedelta(days=7)
+            self.assertEqual([("New", "new-url"), ("Failing", "failing-url")], self.create_scheduler().plan(authors=authors, post_history={}, now=failed_at))
+
+        # Once visited, the last visit counts
+        scheduler.record_visit(author_name="Failing", visited_at=failed_at + timedelta(days=1))
+        self.assertEqual([("New", "new-url")], scheduler.plan(authors=authors, post_history={}, now=failed_at + timedelta(days=7)))
+
+    def test_visits_are_saved(self):
+        scheduler = self.create_scheduler()
+        scheduler.record_visit(author_name="Author", visited_at=NOW)
+        with open(self.path) as f:
+            self.assertEqual({"last_visits": {"Author": "2022-08-29T09:00:00"}}, json.load(f))
+
+        self.assertEqual([], self.create_scheduler().plan(authors=[("Author", "url")], post_history={}, now=NOW + timedelta(hours=1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
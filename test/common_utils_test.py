@@ -1,13 +1,653 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
 from dotenv import load_dotenv
+import psycopg2
 import unittest
+import tempfile
+import logging
+import queue
+import json
+import re
+import time
 import os
 import sys
 sys.path.append("..")
+os.environ.setdefault("LOGFILE", os.path.join(tempfile.gettempdir(), "linkedin_curator_test.log")) # Keep test runs out of logs/
 
 import src.common_utils as cu
 
 
+class FakeDriver():
+    '''Return a scripted sequence of (containers count, elements count) page states.
+    '''
+    def __init__(self, states: list):
+        self.states = states
+        self.calls = 0
+
+    def execute_script(self, script: str):
+        state = self.states[min(self.calls, len(self.states) - 1)]
+        self.calls += 1
+        return list(state)
+
+
+class FlakyDriver(FakeDriver):
+    '''A FakeDriver whose first failures page loads raise.
+    '''
+    def __init__(self, failures: int):
+        super().__init__(states=[(3, 80)])
+        self.failures = failures
+        self.loads = 0
+        self.page_source = '<div class="ember-view occludable-update">Post</div>'
+        self.current_url = "data:,"
+
+    def get(self, url: str):
+        self.loads += 1
+        if self.loads <= self.failures:
+            raise RuntimeError("net::ERR_CONNECTION_RESET")
+        self.current_url = url
+
+
+class FakeConnection():
+    '''Stand-in for a psycopg2 connection, counting how many were opened.
+    '''
+    opened = 0
+
+    def __init__(self, *args, **kwargs):
+        FakeConnection.opened += 1
+        self.closed = 0
+        self.info = self
+        self.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeCursor():
+    '''Stand-in for a psycopg2 cursor inserting into a table with a unique first column.
+    Each statement returns a row per inserted record, like INSERT ... ON CONFLICT DO NOTHING RETURNING 1.
+    '''
+    def __init__(self, connection):
+        self.connection = connection
+        self.values = []
+        self.results = []
+
+    def mogrify(self, template: bytes, args: tuple) -> bytes:
+        self.values.append(args)
+        return repr(args).encode()
+
+    def execute(self, query: bytes):
+        if self.connection.fail_at == len(self.connection.statements):
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.connection.statements.append(query)
+        self.results = []
+        for args in self.values:
+            if args[0] not in self.connection.keys:
+                self.connection.keys.add(args[0])
+                self.results.append((1,))
+        self.values = []
+
+    def fetchall(self) -> list:
+        return self.results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class FakeTableConnection():
+    '''Stand-in for a psycopg2 connection to a table already holding the given keys.
+    '''
+    encoding = "UTF8"
+
+    def __init__(self, keys: set, fail_at: int = None):
+        self.keys = set(keys)
+        self.committed_keys = set(keys)
+        self.fail_at = fail_at
+        self.statements = []
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(connection=self)
+
+    def commit(self):
+        self.committed_keys = set(self.keys)
+
+    def rollback(self):
+        self.keys = set(self.committed_keys)
+
+
+class Test_BulkInsert(unittest.TestCase):
+    def test_bulk_insert_pages_and_conflicts(self):
+        connection = FakeTableConnection(keys={"post-3", "post-7", "post-8"})
+        records = [(f"post-{n}", "text") for n in range(10)] + [("post-0", "duplicate in the batch")]
+
+        self.assertEqual((7, 4), cu.run_bulk_insert_query(connection=connection, run_type=cu.POST_RT, records_to_insert=records, page_size=4))
+        self.assertEqual(3, len(connection.statements))
+        self.assertTrue(all(statement.startswith(f"INSERT INTO {cu.POST_TABLE} VALUES ".encode()) for statement in connection.statements))
+        self.assertEqual(set(f"post-{n}" for n in range(10)), connection.committed_keys)
+        # Replaying the batch inserts nothing
+        self.assertEqual((0, 11), cu.run_bulk_insert_query(connection=connection, run_type=cu.POST_RT, records_to_insert=records, page_size=4))
+
+    def test_failed_page_rolls_back_the_batch(self):
+        connection = FakeTableConnection(keys=set(), fail_at=1)
+        records = [(f"post-{n}", "text") for n in range(10)]
+
+        with self.assertRaises(psycopg2.OperationalError):
+            cu.run_bulk_insert_query(connection=connection, run_type=cu.POST_RT, records_to_insert=records, page_size=4)
+        self.assertEqual(set(), connection.keys)
+        self.assertEqual((0, 0), cu.run_bulk_insert_query(connection=connection, run_type=cu.POST_RT, records_to_insert=[]))
+
+
+class Test_ConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.original_connect = psycopg2.connect
+        psycopg2.connect = FakeConnection
+        FakeConnection.opened = 0
+        cu.close_connection_pool()
+
+    def tearDown(self):
+        cu.close_connection_pool()
+        psycopg2.connect = self.original_connect
+
+    def test_pooled_connection_reuses_connections(self):
+        def check_out(n):
+            with cu.pooled_connection() as connection:
+                return connection
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            connections = list(executor.map(check_out, range(100)))
+
+        self.assertEqual(100, len(connections))
+        self.assertLessEqual(FakeConnection.opened, cu.DB_POOL_MAX_SIZE)
+
+    def test_pooled_connection_replaces_closed_connections(self):
+        with cu.pooled_connection() as connection:
+            connection.close()
+        with cu.pooled_connection() as connection:
+            self.assertFalse(connection.closed)
+        self.assertEqual(2, FakeConnection.opened)
+
+    def test_returned_connections_stay_open(self):
+        pool = cu.ConnectionPool(min_size=1, max_size=3)
+        connections = [pool.getconn() for i in range(3)]
+        for connection in connections:
+            pool.putconn(connection)
+        for i in range(10):
+            pool.putconn(pool.getconn())
+
+        self.assertEqual(3, FakeConnection.opened)
+        self.assertFalse(any(connection.closed for connection in connections))
+
+    def test_every_broken_idle_connection_is_replaced(self):
+        pool = cu.ConnectionPool(min_size=3, max_size=3)
+        for connection, returned_at in pool.idle:
+            connection.closed = 1 # e.g. the server restarted
+
+        connection = pool.getconn()
+        self.assertFalse(connection.closed)
+        self.assertEqual([], pool.idle)
+        self.assertEqual(4, FakeConnection.opened)
+
+
+class Test_DimensionCache(unittest.TestCase):
+    def setUp(self):
+        self.original_functions = (cu.pooled_connection, cu.run_select_query, cu.populate_date_dimension)
+        self.queries = []
+        self.authors = {"New Author": "41"}
+
+        @contextmanager
+        def fake_pooled_connection():
+            yield None
+
+        def fake_run_select_query(connection, run_type, fields, constraint=None, params=None):
+            if params is not None:
+                self.queries.append((run_type, params[0]))
+                if self.authors is None:
+                    return None # the query failed
+                return [(self.authors[params[0]],)] if params[0] in self.authors else []
+            self.queries.append((run_type, fields))
+            if run_type == cu.AUTHOR_RT:
+                return [("Lex Fridman", "2"), ("Chip Huyen", "5")]
+            return [("20220707",)]
+
+        def fake_populate_date_dimension(connection):
+            self.queries.append((cu.DATE_RT, "insert"))
+            return [datetime.now().strftime("%Y%m%d")]
+
+        cu.pooled_connection = fake_pooled_connection
+        cu.run_select_query = fake_run_select_query
+        cu.populate_date_dimension = fake_populate_date_dimension
+
+    def tearDown(self):
+        cu.pooled_connection, cu.run_select_query, cu.populate_date_dimension = self.original_functions
+
+    def test_lookups_are_served_from_memory(self):
+        cache = cu.DimensionCache()
+        for i in range(50):
+            self.assertEqual("2", cache.get_author_key(author="Lex Fridman"))
+            self.assertEqual("5", cache.get_author_key(author="Chip Huyen"))
+            self.assertEqual(datetime.now().strftime("%Y%m%d"), cache.get_date_key())
+
+        self.assertEqual(3, len(self.queries)) # load both dimensions, then populate the dates once
+        self.assertEqual({"hits": 149, "misses": 1}, cache.get_stats())
+
+    def test_new_author_is_cached(self):
+        cache = cu.DimensionCache()
+        self.assertEqual("41", cache.get_author_key(author="New Author"))
+        self.assertEqual("41", cache.get_author_key(author="New Author"))
+        self.assertEqual({"hits": 1, "misses": 1}, cache.get_stats())
+
+    def test_missing_author_is_cached(self):
+        cache = cu.DimensionCache()
+        for i in range(3):
+            self.assertIsNone(cache.get_author_key(author="Conan O'Brien"))
+        # The name is a query parameter, not part of the SQL text
+        self.assertEqual([(cu.AUTHOR_RT, "author_name, author_key"), (cu.DATE_RT, "date_key"), (cu.AUTHOR_RT, "Conan O'Brien")], self.queries)
+        self.assertEqual({"hits": 2, "misses": 1}, cache.get_stats())
+
+    def test_failed_lookup_is_not_cached(self):
+        cache = cu.DimensionCache()
+        self.authors = None
+        self.assertIsNone(cache.get_author_key(author="New Author"))
+        self.authors = {"New Author": "41"}
+        self.assertEqual("41", cache.get_author_key(author="New Author"))
+        self.assertEqual({"hits": 0, "misses": 2}, cache.get_stats())
+
+
+class Test_DateDimension(unittest.TestCase):
+    def test_build_date_dimension_row(self):
+        self.assertEqual(("20220707", "20220707", "July 07, 2022", "Thursday", "July", "Q3", "2022", "Weekday"),
+                         cu.build_date_dimension_row(date=datetime(2022, 7, 7)))
+        self.assertEqual(("20220326", "20220326", "March 26, 2022", "Saturday", "March", "Q1", "2022", "Weekend"),
+                         cu.build_date_dimension_row(date=datetime(2022, 3, 26)))
+
+    def test_calendar_quarters(self):
+        quarters = [cu.build_date_dimension_row(date=datetime(2022, month, 1))[5] for month in range(1, 13)]
+        self.assertEqual(["Q1"] * 3 + ["Q2"] * 3 + ["Q3"] * 3 + ["Q4"] * 3, quarters)
+
+    def test_build_date_dimension_range(self):
+        rows = cu.build_date_dimension_range(start_date=datetime(2023, 12, 30), end_date=datetime(2024, 3, 1))
+        self.assertEqual(63, len(rows))
+        self.assertEqual("20231230", rows[0][0])
+        self.assertEqual("20240229", rows[-2][0])
+        self.assertEqual("20240301", rows[-1][0])
+
+
+class Test_RunMetrics(unittest.TestCase):
+    def test_timers_and_counters(self):
+        metrics = cu.RunMetrics()
+        for i in range(3):
+            with metrics.time(stage=cu.CLEANING_STAGE, author="Lex Fridman"):
+                pass
+        metrics.observe(stage=cu.PAGE_FETCH_STAGE, seconds=1.5)
+        metrics.increment(name="posts_seen", value=4, author="Lex Fridman")
+        metrics.increment(name="posts_seen", value=2, author="Chip Huyen")
+
+        snapshot = metrics.to_dict()
+        self.assertEqual(3, snapshot["stages"][cu.CLEANING_STAGE]["count"])
+        self.assertEqual({"count": 1, "seconds": 1.5, "max_seconds": 1.5}, snapshot["stages"][cu.PAGE_FETCH_STAGE])
+        self.assertEqual({"posts_seen": 6}, snapshot["counters"])
+        self.assertEqual({"posts_seen": 2}, snapshot["authors"]["Chip Huyen"]["counters"])
+        self.assertIn(cu.CLEANING_STAGE, snapshot["authors"]["Lex Fridman"]["timers"])
+
+    def test_write(self):
+        metrics = cu.RunMetrics()
+        metrics.observe(stage=cu.INGEST_STAGE, seconds=0.25, author='Author "A"')
+        metrics.increment(name="records_inserted", value=10)
+        with tempfile.TemporaryDirectory() as folder_path:
+            json_path, prometheus_path = metrics.write(path=os.path.join(folder_path, "metrics"))
+            with open(json_path) as f:
+                self.assertEqual(10, json.load(f)["counters"]["records_inserted"])
+            with open(prometheus_path) as f:
+                lines = f.read().splitlines()
+
+        self.assertIn('linkedin_pipeline_stage_seconds_total{stage="ingest"} 0.25', lines)
+        self.assertIn("linkedin_pipeline_records_inserted_total 10", lines)
+        self.assertIn('linkedin_pipeline_author_stage_seconds_total{author="Author \\"A\\"",stage="ingest"} 0.25', lines)
+
+    def test_failures_are_not_post_counts(self):
+        metrics = cu.RunMetrics()
+        metrics.increment(name="posts_seen", value=3, author="Lex Fridman")
+        metrics.record_failure(author="Lex Fridman", error="PageLoadError: net::ERR_CONNECTION_RESET")
+        metrics.record_failure(author="Lex Fridman", error="PageLoadError: net::ERR_CONNECTION_RESET")
+
+        snapshot = metrics.to_dict()
+        self.assertEqual({"posts_seen": 3}, snapshot["authors"]["Lex Fridman"]["counters"])
+        self.assertEqual(2, snapshot["authors"]["Lex Fridman"]["failures"])
+        self.assertEqual(2, snapshot["counters"]["authors_failed"])
+        lines = metrics.to_prometheus().splitlines()
+        self.assertIn('linkedin_pipeline_author_failures_total{author="Lex Fridman"} 2', lines)
+        self.assertEqual(['linkedin_pipeline_author_counter_total{author="Lex Fridman",counter="posts_seen"} 3'],
+                         [line for line in lines if line.startswith("linkedin_pipeline_author_counter_total")])
+
+
+class Test_Logging(unittest.TestCase):
+    def test_json_formatter_truncates_payloads(self):
+        record = logging.LogRecord("PipelineLog", logging.INFO, __file__, 1, "record_inserted", None, None)
+        record.event = "record_inserted"
+        record.fields = {"table": "posts_fact", "count": 3, "record": ("20220707", "1", "x" * 5000)}
+        event = json.loads(cu.JsonFormatter().format(record))
+
+        self.assertEqual("record_inserted", event["event"])
+        self.assertEqual(("posts_fact", 3), (event["table"], event["count"]))
+        self.assertTrue(event["record"].startswith("('20220707', '1', 'xxx"))
+        self.assertLess(len(event["record"]), cu.LOG_MAX_PAYLOAD + 50)
+        self.assertTrue(event["record"].endswith("more characters)"))
+
+    def test_queue_handler_never_blocks(self):
+        log_queue = queue.Queue()
+        handler = cu.NonBlockingQueueHandler(log_queue)
+        record = logging.LogRecord("PipelineLog", logging.INFO, __file__, 1, "message", None, None)
+        for i in range(cu.LOG_QUEUE_SIZE + 10):
+            handler.emit(record)
+
+        self.assertEqual(cu.LOG_QUEUE_SIZE, log_queue.qsize())
+        self.assertEqual(10, handler.dropped)
+
+    def test_log_event_sampling(self):
+        self.assertFalse(cu.log_event("record_inserted", sample_rate=0, record=("20220707",)))
+        self.assertTrue(cu.log_event("record_inserted", sample_rate=1, record=("20220707",)))
+        self.assertEqual({"record_inserted": 0.01, "clean_records": 0.5}, cu.parse_sample_rates("record_inserted=0.01, clean_records=0.5"))
+
+    def test_log_file_from_environment(self):
+        original_path = os.environ["LOGFILE"]
+        with tempfile.TemporaryDirectory() as folder:
+            os.environ["LOGFILE"] = os.path.join(folder, "pipeline.log")
+            try:
+                cu.close_log()
+                cu.log_event("clean_records", author="Author", count=2)
+                cu.close_log()
+                with open(os.environ["LOGFILE"]) as f:
+                    event = json.loads(f.readline())
+            finally:
+                os.environ["LOGFILE"] = original_path
+
+        self.assertEqual(("clean_records", "Author", 2), (event["event"], event["author"], event["count"]))
+
+
+class FakeBrowser():
+    '''Stand-in for a Chrome session on a site that only serves the feed to a logged-in li_at cookie.
+    '''
+    valid_tokens = set()
+
+    def __init__(self):
+        self.current_url = "data:,"
+        self.cookies = {}
+        self.logins = 0
+        self.quits = 0
+
+    def get(self, url: str):
+        logged_in = self.cookies.get("li_at", {}).get("value") in FakeBrowser.valid_tokens
+        self.current_url = "https://www.linkedin.com/authwall" if "/feed/" in url and not logged_in else url
+
+    def get_cookies(self) -> list:
+        return [dict(cookie) for cookie in self.cookies.values()]
+
+    def add_cookie(self, cookie: dict):
+        self.cookies[cookie["name"]] = cookie
+
+    def find_element(self, by, value):
+        return self
+
+    def send_keys(self, keys):
+        pass
+
+    def quit(self):
+        self.quits += 1
+
+    def submit(self):
+        self.logins += 1
+        token = f"token-{len(FakeBrowser.valid_tokens)}"
+        FakeBrowser.valid_tokens.add(token)
+        self.add_cookie({"name": "li_at", "value": token, "domain": ".www.linkedin.com", "sameSite": "unspecified"})
+
+
+class Test_Session(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.original_values = (cu.create_driver, cu.login_url, cu.SESSION_PATH, cu.SESSION_REUSE)
+        self.browsers = []
+
+        def fake_create_driver():
+            self.browsers.append(FakeBrowser())
+            return self.browsers[-1]
+
+        cu.create_driver = fake_create_driver
+        cu.login_url = "https://www.linkedin.com/login"
+        cu.SESSION_PATH = os.path.join(self.folder.name, "session.json")
+        cu.SESSION_REUSE = True
+        FakeBrowser.valid_tokens = set()
+
+    def tearDown(self):
+        cu.create_driver, cu.login_url, cu.SESSION_PATH, cu.SESSION_REUSE = self.original_values
+        self.folder.cleanup()
+
+    def test_session_is_reused(self):
+        cu.login_linkedin()
+        self.assertEqual(0o600, os.stat(cu.SESSION_PATH).st_mode & 0o777)
+        driver = cu.login_linkedin()
+
+        self.assertEqual([1, 0], [browser.logins for browser in self.browsers])
+        self.assertEqual("https://www.linkedin.com/feed/", driver.current_url)
+
+    def test_expired_session_logs_in_again(self):
+        cu.login_linkedin()
+        FakeBrowser.valid_tokens = set() # The saved cookie expired
+        cu.login_linkedin()
+        driver = cu.login_linkedin()
+
+        self.assertEqual([1, 1, 0], [browser.logins for browser in self.browsers])
+        self.assertTrue(cu.is_session_valid(driver=driver))
+
+    def test_parallel_logins_share_one_session(self):
+        original_submit_login_form = cu.submit_login_form
+
+        def slow_submit_login_form(driver):
+            time.sleep(0.05)
+            original_submit_login_form(driver=driver)
+
+        cu.submit_login_form = slow_submit_login_form
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                drivers = list(executor.map(lambda i: cu.login_linkedin(), range(4)))
+        finally:
+            cu.submit_login_form = original_submit_login_form
+
+        # One browser submits the login form, the others restore its saved cookies
+        self.assertEqual(1, sum(browser.logins for browser in self.browsers))
+        self.assertTrue(all(cu.is_session_valid(driver=driver) for driver in drivers))
+
+    def test_failed_login_raises(self):
+        def failing_create_driver():
+            raise RuntimeError("chromedriver not found")
+
+        cu.create_driver = failing_create_driver
+        self.assertRaises(RuntimeError, cu.login_linkedin)
+
+    def test_failed_login_quits_the_browser(self):
+        original_submit_login_form = cu.submit_login_form
+
+        def failing_submit_login_form(driver):
+            raise RuntimeError("Unable to locate element: #username")
+
+        cu.submit_login_form = failing_submit_login_form
+        try:
+            self.assertRaises(RuntimeError, cu.login_linkedin)
+        finally:
+            cu.submit_login_form = original_submit_login_form
+        self.assertEqual([1], [browser.quits for browser in self.browsers])
+
+    def test_session_reuse_disabled(self):
+        cu.SESSION_REUSE = False
+        cu.login_linkedin()
+        cu.login_linkedin()
+
+        self.assertEqual([1, 1], [browser.logins for browser in self.browsers])
+        self.assertFalse(os.path.exists(cu.SESSION_PATH))
+
+
+class Test_LeanBrowser(unittest.TestCase):
+    def test_driver_options(self):
+        options = cu.create_driver_options(lean=True)
+        self.assertIn("headless", options.arguments)
+        self.assertIn("--blink-settings=imagesEnabled=false", options.arguments)
+        self.assertEqual(cu.PAGE_LOAD_STRATEGY, options.page_load_strategy)
+        self.assertEqual(2, options.experimental_options["prefs"]["profile.managed_default_content_settings.images"])
+
+        options = cu.create_driver_options(lean=False)
+        self.assertEqual(["headless"], options.arguments)
+        self.assertEqual("normal", options.page_load_strategy)
+
+    def test_block_resources(self):
+        commands = []
+
+        class FakeChrome():
+            def execute_cdp_cmd(self, command: str, parameters: dict):
+                commands.append((command, parameters))
+
+        cu.block_resources(driver=FakeChrome())
+        self.assertEqual(["Network.enable", "Network.setBlockedURLs"], [command for command, parameters in commands])
+        patterns = commands[1][1]["urls"]
+        self.assertIn("*.woff2", patterns)
+        self.assertIn("*://*doubleclick.net/*", patterns)
+
+    def test_blocked_url_patterns(self):
+        def is_blocked(url: str) -> bool:
+            # Network.setBlockedURLs matches the whole url, * is the only wildcard
+            return any(re.fullmatch(".*".join(re.escape(part) for part in pattern.split("*")), url) for pattern in cu.get_blocked_url_patterns())
+
+        for url in ["https://media.licdn.com/dms/image/C4E22AQ/feedshare-shrink_800/0/1620?e=1700000000&v=beta&t=abc",
+                    "https://media-exp1.licdn.com/dms/image/C4D03AQ/profile-displayphoto-shrink_100_100/0/1600",
+                    "https://dms.licdn.com/playlist/C4D05AQ/mp4-720p-30fp-crf28/0/1620?e=1700000000",
+                    "https://static.licdn.com/aero-v1/sc/h/logo.png?v=2",
+                    "https://static.licdn.com/aero-v1/sc/h/font.woff2",
+                    "https://www.googletagmanager.com/gtm.js?id=GTM-1"]:
+            self.assertTrue(is_blocked(url), url)
+        for url in ["https://www.linkedin.com/in/author/recent-activity/shares/",
+                    "https://www.linkedin.com/voyager/api/feed/updates?q=memberShareFeed",
+                    "https://static.licdn.com/aero-v1/sc/h/app.js"]:
+            self.assertFalse(is_blocked(url), url)
+
+
+class Test_Staging(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.raw_record = [["Post \U0001F680 #ai"], [12], [3], [0], ["None"], ["Other: Poll, Shared Post, etc"]]
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_staged_records_round_trip(self):
+        author_records = [(f"Author {n}", self.raw_record) for n in range(3)]
+        self.assertEqual(3, cu.write_staged_records(author_records=author_records, path=self.folder.name))
+        self.assertEqual(author_records, list(cu.read_staged_records(path=self.folder.name)))
+        self.assertTrue(cu.list_staging_files(path=self.folder.name)[0].endswith(".jsonl.gz"))
+
+    def test_missing_staging_folder(self):
+        path = os.path.join(self.folder.name, "staged")
+        self.assertEqual([], cu.list_staging_files(path=path))
+        self.assertEqual([], list(cu.read_staged_records(path=path)))
+
+        self.assertEqual(1, cu.write_staged_records(author_records=[("Author 0", self.raw_record)], path=path))
+        self.assertTrue(os.path.isdir(path))
+        self.assertEqual([("Author 0", self.raw_record)], list(cu.read_staged_records(path=path)))
+
+    def test_truncated_staging_file_is_replayed(self):
+        path = os.path.join(self.folder.name, "raw_records.jsonl.gz")
+        staging = cu.StagingWriter(path=path)
+        for n in range(3):
+            staging.write(author_name=f"Author {n}", raw_record=self.raw_record)
+        with open(path, 'rb') as f:
+            crashed_file = f.read() # Flushed, but the gzip stream was never closed
+        staging.close()
+        with open(path, 'wb') as f:
+            f.write(crashed_file)
+
+        self.assertEqual([f"Author {n}" for n in range(3)], [author for author, raw_record in cu.read_staged_records(path=path)])
+
+    def test_corrupt_staging_file_is_replayed(self):
+        path = os.path.join(self.folder.name, "raw_records.jsonl.gz")
+        with cu.StagingWriter(path=path) as staging:
+            for n in range(3):
+                staging.write(author_name=f"Author {n}", raw_record=self.raw_record)
+        with open(path, 'rb') as f:
+            staged_file = f.read()
+
+        for corrupt_file in (staged_file + b"not a gzip member", staged_file[:-8] + bytes(8), staged_file[:12] + bytes(len(staged_file) - 12)):
+            with open(path, 'wb') as f:
+                f.write(corrupt_file)
+            authors = [author for author, raw_record in cu.read_staged_records(path=path)]
+            self.assertEqual([f"Author {n}" for n in range(len(authors))], authors)
+
+
+class Test_Retries(unittest.TestCase):
+    def setUp(self):
+        self.original_values = (cu.FETCH_RETRIES, cu.FETCH_BACKOFF_BASE)
+        cu.FETCH_RETRIES = 3
+        cu.FETCH_BACKOFF_BASE = 0.001
+
+    def tearDown(self):
+        cu.FETCH_RETRIES, cu.FETCH_BACKOFF_BASE = self.original_values
+
+    def test_load_page_retries(self):
+        metrics = cu.reset_metrics()
+        driver = FlakyDriver(failures=2)
+        soup = cu.create_soup(driver=driver, url="http://localhost/author/")
+        self.assertEqual(3, driver.loads)
+        self.assertEqual(1, len(soup.find_all("div")))
+        self.assertEqual(2, metrics.to_dict()["counters"]["page_fetch_retries"])
+
+    def test_create_soup_raises_after_the_last_retry(self):
+        driver = FlakyDriver(failures=10)
+        self.assertRaises(RuntimeError, cu.create_soup, driver, "http://localhost/author/")
+        self.assertEqual(4, driver.loads)
+
+    def test_backoff_delay(self):
+        for attempt in range(10):
+            delay = cu.get_backoff_delay(attempt=attempt, base=2, max_delay=60)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(60, 2 * 2 ** attempt))
+
+    def test_circuit_breaker(self):
+        circuit_breaker = cu.CircuitBreaker(threshold=3, cooldown=0.2)
+        for i in range(2):
+            circuit_breaker.record_failure()
+        self.assertTrue(circuit_breaker.allow())
+        circuit_breaker.record_failure()
+        self.assertFalse(circuit_breaker.allow())
+
+        time.sleep(0.25)
+        self.assertTrue(circuit_breaker.allow()) # One trial after the cooldown
+        self.assertFalse(circuit_breaker.allow())
+        circuit_breaker.record_success()
+        self.assertTrue(circuit_breaker.allow())
+
+
 class Test_Utils(unittest.TestCase):
+    def test_wait_for_page_ready_returns_once_stable(self):
+        driver = FakeDriver(states=[(0, 10), (3, 50), (3, 80), (3, 80), (3, 80)])
+        waited = cu.wait_for_page_ready(driver=driver, timeout=5)
+        self.assertLess(waited, 1)
+        self.assertEqual(5, driver.calls)
+
+    def test_wait_for_page_ready_times_out(self):
+        driver = FakeDriver(states=[(0, 10)])
+        waited = cu.wait_for_page_ready(driver=driver, timeout=0.3)
+        self.assertGreaterEqual(waited, 0.3)
+
+    def test_wait_for_page_ready_waits_for_new_containers(self):
+        driver = FakeDriver(states=[(3, 80), (3, 80), (3, 80), (6, 120), (6, 120), (6, 120)])
+        cu.wait_for_page_ready(driver=driver, timeout=5, min_containers=3)
+        self.assertEqual(6, driver.calls)
+
     # def test_create_connection(self):
     #     load_dotenv()
     #     connection = cu.create_postgres_connection(user=os.getenv("DB_USER"),
@@ -40,14 +680,31 @@ class Test_Utils(unittest.TestCase):
     #     soup = cu.create_soup(post_url=os.getenv("TEST_URL"))
     #     return soup
 
+    def test_clean_text(self):
+        actual = cu.clean_text("Read this \U0001F680 https://example.com/a #ai by @JaneDoe")
+        expected = "Read this    by "
+        self.assertEqual(expected, actual)
+
+    def test_clean_text_matches_cleaner_passes(self):
+        texts = ["Read this \U0001F680 https://example.com/a #ai by @JaneDoe",
+                 "C:\\data #ml\\ops @team",
+                 "",
+                 "#one#two @a@b http://x.io/?q=1#!top it\u2019s"]
+        expected = cu.remove_links(cu.remove_mentions(cu.remove_hashtags(cu.escape_single_quote(cu.remove_emoji(texts)))))
+        self.assertEqual(expected, [cu.clean_text(text) for text in texts])
+
+    def test_compute_text_hash(self):
+        expected = cu.compute_text_hash("Read this by")
+        self.assertEqual(32, len(expected))
+        self.assertEqual(expected, cu.compute_text_hash(" Read  this\n\tby "))
+        self.assertEqual(expected, cu.compute_text_hash(cu.clean_text("Read this \U0001F680 https://example.com/a #ai by @JaneDoe")))
+        self.assertNotEqual(expected, cu.compute_text_hash("Read this, by"))
+
     def test_get_author_key(self):
         load_dotenv()
-        connection = cu.create_postgres_connection(user=os.getenv("DB_USER"),
-                                                   password=os.getenv("PASSWORD"),
-                                                   host=os.getenv("HOST"),
-                                                   port=os.getenv("PORT"),
-                                                   database=os.getenv("DATABASE"))
-        print(cu.get_author_key(connection=connection, author="Lex Fridman"))   
+        with cu.pooled_connection() as connection:
+            print(cu.get_author_key(connection=connection, author="Lex Fridman"))   
+            self.assertIsNone(cu.get_author_key(connection=connection, author="Nobody' OR '1'='1"))
 
     # def test_get_date_key(self):
     #     load_dotenv()
@@ -0,0 +1,411 @@
+from bs4 import BeautifulSoup
+import psycopg2
+import unittest
+import json
+import tempfile
+import threading
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+os.environ.setdefault("LOGFILE", os.path.join(tempfile.gettempdir(), "linkedin_curator_test.log")) # Keep test runs out of logs/
+
+import common_utils as cu
+import data_scraper as ds
+from fixture_server import FixtureServer, FixtureDriver
+from feed_generator import build_feed, MEDIA_MIX
+
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture_soup(name: str = "activity_feed.html") -> BeautifulSoup:
+    with open(os.path.join(FIXTURES_PATH, name)) as f:
+        return BeautifulSoup(f.read(), 'html.parser')
+
+
+class Test_LinkedinScraper(unittest.TestCase):
+    def setUp(self):
+        self.scraper = ds.LinkedinScraper(driver=object())
+        self.soup_calls = 0
+        self.original_create_soup = cu.create_soup
+
+        def fake_create_soup(driver, url, author=None):
+            self.soup_calls += 1
+            return load_fixture_soup()
+
+        cu.create_soup = fake_create_soup
+
+    def tearDown(self):
+        cu.create_soup = self.original_create_soup
+
+    def test_scrape_posts(self):
+        posts = self.scraper.scrape_posts(author_url="http://localhost/author/")
+        self.assertEqual(4, len(posts))
+        self.assertEqual({"text": "Big news from the team! Read more at https://example.com/post #datascience #ai with @JaneDoe",
+                          "media_link": "https://media.example.com/image-1.jpg",
+                          "media_type": "Image",
+                          "reactions_count": 1234,
+                          "comments_count": 56,
+                          "shares_count": 7}, posts[0])
+        self.assertEqual(("https://www.example.com/pulse/data-pipelines", "Article", 89, 3, 0),
+                         (posts[1]["media_link"], posts[1]["media_type"], posts[1]["reactions_count"], posts[1]["comments_count"], posts[1]["shares_count"]))
+        self.assertEqual(("https://www.youtube.com/watch?v=abc123", "Youtube Video", 42, 0, 12),
+                         (posts[2]["media_link"], posts[2]["media_type"], posts[2]["reactions_count"], posts[2]["comments_count"], posts[2]["shares_count"]))
+        self.assertEqual({"text": "None",
+                          "media_link": "None",
+                          "media_type": "Other: Poll, Shared Post, etc",
+                          "reactions_count": 0,
+                          "comments_count": 0,
+                          "shares_count": 0}, posts[3])
+        self.assertEqual(1, self.soup_calls)
+
+    def test_build_raw_record(self):
+        posts = self.scraper.scrape_posts(author_url="http://localhost/author/")
+        texts, reactions_count, comments_count, shares_count, media_links, media_types = self.scraper.build_raw_record(posts=posts)
+        self.assertEqual([post["text"] for post in posts], texts)
+        self.assertEqual([1234, 89, 42, 0], reactions_count)
+        self.assertEqual([56, 3, 0, 0], comments_count)
+        self.assertEqual([7, 0, 12, 0], shares_count)
+        self.assertEqual(["Image", "Article", "Youtube Video", "Other: Poll, Shared Post, etc"], media_types)
+        self.assertEqual("None", media_links[3])
+        self.assertEqual(1, self.soup_calls)
+
+    def test_filter_known_posts(self):
+        posts = self.scraper.scrape_posts(author_url="http://localhost/author/")
+        known_fingerprints = {cu.compute_text_hash(cu.clean_text(posts[1]["text"]))}
+        new_posts = self.scraper.filter_known_posts(posts=posts, known_fingerprints=known_fingerprints)
+        self.assertEqual([posts[0], posts[2], posts[3]], new_posts)
+
+
+class Test_ParseBackends(unittest.TestCase):
+    def setUp(self):
+        self.scraper = ds.LinkedinScraper(driver=object())
+
+    def extract_posts(self, html: str, backend: str) -> list:
+        containers = self.scraper.find_containers(cu.parse_page(html, backend=backend))
+        return [self.scraper.extract_post(container) for container in containers]
+
+    def test_fixture_page(self):
+        with open(os.path.join(FIXTURES_PATH, "activity_feed.html")) as f:
+            html = f.read()
+        posts = self.extract_posts(html, backend="html.parser")
+        self.assertEqual(4, len(posts))
+        self.assertEqual(posts, self.extract_posts(html, backend="lxml"))
+
+    def test_generated_pages(self):
+        for seed in range(5):
+            media_mix = MEDIA_MIX if seed % 2 == 0 else {"Image": 1}
+            html, expected = build_feed(posts_count=40, media_mix=media_mix, seed=seed, noise_count=20)
+            for backend in cu.PARSE_BACKENDS:
+                self.assertEqual(expected, self.extract_posts(html, backend=backend), backend)
+
+    def test_lxml_only_keeps_the_containers(self):
+        html, expected = build_feed(posts_count=3, noise_count=5)
+        soup = cu.parse_page(html, backend="lxml")
+        self.assertEqual(3, len(soup.contents))
+        self.assertIsNone(soup.find("script"))
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, cu.parse_page, "<html></html>", "html5lib")
+
+
+class ScriptFixtureDriver(FixtureDriver):
+    '''Answer the extraction script with what it returns on the fixture feed page in Chrome.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.script_calls = 0
+
+    def execute_script(self, script: str):
+        if script == ds.EXTRACT_POSTS_SCRIPT:
+            self.script_calls += 1
+            with open(os.path.join(FIXTURES_PATH, "activity_feed_posts.json")) as f:
+                return json.dumps(json.load(f), separators=(",", ":"))
+        return super().execute_script(script)
+
+
+class Test_LinkedinScriptScraper(unittest.TestCase):
+    def test_same_posts_as_soup_extraction(self):
+        with FixtureServer() as server:
+            author_url = server.author_url("author-0")
+            expected = ds.LinkedinScraper(driver=FixtureDriver()).scrape_posts(author_url=author_url)
+            driver = ScriptFixtureDriver()
+            posts = ds.LinkedinScriptScraper(driver=driver).scrape_posts(author_url=author_url)
+        self.assertEqual(4, len(posts))
+        self.assertEqual(expected, posts)
+        self.assertEqual(([author_url], 1), (driver.visited_urls, driver.script_calls))
+
+    def test_create_scraper(self):
+        original_mode = cu.EXTRACT_MODE
+        try:
+            cu.EXTRACT_MODE = "script"
+            self.assertIsInstance(ds.create_scraper(driver=object()), ds.LinkedinScriptScraper)
+            cu.EXTRACT_MODE = "soup"
+            self.assertNotIsInstance(ds.create_scraper(driver=object()), ds.LinkedinScriptScraper)
+            cu.EXTRACT_MODE = "regex"
+            self.assertRaises(ValueError, ds.create_scraper, object())
+        finally:
+            cu.EXTRACT_MODE = original_mode
+
+    @unittest.skipUnless(cu.chrome_path, "needs Chrome, set CHROMEPATH")
+    def test_script_in_chrome(self):
+        driver = cu.create_driver()
+        try:
+            with FixtureServer() as server:
+                driver.get(server.author_url("author-0"))
+                with open(os.path.join(FIXTURES_PATH, "activity_feed_posts.json")) as f:
+                    self.assertEqual(json.load(f), json.loads(driver.execute_script(ds.EXTRACT_POSTS_SCRIPT)))
+
+            scraper = ds.LinkedinScriptScraper(driver=driver)
+            for seed in range(3):
+                html, expected = build_feed(posts_count=40, seed=seed, noise_count=20)
+                driver.execute_script("document.open(); document.write(arguments[0]); document.close();", html)
+                self.assertEqual(expected, [scraper.extract_post(container) for container in scraper.reload_containers()])
+        finally:
+            driver.quit()
+
+
+class ScrollingDriver(FixtureDriver):
+    '''Serve a feed of numbered posts that loads page_size more posts on every scroll.
+    '''
+    def __init__(self, posts_count: int, page_size: int):
+        super().__init__()
+        self.posts_count = posts_count
+        self.page_size = page_size
+        self.loaded = page_size
+        self.scrolls = 0
+
+    def render(self):
+        containers = [f'<div class="ember-view occludable-update"><div class="feed-shared-text relative feed-shared-update-v2__commentary"><span dir="ltr">Post {n} #news</span></div></div>'
+                      for n in range(min(self.loaded, self.posts_count))]
+        self.page_source = "<html><body>" + "".join(containers) + "</body></html>"
+
+    def get(self, url: str):
+        self.visited_urls.append(url)
+        self.current_url = url
+        self.render()
+
+    def execute_script(self, script: str):
+        if "scrollTo" in script:
+            self.scrolls += 1
+            self.loaded += self.page_size
+            self.render()
+            return None
+        return super().execute_script(script)
+
+
+class Test_IncrementalScroll(unittest.TestCase):
+    def setUp(self):
+        self.original_timeout = cu.SCROLL_PAUSE_TIME
+        cu.SCROLL_PAUSE_TIME = 0.3
+
+    def tearDown(self):
+        cu.SCROLL_PAUSE_TIME = self.original_timeout
+
+    def test_stops_at_known_post(self):
+        driver = ScrollingDriver(posts_count=50, page_size=5)
+        scraper = ds.LinkedinScraper(driver=driver)
+        scraper.scroll_max_depth = 20
+        posts = scraper.scrape_posts(author_url="http://localhost/author/", known_fingerprints={cu.compute_text_hash("Post 12 "), cu.compute_text_hash("Post 13 ")})
+        self.assertEqual(2, driver.scrolls)
+        self.assertEqual(15, len(posts))
+
+    def test_stops_at_max_depth(self):
+        driver = ScrollingDriver(posts_count=50, page_size=5)
+        scraper = ds.LinkedinScraper(driver=driver)
+        scraper.scroll_max_depth = 3
+        posts = scraper.scrape_posts(author_url="http://localhost/author/", known_fingerprints=set())
+        self.assertEqual(3, driver.scrolls)
+        self.assertEqual(20, len(posts))
+
+    def test_stops_at_end_of_feed(self):
+        driver = ScrollingDriver(posts_count=8, page_size=5)
+        scraper = ds.LinkedinScraper(driver=driver)
+        scraper.scroll_max_depth = 20
+        posts = scraper.scrape_posts(author_url="http://localhost/author/", known_fingerprints=None)
+        self.assertEqual(2, driver.scrolls)
+        self.assertEqual(8, len(posts))
+
+
+class CountingDriver(FixtureDriver):
+    '''A FixtureDriver counting every page load, the failed ones too.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.loads = 0
+
+    def get(self, url: str):
+        self.loads += 1
+        super().get(url)
+
+
+class LoggedOutDriver(ScrollingDriver):
+    '''A ScrollingDriver that LinkedIn sends to the login wall.
+    '''
+    def get(self, url: str):
+        super().get(url)
+        self.current_url = "https://www.linkedin.com/authwall?trk=public_profile"
+
+
+class BrokenDatabaseScraper():
+    '''Stand-in for a LinkedinScraper session whose database lookups fail before any page load.
+    '''
+    def scrape_author(self, author_name: str, author_url: str) -> list:
+        raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+
+class Test_LinkedinScraperPool(unittest.TestCase):
+    def setUp(self):
+        self.original_values = (cu.FETCH_RETRIES, cu.FETCH_BACKOFF_BASE, cu.PAGE_LOAD_TIMEOUT, cu.circuit_breaker)
+        cu.FETCH_RETRIES = 1
+        cu.FETCH_BACKOFF_BASE = 0.001
+        cu.PAGE_LOAD_TIMEOUT = 0.05
+        cu.circuit_breaker = cu.CircuitBreaker(threshold=3, cooldown=60)
+
+    def tearDown(self):
+        cu.FETCH_RETRIES, cu.FETCH_BACKOFF_BASE, cu.PAGE_LOAD_TIMEOUT, cu.circuit_breaker = self.original_values
+
+    def create_scraper(self, driver) -> ds.LinkedinScraper:
+        scraper = ds.LinkedinScraper(driver=driver)
+        scraper.incremental, scraper.scroll_max_depth, scraper.scheduling = False, 0, False
+        return scraper
+
+    def test_logged_out_feeds_open_the_circuit_breaker(self):
+        metrics = cu.reset_metrics()
+        scraper = self.create_scraper(driver=LoggedOutDriver(posts_count=5, page_size=5))
+        for n in range(3):
+            self.assertIsNone(ds.try_scrape_author(scraper=scraper, author_name=f"Author {n}", author_url="http://localhost/author/"))
+
+        self.assertFalse(cu.circuit_breaker.allow())
+        self.assertNotIn("authors_scraped", metrics.to_dict()["counters"])
+        self.assertIn("PageLoadError", metrics.to_dict()["failures"]["Author 0"])
+
+    def test_failed_authors_are_recorded_for_the_scheduler(self):
+        original_scheduler = ds.sch.author_scheduler
+        with tempfile.TemporaryDirectory() as folder_path:
+            ds.sch.author_scheduler = ds.sch.AuthorScheduler(path=os.path.join(folder_path, "last_visits.json"))
+            try:
+                scraper = self.create_scraper(driver=LoggedOutDriver(posts_count=5, page_size=5))
+                scraper.scheduling = True
+                self.assertIsNone(ds.try_scrape_author(scraper=scraper, author_name="Author 0", author_url="http://localhost/author/"))
+                self.assertIsNone(ds.sch.author_scheduler.last_visits.get("Author 0"))
+                self.assertIsNotNone(ds.sch.author_scheduler.last_failures.get("Author 0"))
+                self.assertEqual([], ds.sch.author_scheduler.plan(authors=[("Author 0", "http://localhost/author/")], post_history={}))
+            finally:
+                ds.sch.author_scheduler = original_scheduler
+
+    def test_empty_feeds_leave_the_circuit_breaker_closed(self):
+        original_scheduler = ds.sch.author_scheduler
+        with tempfile.TemporaryDirectory() as folder_path:
+            ds.sch.author_scheduler = ds.sch.AuthorScheduler(path=os.path.join(folder_path, "last_visits.json"))
+            try:
+                scraper = self.create_scraper(driver=ScrollingDriver(posts_count=0, page_size=5))
+                scraper.scheduling = True
+                for n in range(5):
+                    self.assertEqual([[], [], [], [], [], []], ds.try_scrape_author(scraper=scraper, author_name=f"Author {n}", author_url="http://localhost/author/"))
+                # The visit is recorded, so a quiet author is not scheduled again on every run
+                self.assertIsNotNone(ds.sch.author_scheduler.last_visits.get("Author 0"))
+            finally:
+                ds.sch.author_scheduler = original_scheduler
+
+        self.assertTrue(cu.circuit_breaker.allow())
+
+    def test_database_and_parsing_errors_leave_the_circuit_breaker_closed(self):
+        metrics = cu.reset_metrics()
+        for n in range(5):
+            self.assertIsNone(ds.try_scrape_author(scraper=BrokenDatabaseScraper(), author_name=f"Author {n}", author_url="http://localhost/author/"))
+
+        self.assertTrue(cu.circuit_breaker.allow())
+        self.assertEqual(5, len(metrics.to_dict()["failures"]))
+        # A page that loads still scrapes
+        scraper = self.create_scraper(driver=ScrollingDriver(posts_count=5, page_size=5))
+        self.assertEqual(5, len(ds.try_scrape_author(scraper=scraper, author_name="Author 5", author_url="http://localhost/author/")[0]))
+
+    def test_failed_author_is_isolated(self):
+        metrics = cu.reset_metrics()
+        with FixtureServer() as server:
+            authors = [(f"Author {n}", server.author_url(f"author-{n}")) for n in range(4)]
+            authors.insert(1, ("Missing", server.author_url("missing").replace("/recent-activity/", "/deleted-activity/")))
+            with ds.LinkedinScraperPool(size=2, driver_factory=CountingDriver) as scraper_pool:
+                raw_records = scraper_pool.scrape_data(authors=authors)
+
+        self.assertEqual(["Author 0", "Author 1", "Author 2", "Author 3"], sorted(raw_records.keys()))
+        snapshot = metrics.to_dict()
+        self.assertEqual(["Missing"], list(snapshot["failures"].keys()))
+        self.assertIn("HTTPError", snapshot["failures"]["Missing"])
+        self.assertEqual((4, 1, 1), (snapshot["counters"]["authors_scraped"], snapshot["counters"]["authors_failed"], snapshot["counters"]["page_fetch_retries"]))
+
+    def test_failed_login_quits_the_started_sessions(self):
+        drivers = []
+        quits = []
+        lock = threading.Lock()
+
+        def driver_factory():
+            with lock:
+                drivers.append(None)
+                if len(drivers) == 2:
+                    raise RuntimeError("login form not found")
+            driver = CountingDriver()
+            driver.quit = lambda: quits.append(driver)
+            return driver
+
+        scraper_pool = ds.LinkedinScraperPool(size=3, driver_factory=driver_factory)
+        with self.assertRaises(RuntimeError):
+            scraper_pool.start()
+
+        self.assertEqual(3, len(drivers))
+        self.assertEqual(2, len(quits))
+        self.assertEqual([], scraper_pool.scrapers)
+
+    def test_circuit_breaker_stops_page_loads(self):
+        metrics = cu.reset_metrics()
+        drivers = []
+
+        def driver_factory():
+            drivers.append(CountingDriver())
+            return drivers[-1]
+
+        with FixtureServer() as server:
+            authors = [(f"Author {n}", server.author_url(f"author-{n}").replace("/recent-activity/", "/deleted-activity/")) for n in range(10)]
+            with ds.LinkedinScraperPool(size=1, driver_factory=driver_factory) as scraper_pool:
+                raw_records = scraper_pool.scrape_data(authors=authors)
+
+        self.assertEqual({}, raw_records)
+        # Three authors of two attempts each, then the other authors are skipped without a page load
+        self.assertEqual(6, drivers[0].loads)
+        self.assertEqual(10, len(metrics.to_dict()["failures"]))
+
+    def test_scrape_data(self):
+        drivers = []
+
+        def driver_factory():
+            driver = FixtureDriver()
+            drivers.append(driver)
+            return driver
+
+        metrics = cu.reset_metrics()
+        with FixtureServer() as server:
+            authors = [(f"Author {n}", server.author_url(f"author-{n}")) for n in range(4)]
+            with ds.LinkedinScraperPool(size=2, driver_factory=driver_factory) as scraper_pool:
+                raw_records = scraper_pool.scrape_data(authors=authors)
+
+        self.assertEqual([author_name for author_name, author_url in authors], list(raw_records.keys()))
+        for raw_record in raw_records.values():
+            self.assertEqual(6, len(raw_record))
+            self.assertEqual([1234, 89, 42, 0], raw_record[1])
+        self.assertEqual(2, len(drivers))
+        self.assertEqual([2, 2], [len(driver.visited_urls) for driver in drivers])
+        snapshot = metrics.to_dict()
+        self.assertEqual(16, snapshot["counters"]["posts_seen"])
+        self.assertEqual(4, snapshot["stages"][cu.PAGE_FETCH_STAGE]["count"])
+        self.assertEqual({"posts_seen": 4, "posts_new": 4}, snapshot["authors"]["Author 0"]["counters"])
+        # The page stages are traced to the author too
+        for stage in (cu.SCRAPE_STAGE, cu.PAGE_FETCH_STAGE, cu.READINESS_WAIT_STAGE, cu.HTML_PARSE_STAGE, cu.FIELD_EXTRACTION_STAGE):
+            self.assertIn(stage, snapshot["authors"]["Author 0"]["timers"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.request import urlopen
+import functools
+import threading
+import os
+
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    '''Serve the fixture feed page for every author activity url.
+    '''
+    def translate_path(self, path):
+        if "/recent-activity/" in path:
+            return os.path.join(FIXTURES_PATH, "activity_feed.html")
+        return super().translate_path(path)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer():
+    '''A local HTTP server serving the fixture pages in place of LinkedIn.
+    '''
+    def __init__(self):
+        handler = functools.partial(FixtureHandler, directory=FIXTURES_PATH)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def author_url(self, author: str) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/in/{author}/recent-activity/shares/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FixtureDriver():
+    '''A minimal stand-in for a WebDriver that loads pages over plain HTTP.
+    '''
+    def __init__(self):
+        self.page_source = ""
+        self.current_url = "data:,"
+        self.visited_urls = []
+
+    def get(self, url: str):
+        with urlopen(url) as response:
+            self.page_source = response.read().decode("utf-8")
+        self.current_url = response.geturl()
+        self.visited_urls.append(url)
+
+    def execute_script(self, script: str):
+        '''Answer the page readiness probe: the page is fully rendered as soon as it is fetched.
+        '''
+        return [self.page_source.count("ember-view occludable-update"), self.page_source.count("<")]
+
+    def quit(self):
+        pass
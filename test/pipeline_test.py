@@ -0,0 +1,284 @@
+import unittest
+import subprocess
+import threading
+import tempfile
+import asyncio
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("LOGFILE", os.path.join(tempfile.gettempdir(), "linkedin_curator_test.log")) # Keep test runs out of logs/
+
+import pipeline as pl
+
+
+staging_folder = None
+
+
+def setUpModule():
+    global staging_folder
+    staging_folder = tempfile.TemporaryDirectory()
+    pl.cu.STAGING_PATH = staging_folder.name
+    pl.cu.CHECKPOINT_PATH = os.path.join(staging_folder.name, "checkpoints.json")
+
+
+def tearDownModule():
+    pl.cu.STAGING_PATH = None
+    staging_folder.cleanup()
+
+
+class FakeScraper():
+    def __init__(self, authors_count: int, delay: float = 0.01, fail_at: int = None):
+        self.authors_count = authors_count
+        self.delay = delay
+        self.fail_at = fail_at
+        self.scraped = []
+
+    def get_authors(self) -> list:
+        return [(f"Author {n}", f"http://localhost/in/author-{n}/recent-activity/shares/") for n in range(self.authors_count)]
+
+    def iter_author_records(self, authors: list = None):
+        for author_name, author_url in (authors if authors is not None else self.get_authors()):
+            if author_name == f"Author {self.fail_at}":
+                raise RuntimeError("The browser crashed")
+            time.sleep(self.delay)
+            self.scraped.append(author_name)
+            n = int(author_name.split()[-1])
+            yield author_name, [[f"Post of author {n}"], [n], [0], [0], ["None"], ["Other: Poll, Shared Post, etc"]]
+
+
+class FakeCleaner():
+    def get_clean_records(self, raw_record: list, author: str) -> list:
+        return [(author, raw_record[0][0])]
+
+
+class FakeIngester():
+    def __init__(self, scraper: FakeScraper):
+        self.scraper = scraper
+        self.ingested = []
+        self.authors = []
+        self.scraped_when_ingested = []
+
+    def bulk_ingest_data(self, clean_records: list, author: str = None) -> tuple:
+        self.authors.append(author)
+        self.scraped_when_ingested.append(len(self.scraper.scraped))
+        self.ingested.extend(clean_records)
+        return len(clean_records), 0
+
+
+class FakeSession():
+    '''Stand-in for a LinkedinScraper session whose page loads take delay seconds.
+    '''
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.scraped = []
+        self.active = 0
+
+    def scrape_author(self, author_name: str, author_url: str) -> list:
+        self.active += 1
+        time.sleep(self.delay)
+        self.scraped.append(author_name)
+        self.active -= 1
+        return [[f"Post of {author_name}"], [0], [0], [0], ["None"], ["Other: Poll, Shared Post, etc"]]
+
+
+class SlowIngester():
+    '''Stand-in for a LinkedinIngester whose database round trips take delay seconds.
+    '''
+    def __init__(self, delay: float, on_ingest=None):
+        self.delay = delay
+        self.on_ingest = on_ingest
+        self.ingested = []
+        self.lock = threading.Lock()
+
+    def bulk_ingest_data(self, clean_records: list, author: str = None) -> tuple:
+        time.sleep(self.delay)
+        with self.lock:
+            self.ingested.extend(clean_records)
+        if self.on_ingest is not None:
+            self.on_ingest(len(self.ingested))
+        return len(clean_records), 0
+
+
+class Test_LinkedinPipeline(unittest.TestCase):
+    def setUp(self):
+        pl.cu.CHECKPOINT_PATH = os.path.join(staging_folder.name, f"{self.id()}.json") # Every test starts without checkpoints
+
+    def test_execute_stream_flow(self):
+        scraper = FakeScraper(authors_count=50)
+        ingester = FakeIngester(scraper=scraper)
+        pl.LinkedinPipeline().execute_stream_flow(scraper=scraper, cleaner=FakeCleaner(), ingester=ingester, queue_size=2)
+
+        self.assertEqual([(f"Author {n}", f"Post of author {n}") for n in range(50)], ingester.ingested)
+        self.assertEqual([f"Author {n}" for n in range(50)], ingester.authors) # For the per-author metrics
+        # Ingestion starts long before the last author is scraped
+        self.assertLess(ingester.scraped_when_ingested[0], 10)
+        # Every scraped author was staged and can be replayed
+        replay_ingester = FakeIngester(scraper=scraper)
+        pl.LinkedinPipeline().execute_staged_flow(cleaner=FakeCleaner(), ingester=replay_ingester)
+        self.assertEqual(ingester.ingested, replay_ingester.ingested)
+
+    def test_execute_flow_isolates_failing_authors(self):
+        scraper = FakeScraper(authors_count=5, delay=0)
+        ingester = FakeIngester(scraper=scraper)
+
+        def failing_bulk_ingest_data(clean_records: list, author: str = None) -> tuple:
+            if clean_records[0][0] == "Author 2":
+                raise RuntimeError("The database rejected the batch")
+            return FakeIngester.bulk_ingest_data(ingester, clean_records)
+
+        ingester.bulk_ingest_data = failing_bulk_ingest_data
+        pipeline = pl.LinkedinPipeline()
+        pipeline.execute_flow(scraper=scraper, cleaner=FakeCleaner(), ingester=ingester)
+
+        self.assertEqual([f"Author {n}" for n in (0, 1, 3, 4)], [author for author, text in ingester.ingested])
+        # Only the ingested authors are checkpointed, --resume does the failed one again
+        self.assertIsNone(pipeline.checkpoints.get(author_name="Author 2"))
+        self.assertIsNotNone(pipeline.checkpoints.get(author_name="Author 3"))
+
+    def test_execute_stream_flow_is_bounded(self):
+        scraper = FakeScraper(authors_count=30, delay=0)
+        ingester = FakeIngester(scraper=scraper)
+
+        def slow_bulk_ingest_data(clean_records: list, author: str = None) -> tuple:
+            time.sleep(0.01)
+            return FakeIngester.bulk_ingest_data(ingester, clean_records)
+
+        ingester.bulk_ingest_data = slow_bulk_ingest_data
+        pl.LinkedinPipeline().execute_stream_flow(scraper=scraper, cleaner=FakeCleaner(), ingester=ingester, queue_size=2)
+
+        self.assertEqual(30, len(ingester.ingested))
+        # The scraper never runs more than the queued and in-flight authors ahead of the ingester
+        for n, scraped in enumerate(ingester.scraped_when_ingested):
+            self.assertLessEqual(scraped - n, 7)
+
+    def test_staged_flow(self):
+        scraper = FakeScraper(authors_count=5, delay=0)
+        ingester = FakeIngester(scraper=scraper)
+        with tempfile.TemporaryDirectory() as folder_path:
+            staging_path = os.path.join(folder_path, "raw_records.jsonl")
+            self.assertEqual(5, pl.LinkedinPipeline().execute_scrape_flow(staging_path=staging_path, scraper=scraper))
+            result = pl.LinkedinPipeline().execute_staged_flow(staging_path=staging_path, cleaner=FakeCleaner(), ingester=ingester)
+
+        self.assertEqual((5, 0), result)
+        self.assertEqual([(f"Author {n}", f"Post of author {n}") for n in range(5)], ingester.ingested)
+
+    def test_staged_flow_without_staging_folder(self):
+        ingester = FakeIngester(scraper=FakeScraper(authors_count=0, delay=0))
+        with tempfile.TemporaryDirectory() as folder_path:
+            staging_path = os.path.join(folder_path, "staging")
+            self.assertEqual((0, 0), pl.LinkedinPipeline().execute_staged_flow(staging_path=staging_path, cleaner=FakeCleaner(), ingester=ingester))
+        self.assertEqual([], ingester.ingested)
+
+    def test_staged_flow_isolates_failing_authors(self):
+        scraper = FakeScraper(authors_count=5, delay=0)
+        ingester = FakeIngester(scraper=scraper)
+
+        def failing_bulk_ingest_data(clean_records: list, author: str = None) -> tuple:
+            if clean_records[0][0] == "Author 2":
+                raise RuntimeError("The database rejected the batch")
+            return FakeIngester.bulk_ingest_data(ingester, clean_records)
+
+        ingester.bulk_ingest_data = failing_bulk_ingest_data
+        with tempfile.TemporaryDirectory() as folder_path:
+            staging_path = os.path.join(folder_path, "raw_records.jsonl")
+            pl.LinkedinPipeline().execute_scrape_flow(staging_path=staging_path, scraper=scraper)
+            pipeline = pl.LinkedinPipeline()
+            self.assertEqual((4, 0), pipeline.execute_staged_flow(staging_path=staging_path, cleaner=FakeCleaner(), ingester=ingester))
+            self.assertIsNone(pipeline.checkpoints.get(author_name="Author 2"))
+
+            # --resume only replays the failed author
+            resumed_ingester = FakeIngester(scraper=scraper)
+            pl.LinkedinPipeline(resume=True).execute_staged_flow(staging_path=staging_path, cleaner=FakeCleaner(), ingester=resumed_ingester)
+        self.assertEqual([("Author 2", "Post of author 2")], resumed_ingester.ingested)
+
+    def test_resume_after_crash(self):
+        scraper = FakeScraper(authors_count=40, delay=0, fail_at=30)
+        ingester = FakeIngester(scraper=scraper)
+        with self.assertRaises(RuntimeError):
+            pl.LinkedinPipeline().execute_stream_flow(scraper=scraper, cleaner=FakeCleaner(), ingester=ingester)
+        self.assertEqual(30, len(ingester.ingested))
+
+        scraper.fail_at = None
+        resumed_scraper = FakeScraper(authors_count=40, delay=0)
+        resumed_ingester = FakeIngester(scraper=resumed_scraper)
+        pl.LinkedinPipeline(resume=True).execute_stream_flow(scraper=resumed_scraper, cleaner=FakeCleaner(), ingester=resumed_ingester)
+        self.assertEqual([f"Author {n}" for n in range(30, 40)], resumed_scraper.scraped)
+        self.assertEqual([(f"Author {n}", f"Post of author {n}") for n in range(30, 40)], resumed_ingester.ingested)
+
+        # A run without --resume does every author again
+        rerun_scraper = FakeScraper(authors_count=40, delay=0)
+        pl.LinkedinPipeline().execute_stream_flow(scraper=rerun_scraper, cleaner=FakeCleaner(), ingester=FakeIngester(scraper=rerun_scraper))
+        self.assertEqual(40, len(rerun_scraper.scraped))
+
+    def test_checkpoints_expire(self):
+        pipeline = pl.LinkedinPipeline(resume=True)
+        authors = FakeScraper(authors_count=3).get_authors()
+        pipeline.checkpoints.set(author_name="Author 0", saved_at=pl.datetime.now() - pl.timedelta(hours=pl.cu.CHECKPOINT_WINDOW_HOURS + 1))
+        pipeline.checkpoints.set(author_name="Author 1")
+        self.assertEqual([authors[0], authors[2]], pipeline.filter_pending_authors(authors=authors))
+
+    def test_parse_arguments(self):
+        self.assertEqual((pl.cu.INGEST_RT, None, False), pl.parse_arguments([]))
+        self.assertEqual((pl.cu.STAGED_RT, "/tmp/raw.jsonl", False), pl.parse_arguments(["--stage", "staged", "--staging-path", "/tmp/raw.jsonl"]))
+        self.assertEqual((pl.cu.ASYNC_RT, None, True), pl.parse_arguments(["--stage", "async", "--resume"]))
+        with self.assertRaises(SystemExit):
+            pl.parse_arguments(["--stage", "unknown"])
+
+    def test_import_does_not_load_browser_or_database_stack(self):
+        source_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+        loaded = subprocess.run([sys.executable, "-c", "import sys, pipeline; print(sorted(set(sys.modules) & {'selenium', 'bs4', 'psycopg2'}))"],
+                                cwd=source_path, capture_output=True, text=True, check=True).stdout.strip()
+        self.assertEqual("[]", loaded)
+
+
+class Test_AsyncLinkedinPipeline(unittest.TestCase):
+    def setUp(self):
+        self.authors = [(f"Author {n}", f"http://localhost/in/author-{n}/recent-activity/shares/") for n in range(200)]
+
+    def test_execute_async_flow(self):
+        sessions = [FakeSession(delay=0.02) for i in range(8)]
+        ingester = SlowIngester(delay=0.005)
+        pipeline = pl.AsyncLinkedinPipeline(ingest_concurrency=2)
+
+        start = time.perf_counter()
+        result = pipeline.execute_async_flow(authors=self.authors, scrapers=sessions, cleaner=FakeCleaner(), ingester=ingester)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual((200, 0), result)
+        self.assertEqual(sorted((author_name, f"Post of {author_name}") for author_name, author_url in self.authors), sorted(ingester.ingested))
+        # One author after the other would take at least the sum of the scrape and ingest delays
+        sequential_seconds = len(self.authors) * (0.02 + 0.005)
+        self.assertLess(elapsed, sequential_seconds / 4)
+
+    def test_stop_drains_scraped_authors(self):
+        sessions = [FakeSession(delay=0.01) for i in range(4)]
+        pipeline = pl.AsyncLinkedinPipeline()
+        ingester = SlowIngester(delay=0, on_ingest=lambda ingested: pipeline.stop() if ingested >= 10 else None)
+
+        pipeline.execute_async_flow(authors=self.authors, scrapers=sessions, cleaner=FakeCleaner(), ingester=ingester)
+
+        scraped = [author_name for session in sessions for author_name in session.scraped]
+        self.assertLess(len(scraped), 200)
+        self.assertEqual(sorted(scraped), sorted(author for author, text in ingester.ingested))
+
+    def test_cancel(self):
+        sessions = [FakeSession(delay=0.01) for i in range(4)]
+        pipeline = pl.AsyncLinkedinPipeline()
+
+        async def run_and_cancel():
+            task = asyncio.create_task(pipeline.run(authors=self.authors, scrapers=sessions, cleaner=FakeCleaner(), ingester=SlowIngester(delay=0)))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run_and_cancel())
+        self.assertLess(sum(len(session.scraped) for session in sessions), 200)
+        # No session is still loading a page once the run is cancelled
+        self.assertEqual([0, 0, 0, 0], [session.active for session in sessions])
+
+
+if __name__ == "__main__":
+    unittest.main()